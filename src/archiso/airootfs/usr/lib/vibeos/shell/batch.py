@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Batch mode for VibeOS Shell
+Runs a file of natural language requests through the parser with a bounded
+worker pool: vibesh --batch requests.txt --jobs 4
+"""
+
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, List, Optional, TextIO
+
+try:
+    from .tracing import get_tracer, percentile
+except ImportError:
+    from tracing import get_tracer, percentile
+
+# Exit codes, from least to most severe; the batch exits with the most
+# severe code of any request
+EXIT_OK = 0
+EXIT_FAILED = 1          # Claude or the executed command reported an error
+EXIT_INPUT_ERROR = 2     # the request itself was rejected
+EXIT_TIMEOUT = 3         # Claude or the command took too long
+EXIT_UNAVAILABLE = 4     # Claude Code / SDK not available, or usage budget spent
+EXIT_INTERRUPTED = 130   # Ctrl+C
+
+SUCCESS_INTENTS = {'sdk_response', 'execute_command'}
+INPUT_ERROR_INTENTS = {'input_error'}
+TIMEOUT_INTENTS = {'timeout'}
+UNAVAILABLE_INTENTS = {'sdk_not_available', 'cli_not_available', 'cli_not_found',
+                       'claude_not_available', 'claude_required', 'budget_exceeded',
+                       'backend_unavailable'}
+
+COMMAND_TIMEOUT = 60
+
+
+def exit_code_for(intent: str) -> int:
+    """Map a parser intent to a process exit code"""
+    if intent in SUCCESS_INTENTS:
+        return EXIT_OK
+    if intent in INPUT_ERROR_INTENTS:
+        return EXIT_INPUT_ERROR
+    if intent in TIMEOUT_INTENTS:
+        return EXIT_TIMEOUT
+    if intent in UNAVAILABLE_INTENTS:
+        return EXIT_UNAVAILABLE
+    if intent == 'cancelled':
+        return EXIT_INTERRUPTED
+    return EXIT_FAILED
+
+
+def read_requests(source: TextIO) -> List[str]:
+    """One request per line; blank lines and '#' comments are skipped"""
+    requests = []
+    for line in source:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            requests.append(line)
+    return requests
+
+
+class BatchResult:
+    """Outcome of one request in a batch"""
+
+    __slots__ = ('index', 'request', 'intent', 'params', 'output', 'latency', 'exit_code')
+
+    def __init__(self, index: int, request: str):
+        self.index = index
+        self.request = request
+        self.intent = ''
+        self.params: Dict[str, Any] = {}
+        self.output = ''
+        self.latency = 0.0
+        self.exit_code = EXIT_OK
+
+
+class BatchRunner:
+    """
+    Sends independent requests through a parser from a bounded thread pool.
+
+    Results are printed as soon as they can be: in input order (a result
+    waits for the ones before it) or in completion order. Commands returned
+    by the legacy parser, or resolved by the local fast path, are executed
+    in the worker, as the interactive shell would.
+    """
+
+    def __init__(self, parser, jobs: int = 4, ordered: bool = True, cwd: Optional[str] = None,
+                 out: TextIO = sys.stdout, fast_path=None):
+        self.parser = parser
+        self.fast_path = fast_path
+        self.jobs = max(1, jobs)
+        self.ordered = ordered
+        self.cwd = cwd or os.getcwd()
+        self.out = out
+        self._print_lock = threading.Lock()
+
+    def run(self, requests: Iterable[str]) -> int:
+        """Run every request and print a summary; returns the batch exit code"""
+        requests = list(requests)
+        results: List[BatchResult] = []
+        started = time.perf_counter()
+
+        executor = ThreadPoolExecutor(max_workers=self.jobs, thread_name_prefix='vibesh-batch')
+        try:
+            futures = [executor.submit(self._run_one, BatchResult(i, request))
+                       for i, request in enumerate(requests)]
+            for future in (futures if self.ordered else as_completed(futures)):
+                result = future.result()
+                results.append(result)
+                self._report(result, len(requests))
+        except KeyboardInterrupt:
+            executor.shutdown(wait=False, cancel_futures=True)
+            self._write(f"\n⏹️  Batch interrupted after {len(results)}/{len(requests)} requests")
+            self._summary(results, time.perf_counter() - started)
+            return EXIT_INTERRUPTED
+        executor.shutdown(wait=True)
+
+        self._summary(results, time.perf_counter() - started)
+        return max((result.exit_code for result in results), default=EXIT_OK)
+
+    def _run_one(self, result: BatchResult) -> BatchResult:
+        start = time.perf_counter()
+        # Requests share one working directory, so "go to ..." is left to Claude
+        local = self.fast_path.classify(result.request, navigation=False) if self.fast_path else None
+        if local is not None:
+            result.intent, result.params = local
+        else:
+            try:
+                with get_tracer().span('batch.parse'):
+                    result.intent, result.params = self.parser.parse(result.request, {'cwd': self.cwd})
+            except Exception as e:
+                result.intent, result.params = 'error', {'error': str(e)}
+
+        if result.intent == 'sdk_response':
+            result.output = result.params.get('response', '')
+        elif result.intent == 'execute_command' and result.params.get('failed_over'):
+            # Nobody can confirm a command proposed by the fallback backend
+            result.output = (f"$ {result.params.get('command', '')}\n"
+                             f"Not run: proposed by the {result.params.get('backend')} backend "
+                             f"after the Claude SDK failed")
+            result.exit_code = EXIT_FAILED
+        elif result.intent == 'execute_command':
+            self._execute(result)
+        else:
+            result.output = result.params.get('error', result.intent)
+        if not result.exit_code:
+            result.exit_code = exit_code_for(result.intent)
+
+        result.latency = time.perf_counter() - start
+        return result
+
+    def _execute(self, result: BatchResult) -> None:
+        command = result.params.get('command', '')
+        try:
+            completed = subprocess.run(command, shell=True, capture_output=True, text=True,
+                                       timeout=COMMAND_TIMEOUT, cwd=self.cwd)
+        except subprocess.TimeoutExpired:
+            result.output = f"{command}\nCommand timed out after {COMMAND_TIMEOUT} seconds"
+            result.exit_code = EXIT_TIMEOUT
+            return
+        except OSError as e:
+            result.output = f"{command}\n{e}"
+            result.exit_code = EXIT_FAILED
+            return
+        result.output = '\n'.join(part for part in (f"$ {command}", completed.stdout.rstrip(),
+                                                    completed.stderr.rstrip()) if part)
+        if completed.returncode != 0:
+            result.exit_code = EXIT_FAILED
+
+    def _report(self, result: BatchResult, total: int) -> None:
+        mark = '✓' if result.exit_code == EXIT_OK else '✗'
+        flags = ''
+        if result.params.get('from_cache'):
+            flags += ', cached'
+        if result.params.get('coalesced'):
+            flags += ', coalesced'
+        if result.params.get('fast_path'):
+            flags += ', local'
+        lines = [f"\n[{result.index + 1}/{total}] {mark} {result.request} ({result.latency:.2f}s{flags})"]
+        if result.output:
+            lines.append(result.output)
+        self._write('\n'.join(lines))
+
+    def _summary(self, results: List[BatchResult], elapsed: float) -> None:
+        latencies = sorted(result.latency for result in results)
+        failed = sum(1 for result in results if result.exit_code != EXIT_OK)
+        throughput = len(results) / elapsed if elapsed > 0 else 0.0
+        self._write("\n" + "=" * 60)
+        self._write(f"Requests: {len(results)}  succeeded: {len(results) - failed}  "
+                    f"failed: {failed}  jobs: {self.jobs}")
+        self._write(f"Wall time: {elapsed:.2f}s  throughput: {throughput:.2f} req/s")
+        if latencies:
+            self._write(f"Latency: p50 {percentile(latencies, 0.5):.2f}s  "
+                        f"p95 {percentile(latencies, 0.95):.2f}s  max {latencies[-1]:.2f}s")
+        if self.fast_path is not None:
+            stats = self.fast_path.get_stats()
+            self._write(f"Answered locally: {stats['hits']}/{stats['lookups']} "
+                        f"(hit rate {stats['hit_rate']:.0%})")
+        tracer = get_tracer()
+        if tracer.enabled:
+            self._write(f"\nTrace written to {tracer.path}")
+            self._write(tracer.format_summary())
+
+    def _write(self, text: str) -> None:
+        with self._print_lock:
+            print(text, file=self.out, flush=True)
+
+
+def run_batch(parser, path: str, jobs: int = 4, ordered: bool = True, fast_path=None) -> int:
+    """Entry point used by vibesh --batch; path '-' reads standard input"""
+    if not parser or not parser.claude_available:
+        print("❌ Claude Code is not available - batch requests cannot be processed", file=sys.stderr)
+        return EXIT_UNAVAILABLE
+    try:
+        if path == '-':
+            requests = read_requests(sys.stdin)
+        else:
+            with open(path, 'r') as f:
+                requests = read_requests(f)
+    except OSError as e:
+        print(f"❌ Cannot read batch file: {e}", file=sys.stderr)
+        return EXIT_INPUT_ERROR
+
+    try:
+        return BatchRunner(parser, jobs=jobs, ordered=ordered, fast_path=fast_path).run(requests)
+    finally:
+        close = getattr(parser, 'close', None)
+        if close is not None:
+            close()
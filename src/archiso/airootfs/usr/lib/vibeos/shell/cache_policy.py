@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Cache admission policy for VibeOS Shell parsers
+Decides whether a Claude response is safe to replay from cache by looking at
+the tools the agent used while producing it
+"""
+
+import re
+import shlex
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+# Claude Code tools that only observe the system
+READ_ONLY_TOOLS = frozenset({
+    'Read', 'Glob', 'Grep', 'LS', 'NotebookRead', 'WebFetch', 'WebSearch',
+    'TodoWrite', 'BashOutput',
+})
+
+# Read-only tools whose answer goes stale within seconds; never cached
+VOLATILE_TOOLS = frozenset({'WebFetch', 'WebSearch', 'BashOutput'})
+
+# Bash programs that only inspect state (as long as nothing is redirected)
+READ_ONLY_COMMANDS = frozenset({
+    'ls', 'pwd', 'cat', 'head', 'tail', 'wc', 'du', 'df', 'file', 'stat', 'tree',
+    'grep', 'rg', 'which', 'whoami', 'id', 'uname', 'hostname', 'date', 'uptime',
+    'ps', 'free', 'lsblk', 'lscpu', 'ip', 'env', 'printenv', 'echo', 'type',
+})
+
+# Read-only programs that print the environment, which usually holds tokens
+# and API keys; never cached, since the cache is written to disk
+ENVIRONMENT_COMMANDS = frozenset({'env', 'printenv', 'set', 'export', 'declare'})
+
+# Read-only programs reporting time, load or usage, which the directory
+# fingerprint cannot see change; never cached
+VOLATILE_COMMANDS = frozenset({'date', 'uptime', 'ps', 'free', 'df', 'du', 'ip'})
+
+READ_ONLY_GIT = frozenset({'status', 'log', 'diff', 'show', 'branch', 'remote', 'rev-parse', 'describe'})
+
+# '&&' and '||' before the single '&' (background) and '|' they start with
+_COMMAND_SEPARATORS = re.compile(r'&&|\|\||[;|&\n]')
+# Command and process substitution run programs this module never sees
+_SUBSTITUTIONS = ('`', '$(', '<(', '>(')
+
+NEVER = 'never'
+ALWAYS = 'always'
+
+
+def _command_words(command: str) -> Optional[List[List[str]]]:
+    """Words of each command in a shell command line, None if it cannot be inspected"""
+    if not command or '>' in command or any(s in command for s in _SUBSTITUTIONS):
+        return None
+    commands = []
+    for segment in _COMMAND_SEPARATORS.split(command):
+        segment = segment.strip()
+        if not segment:
+            continue
+        try:
+            words = shlex.split(segment)
+        except ValueError:
+            return None
+        if words:
+            commands.append(words)
+    return commands
+
+
+def is_read_only_command(command: str) -> bool:
+    """True when every part of a shell command line is a known read-only program"""
+    commands = _command_words(command)
+    if commands is None:
+        return False
+    for words in commands:
+        program = words[0].rsplit('/', 1)[-1]
+        if program == 'git':
+            if len(words) < 2 or words[1] not in READ_ONLY_GIT:
+                return False
+            # 'git branch -d x' or 'git remote add' change the repository
+            if words[1] in ('branch', 'remote') and len(words) > 2 and words[2] not in ('-v', '-a', '-r', '--list'):
+                return False
+        elif program not in READ_ONLY_COMMANDS:
+            return False
+    return True
+
+
+def shows_environment(command: str) -> bool:
+    """True when a shell command line prints environment variables"""
+    # '$HOME' or '${TOKEN}' expand variables into the output
+    if '$' in command:
+        return True
+    commands = _command_words(command) or []
+    return any(words[0].rsplit('/', 1)[-1] in ENVIRONMENT_COMMANDS for words in commands)
+
+
+def is_volatile_command(command: str) -> bool:
+    """True when any part of a shell command line reports time, load or usage"""
+    commands = _command_words(command) or []
+    return any(words[0].rsplit('/', 1)[-1] in VOLATILE_COMMANDS for words in commands)
+
+
+class ToolUseTracker:
+    """Records the tools used while one response is produced"""
+
+    def __init__(self):
+        self.tools: List[str] = []
+        self.side_effects = False
+        # Read-only, but the answer is only true for a moment
+        self.volatile = False
+        # Read-only, but the answer may contain secrets from the environment
+        self.sensitive = False
+        self.errors = 0
+
+    def record_tool_use(self, name: str, tool_input: Optional[Dict[str, Any]] = None) -> None:
+        self.tools.append(name)
+        if name in READ_ONLY_TOOLS:
+            self.volatile = self.volatile or name in VOLATILE_TOOLS
+            return
+        command = (tool_input or {}).get('command', '')
+        if name == 'Bash' and is_read_only_command(command):
+            self.volatile = self.volatile or is_volatile_command(command)
+            self.sensitive = self.sensitive or shows_environment(command)
+            return
+        self.side_effects = True
+
+    def record_tool_result(self, is_error: Optional[bool]) -> None:
+        if is_error:
+            self.errors += 1
+
+
+class CacheAdmissionPolicy:
+    """
+    Decides which responses may be cached and served from cache.
+
+    Only informational answers (no tools, or read-only tools only) are
+    admitted by default, except those built from volatile tools such as
+    date, df or WebSearch, whose answer would be stale when replayed, and
+    those that printed the environment. Callers can override the decision
+    for inputs that match never-cache or always-cache patterns, or per
+    request through context['cache'] = 'never' | 'always'; an answer that
+    printed the environment is never cached, whatever the override.
+    """
+
+    def __init__(self, never_cache: Iterable[str] = (), always_cache: Iterable[str] = ()):
+        self._rules: List[Tuple[re.Pattern, str]] = []
+        for pattern in never_cache:
+            self.mark(pattern, NEVER)
+        for pattern in always_cache:
+            self.mark(pattern, ALWAYS)
+
+        self.admitted = 0
+        self.rejected = 0
+        self.rejections: Dict[str, int] = {}
+
+    @classmethod
+    def from_config(cls, claude_config: Dict[str, Any]) -> 'CacheAdmissionPolicy':
+        """Build the policy from the claude_code section of claude_config.json"""
+        return cls(
+            never_cache=claude_config.get('cache_never', []),
+            always_cache=claude_config.get('cache_always', []),
+        )
+
+    def mark(self, pattern: str, mode: str) -> None:
+        """Mark inputs matching a regular expression as never- or always-cache"""
+        if mode not in (NEVER, ALWAYS):
+            raise ValueError(f"Cache mode must be '{NEVER}' or '{ALWAYS}', got {mode!r}")
+        self._rules.append((re.compile(pattern, re.IGNORECASE), mode))
+
+    def _override(self, user_input: str, context: Dict[str, Any]) -> Optional[str]:
+        mode = context.get('cache')
+        if mode in (NEVER, ALWAYS):
+            return mode
+        for pattern, mode in self._rules:
+            if pattern.search(user_input):
+                return mode
+        return None
+
+    def allows_lookup(self, user_input: str, context: Dict[str, Any]) -> bool:
+        """False for never-cache inputs, which must always reach Claude"""
+        return self._override(user_input, context) != NEVER
+
+    def admit(self, user_input: str, context: Dict[str, Any], tracker: ToolUseTracker) -> Tuple[bool, str]:
+        """Decide whether a finished response may be cached, with the reason"""
+        override = self._override(user_input, context)
+        if tracker.sensitive:
+            admitted, reason = False, 'sensitive'
+        elif override == ALWAYS:
+            admitted, reason = True, 'always_cache'
+        elif override == NEVER:
+            admitted, reason = False, 'never_cache'
+        elif tracker.side_effects:
+            admitted, reason = False, 'side_effects'
+        elif tracker.volatile:
+            admitted, reason = False, 'volatile'
+        elif tracker.errors:
+            admitted, reason = False, 'tool_errors'
+        else:
+            admitted, reason = True, 'read_only'
+
+        if admitted:
+            self.admitted += 1
+        else:
+            self.rejected += 1
+            self.rejections[reason] = self.rejections.get(reason, 0) + 1
+        return admitted, reason
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'admitted': self.admitted,
+            'rejected': self.rejected,
+            'rejections': dict(self.rejections),
+            'rules': len(self._rules),
+        }
@@ -11,10 +11,39 @@ import json
 import tempfile
 import logging
 import shlex
-import re
+import threading
+import time
 from pathlib import Path
+from concurrent.futures import Future, TimeoutError as FutureTimeout
 from typing import Tuple, Dict, Any, Optional, List
 
+try:
+    from .response_cache import DiskCacheStore, DEFAULT_DISK_MAX_ENTRIES
+    from .fs_fingerprint import get_fingerprinter
+    from .query_normalizer import normalize_query
+    from .singleflight import SingleFlight
+    from .tracing import get_tracer
+    from .warmup import prime_page_cache, warm_files
+    from .claude_cli import get_cli_discovery
+    from .worker_pool import WorkerPool, WorkerError, WorkerTimeout
+    from .retry_policy import RetryPolicy, CircuitBreaker, classify_failure, TIMEOUT
+    from .hedging import Hedger, Claim, Racer
+    from .latency_model import LatencyModel, COMMAND
+    from .sanitizer import sanitize_input, MAX_INPUT_LENGTH
+except ImportError:
+    from response_cache import DiskCacheStore, DEFAULT_DISK_MAX_ENTRIES
+    from fs_fingerprint import get_fingerprinter
+    from query_normalizer import normalize_query
+    from singleflight import SingleFlight
+    from tracing import get_tracer
+    from warmup import prime_page_cache, warm_files
+    from claude_cli import get_cli_discovery
+    from worker_pool import WorkerPool, WorkerError, WorkerTimeout
+    from retry_policy import RetryPolicy, CircuitBreaker, classify_failure, TIMEOUT
+    from hedging import Hedger, Claim, Racer
+    from latency_model import LatencyModel, COMMAND
+    from sanitizer import sanitize_input, MAX_INPUT_LENGTH
+
 
 class ClaudeCodeParser:
     """Parse natural language using Claude Code instead of regex patterns"""
@@ -43,6 +72,7 @@ class ClaudeCodeParser:
         
         # Set up debug mode using shared utility
         self.debug_mode = VibeOSDebug.is_debug_enabled(self.config)
+        self.max_input_length = self.config.get('security', {}).get('max_input_length', MAX_INPUT_LENGTH)
         
         # Set up logging
         VibeOSDebug.setup_logging(self.debug_mode)
@@ -60,6 +90,45 @@ class ClaudeCodeParser:
             cache_enabled=cache_enabled,
             cache_ttl=cache_ttl
         )
+        self.cache_ttl = cache_ttl
+
+        # Persistent store shared by all vibesh processes, opened on first use
+        self.disk_cache = None
+        if cache_enabled and self.config.get('claude_code', {}).get('cache_persistent', True):
+            self.disk_cache = DiskCacheStore(
+                'claude_code',
+                max_entries=self.config.get('claude_code', {}).get('cache_disk_max_entries',
+                                                                   DEFAULT_DISK_MAX_ENTRIES),
+                debug_mode=self.debug_mode
+            )
+
+        # Cached commands are tied to the state of the directory they were made for
+        self.fingerprinter = None
+        if cache_enabled and self.config.get('claude_code', {}).get('cache_fingerprint', True):
+            self.fingerprinter = get_fingerprinter()
+
+        self.tracer = get_tracer()
+
+        # Identical requests arriving together share one Claude run
+        self.single_flight = None
+        if self.config.get('claude_code', {}).get('coalesce_queries', True):
+            self.single_flight = SingleFlight()
+
+        # Long-lived CLI workers instead of a new Node process per attempt
+        self.worker_pool = WorkerPool.from_config(self.config.get('claude_code', {}),
+                                                  self._cli_command, self.debug_mode)
+
+        # A second worker races requests that are slow to answer (needs the pool)
+        self.hedger = (Hedger.from_config(self.config.get('claude_code', {}), self.debug_mode)
+                       if self.worker_pool is not None else None)
+
+        # Timeouts and retry budgets learned from observed latency
+        self.latency = LatencyModel.from_config(self.config.get('claude_code', {}), self.debug_mode)
+
+        # Backoff between attempts; fail fast while the backend is down
+        self.retry_policy = RetryPolicy.from_config(self.config.get('claude_code', {}))
+        self.breaker = CircuitBreaker.from_config(self.config.get('claude_code', {}),
+                                                  self._probe_backend, self.debug_mode)
 
         if self.debug_mode:
             logging.debug(f"Claude Code available: {self.claude_available}")
@@ -104,42 +173,11 @@ class ClaudeCodeParser:
 
         return validated
 
-    def _sanitize_input(self, text: str) -> Optional[str]:
-        """Sanitize user input to prevent injection attacks"""
-        if not text or not isinstance(text, str):
-            return None
-
-        # Remove or escape dangerous characters
-        text = text.strip()
-
-        # Basic length check
-        if len(text) > 10000:  # Reasonable limit
-            logging.warning("Input too long, truncating")
-            text = text[:10000]
-
-        # Check for common injection patterns
-        dangerous_patterns = [
-            r'[;&|`$()]',  # Shell metacharacters
-            r'\\x[0-9a-fA-F]{2}',  # Hex escape sequences
-            r'\\[0-7]{3}',  # Octal escape sequences
-        ]
-
-        for pattern in dangerous_patterns:
-            if re.search(pattern, text):
-                # Replace with safe equivalents
-                text = re.sub(r'[;&|`$()]', ' ', text)
-                text = re.sub(r'\\x[0-9a-fA-F]{2}', '', text)
-                text = re.sub(r'\\[0-7]{3}', '', text)
-                break
-
-        # Clean up multiple spaces
-        text = re.sub(r'\s+', ' ', text).strip()
-
-        return text if text else None
-
     def _get_validated_timeout(self) -> int:
-        """Get timeout value with bounds checking"""
+        """Get timeout value with bounds checking, learned from past requests once known"""
         timeout = self.config.get('claude_code', {}).get('command_timeout', 10)
+        if self.latency is not None:
+            timeout = self.latency.deadline(COMMAND, timeout)
         return max(1, min(120, int(timeout)))
 
     def _build_claude_command(self, claude_cmd: str, prompt_file: str) -> List[str]:
@@ -180,69 +218,23 @@ class ClaudeCodeParser:
         if self.debug_mode:
             print("\n[DEBUG] === Claude Code Detection ===")
 
-        # Method 1: Check if wrapper exists
-        wrapper_path = Path("/usr/bin/claude-code")
-        if self.debug_mode:
-            print(f"[DEBUG] Checking for wrapper at {wrapper_path}...")
-            print(f"[DEBUG]   Exists: {wrapper_path.exists()}")
-            if wrapper_path.exists():
-                print(f"[DEBUG]   Is file: {wrapper_path.is_file()}")
-                print(f"[DEBUG]   Is executable: {os.access(str(wrapper_path), os.X_OK)}")
-
-        if wrapper_path.exists():
-            if self.debug_mode:
-                print("[DEBUG] ✓ Found /usr/bin/claude-code wrapper")
-            return True
-
-        # Method 2: Check if Node module exists
-        module_path = Path("/usr/lib/node_modules/@anthropic-ai/claude-code")
+        # PATH, the /usr/bin/claude-code wrapper and the global node module
+        # are searched in-process; the result is cached until they change
+        cli = get_cli_discovery().find()
         if self.debug_mode:
-            print(f"[DEBUG] Checking for Node module at {module_path}...")
-            print(f"[DEBUG]   Exists: {module_path.exists()}")
-            if module_path.exists():
-                cli_path = module_path / "cli.js"
-                print(f"[DEBUG]   cli.js exists: {cli_path.exists()}")
-
-        if module_path.exists():
-            if self.debug_mode:
-                print(f"[DEBUG] ✓ Found Claude Code module at {module_path}")
-            return True
-
-        # Method 3: Try to run claude-code command
-        if self.debug_mode:
-            print("[DEBUG] Trying to locate claude-code via 'which' command...")
-
-        try:
-            result = subprocess.run(
-                ["which", "claude-code"],
-                capture_output=True,
-                text=True,
-                timeout=1
-            )
-            if self.debug_mode:
-                print(f"[DEBUG]   which exit code: {result.returncode}")
-                if result.stdout:
-                    print(f"[DEBUG]   which output: {result.stdout.strip()}")
-                if result.stderr:
-                    print(f"[DEBUG]   which stderr: {result.stderr.strip()}")
-
-            if result.returncode == 0:
-                if self.debug_mode:
-                    print(f"[DEBUG] ✓ claude-code found at {result.stdout.strip()}")
-                return True
-        except Exception as e:
-            if self.debug_mode:
-                print(f"[DEBUG] Exception running 'which': {e}")
-
-        if self.debug_mode:
-            print("[DEBUG] ✗ Claude Code not detected by any method")
+            if cli is not None:
+                print(f"[DEBUG] ✓ Found Claude Code via {cli.source}: {cli.path or cli.script}")
+            else:
+                print("[DEBUG] ✗ Claude Code not detected by any method")
             print("[DEBUG] === End Detection ===")
-        return False
+        return cli is not None
 
     def _get_claude_command(self) -> Optional[str]:
-        """Get the command to run Claude Code using shared utilities."""
-        from .utils import VibeOSPathUtils
-        return VibeOSPathUtils.resolve_claude_command()
+        """Get the command to run Claude Code from the shared CLI discovery."""
+        cli = get_cli_discovery().find()
+        if cli is None:
+            return None
+        return cli.path or f"node {cli.script}"
 
     def _create_command_prompt(self, user_input: str, context: Dict[str, Any]) -> str:
         """Create a prompt for Claude Code to interpret the command"""
@@ -298,84 +290,120 @@ Now interpret the user's command and output only the shell command(s):"""
         Returns:
             Tuple of (intent, parameters) indicating the result
         """
-        try:
-            from .utils import VibeOSPathUtils, validate_input
-        except ImportError:
-            from utils import VibeOSPathUtils, validate_input
-        
+        with self.tracer.span('claude_code.parse_with_claude') as span:
+            intent, params = self._parse_with_claude(input_text, context)
+            span['intent'] = intent
+            return intent, params
+
+    def _parse_with_claude(self, input_text: str, context: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
         if not self.claude_available:
             return 'claude_not_available', {'error': 'Claude Code is not installed or not accessible'}
 
-        # Validate and sanitize input using shared utility
-        try:
-            sanitized_input = validate_input(input_text)
-        except ValueError as e:
-            return 'input_error', {'error': str(e)}
+        # Sanitize input with the sanitizer shared by both parsers
+        sanitized_input = sanitize_input(input_text, self.max_input_length)
+        if not sanitized_input:
+            return 'input_error', {'error': 'Input contains dangerous or invalid characters'}
 
-        # Check cache first using context manager
-        cache_key = self.context_manager.create_cache_key(input_text, context)
-        cached_response = self.context_manager.get_cached_response(cache_key)
-        if cached_response:
+        # Check cache first, keyed on the normalized wording of the request
+        cwd = context.get('cwd') or os.getcwd()
+        normalized = normalize_query(input_text)
+        cache_key = self.context_manager.create_cache_key(normalized, context)
+        fingerprint = None
+        if self.fingerprinter is not None:
+            fingerprint = self.fingerprinter.fingerprint(cwd)
+
+        # Only an exact key is trusted: a near-duplicate of a cached command
+        # ('do not delete ...' for 'delete ...') would be run by the shell
+        cached_command = self._get_cached_command(cache_key, fingerprint)
+        if cached_command is not None:
             return 'execute_command', {
-                'command': cached_response['response'],
+                'command': cached_command,
                 'original_input': input_text,
                 'from_cache': True
             }
 
+        if self.single_flight is None:
+            return self._query_claude(input_text, sanitized_input, context, cache_key, fingerprint)
+
+        (intent, params), shared = self.single_flight.do(
+            self._memory_key(cache_key, fingerprint),
+            lambda: self._query_claude(input_text, sanitized_input, context, cache_key, fingerprint)
+        )
+        if shared:
+            params = dict(params, original_input=input_text, coalesced=True)
+        return intent, params
+
+    def _query_claude(self, input_text: str, sanitized_input: str, context: Dict[str, Any],
+                      cache_key: str, fingerprint: Optional[str]) -> Tuple[str, Dict[str, Any]]:
+        """Run Claude Code for one request and cache the extracted command"""
         # Create prompt for Claude
         prompt = self._create_command_prompt(sanitized_input, context)
 
         try:
             # Get Claude command first to fail fast
-            claude_cmd = VibeOSPathUtils.resolve_claude_command()
-            if not claude_cmd:
+            cli = get_cli_discovery().find()
+            if cli is None:
                 return 'claude_not_available', {'error': 'Claude Code command not found'}
 
             # Get timeout from config with bounds checking
             timeout = self._get_validated_timeout()
 
-            # Execute with retry logic
-            max_retries = self.config.get('claude_code', {}).get('max_retries', 3)
-            last_error = None
-
-            for attempt in range(max_retries + 1):
+            if self.breaker is not None and not self.breaker.allow():
+                return 'backend_unavailable', {
+                    'error': 'Claude Code is not responding, skipping it for now',
+                    'retry_after': round(self.breaker.retry_after)
+                }
+
+            # Execute with backoff between attempts
+            budget = (self.latency.budget(COMMAND, self.retry_policy.budget)
+                      if self.latency is not None else None)
+            started = time.monotonic()
+            attempt = 0
+            while True:
+                attempt_started = time.monotonic()
                 try:
                     # Use safer command construction
-                    result = subprocess.run(
-                        [claude_cmd, '--no-interactive', '--quiet'],
-                        input=prompt,
-                        capture_output=True,
-                        text=True,
-                        timeout=timeout,
-                        check=False
-                    )
+                    with self.tracer.span('claude_code.subprocess', attempt=attempt,
+                                          pooled=self.worker_pool is not None):
+                        result = self._run_claude(cli.command, prompt, timeout, context.get('cwd'))
 
                     # If successful, break out of retry loop
                     if result.returncode == 0:
+                        if self.breaker is not None:
+                            self.breaker.record_success()
+                        if self.latency is not None:
+                            self.latency.record(COMMAND, time.monotonic() - attempt_started)
                         break
-                    else:
-                        last_error = f"Claude Code returned exit code {result.returncode}: {result.stderr}"
-                        if attempt < max_retries:
-                            logging.warning(f"Claude Code attempt {attempt + 1} failed, retrying...")
-                            continue
+                    last_error = f"Claude Code returned exit code {result.returncode}: {result.stderr}"
+                    error_class = classify_failure(stderr=result.stderr or '')
 
                 except subprocess.TimeoutExpired as e:
                     last_error = f"Claude Code timed out after {timeout} seconds"
-                    if attempt < max_retries:
-                        logging.warning(f"Timeout on attempt {attempt + 1}, retrying...")
-                        continue
-                    else:
-                        return 'timeout', {'error': last_error}
+                    error_class = classify_failure(e)
+                    if self.latency is not None:
+                        self.latency.record(COMMAND, timeout, timed_out=True)
 
                 except (OSError, subprocess.SubprocessError) as e:
                     last_error = f"Process error: {str(e)}"
-                    if attempt < max_retries:
-                        logging.warning(f"Process error on attempt {attempt + 1}, retrying...")
-                        continue
+                    error_class = classify_failure(e)
+
+                if self.breaker is not None:
+                    self.breaker.record_failure(error_class)
+                # The request was already let through; a breaker this failure
+                # opened (or a failed half-open trial) just ends the retries
+                delay = None
+                if self.breaker is None or self.breaker.closed:
+                    delay = self.retry_policy.next_delay(error_class, attempt, time.monotonic() - started,
+                                                         attempt_cost=timeout, budget=budget)
+                if delay is None:
+                    if error_class == TIMEOUT:
+                        return 'timeout', {'error': last_error}
+                    return 'process_error', {'error': f"Failed after {attempt + 1} attempts: {last_error}"}
 
-            else:
-                # All retries exhausted
-                return 'process_error', {'error': f"Failed after {max_retries + 1} attempts: {last_error}"}
+                logging.warning(f"Claude Code attempt {attempt + 1} failed ({error_class}), "
+                                f"retrying in {delay:.1f}s...")
+                time.sleep(delay)
+                attempt += 1
 
             if result.returncode == 0 and result.stdout:
                 # Extract the command from Claude's response
@@ -385,7 +413,9 @@ Now interpret the user's command and output only the shell command(s):"""
                     self.context_manager.add_to_history(input_text, command)
 
                     # Cache the command using context manager
-                    self.context_manager.cache_response(cache_key, command)
+                    self.context_manager.cache_response(self._memory_key(cache_key, fingerprint), command)
+                    if self.disk_cache is not None:
+                        self.disk_cache.put(cache_key, command, time.time() + self.cache_ttl, fingerprint)
 
                     return 'execute_command', {
                         'command': command,
@@ -404,6 +434,94 @@ Now interpret the user's command and output only the shell command(s):"""
             logging.error(f"Unexpected error in parse_with_claude: {e}")
             return 'error', {'error': str(e)}
 
+    def _run_claude(self, command: List[str], prompt: str, timeout: int,
+                    cwd: Optional[str] = None) -> subprocess.CompletedProcess:
+        """One attempt in cwd, on a pooled worker when the pool is enabled"""
+        argv = command + ['--no-interactive', '--quiet']
+        if self.worker_pool is None:
+            return subprocess.run(argv, input=prompt, capture_output=True, text=True,
+                                  timeout=timeout, check=False, cwd=cwd)
+        try:
+            if self.hedger is None:
+                output = self.worker_pool.run(prompt, timeout, cwd=cwd)
+            else:
+                output = self._run_hedged(prompt, timeout, cwd)
+        except WorkerTimeout:
+            raise subprocess.TimeoutExpired(argv, timeout)
+        except WorkerError as e:
+            return subprocess.CompletedProcess(argv, 1, stdout='', stderr=str(e))
+        return subprocess.CompletedProcess(argv, 0, stdout=output, stderr='')
+
+    def _run_hedged(self, prompt: str, timeout: int, cwd: Optional[str] = None) -> str:
+        """Run on a pooled worker, racing a second one if the first is slow to answer"""
+        cancels: Dict[Future, threading.Event] = {}
+
+        def start(claim: Claim) -> Racer:
+            cancel = threading.Event()
+            future: Future = Future()
+            cancels[future] = cancel
+
+            def work() -> None:
+                try:
+                    future.set_result(self.worker_pool.run(prompt, timeout, cancel, claim, cwd))
+                except BaseException as e:
+                    future.set_exception(e)
+
+            threading.Thread(target=work, name='claude-worker-request', daemon=True).start()
+            return future, cancel.set
+
+        started = time.monotonic()
+        future, _ = self.hedger.race(start, start, timeout)
+        # The workers enforce the timeout themselves; the extra second only
+        # guards against a worker thread that never returns
+        try:
+            return future.result(timeout=max(0.0, started + timeout - time.monotonic()) + 1.0)
+        except FutureTimeout:
+            cancels[future].set()
+            raise WorkerTimeout(f'no result within {timeout} seconds')
+
+    def _probe_backend(self) -> bool:
+        """Circuit breaker health check: one tiny request"""
+        cli = get_cli_discovery().find()
+        if cli is None:
+            return False
+        try:
+            result = self._run_claude(cli.command, "Reply with the single word OK.",
+                                      self._get_validated_timeout())
+        except (OSError, subprocess.SubprocessError):
+            return False
+        return result.returncode == 0 and bool(result.stdout.strip())
+
+    @staticmethod
+    def _cli_command() -> List[str]:
+        """argv prefix for new pool workers"""
+        cli = get_cli_discovery().find()
+        if cli is None:
+            raise OSError('Claude Code command not found')
+        return cli.command
+
+    @staticmethod
+    def _memory_key(cache_key: str, fingerprint: Optional[str]) -> str:
+        """In-memory key; the fingerprint makes entries for an older directory state unreachable"""
+        return f"{cache_key}@{fingerprint}" if fingerprint else cache_key
+
+    def _get_cached_command(self, cache_key: str, fingerprint: Optional[str]) -> Optional[str]:
+        """Look a command up in the context manager cache, then in the shared disk store"""
+        memory_key = self._memory_key(cache_key, fingerprint)
+        cached_response = self.context_manager.get_cached_response(memory_key)
+        if cached_response:
+            return cached_response['response']
+
+        if self.disk_cache is not None:
+            stored = self.disk_cache.get(cache_key)
+            if stored is not None and fingerprint and stored[2] not in (None, fingerprint):
+                self.disk_cache.delete(cache_key)
+                stored = None
+            if stored is not None:
+                self.context_manager.cache_response(memory_key, stored[0])
+                return stored[0]
+        return None
+
     def _extract_command(self, claude_output: str) -> Optional[str]:
         """Extract executable command from Claude's response"""
         lines = claude_output.strip().split('\n')
@@ -446,7 +564,7 @@ Now interpret the user's command and output only the shell command(s):"""
             return 'input_error', {'error': 'Input must be a non-empty string'}
 
         # Sanitize input
-        sanitized_input = self._sanitize_input(input_text.strip())
+        sanitized_input = sanitize_input(input_text, self.max_input_length)
         if not sanitized_input:
             return 'input_error', {'error': 'Input contains dangerous or invalid characters'}
 
@@ -474,14 +592,13 @@ Now interpret the user's command and output only the shell command(s):"""
             List of suggested commands (up to 5)
         """
         try:
-            from .utils import BaseSuggestionEngine, validate_input
+            from .utils import BaseSuggestionEngine
         except ImportError:
-            from utils import BaseSuggestionEngine, validate_input
+            from utils import BaseSuggestionEngine
         
-        # Input validation using shared utility
-        try:
-            safe_input = validate_input(partial_input)
-        except ValueError:
+        # Input validation using the shared sanitizer
+        safe_input = sanitize_input(partial_input, self.max_input_length)
+        if not safe_input:
             return []
         
         # Use shared suggestion engine
@@ -490,4 +607,40 @@ Now interpret the user's command and output only the shell command(s):"""
 
     def clear_context(self) -> None:
         """Clear conversation history using shared context manager."""
-        self.context_manager.clear_context()
\ No newline at end of file
+        self.context_manager.clear_context()
+        if self.disk_cache is not None:
+            self.disk_cache.clear()
+
+    def warm_up(self) -> None:
+        """Prime the page cache and start a pool worker while the banner is displayed."""
+        if self.claude_available:
+            threading.Thread(target=self._warm_up, name='vibesh-warmup', daemon=True).start()
+
+    def _warm_up(self) -> None:
+        prime_page_cache(warm_files())
+        if self.worker_pool is not None:
+            self.worker_pool.prestart()
+
+    def close(self) -> None:
+        """Stop the pooled workers and the breaker's probe, and save learned latencies."""
+        if self.breaker is not None:
+            self.breaker.close()
+        if self.latency is not None:
+            self.latency.save()
+        if self.worker_pool is not None:
+            self.worker_pool.close()
+
+    def get_status(self) -> Dict[str, Any]:
+        """Availability, cache and worker pool statistics."""
+        return {
+            'claude_available': self.claude_available,
+            'cli': get_cli_discovery().get_stats(),
+            'worker_pool': self.worker_pool.get_stats() if self.worker_pool else None,
+            'hedging': self.hedger.get_stats() if self.hedger else None,
+            'retries': self.retry_policy.get_stats(),
+            'latency': self.latency.get_stats() if self.latency else None,
+            'breaker': self.breaker.get_stats() if self.breaker else None,
+            'single_flight': self.single_flight.get_stats() if self.single_flight else None,
+            'fingerprints': self.fingerprinter.get_stats() if self.fingerprinter else None,
+            'debug_mode': self.debug_mode,
+        }
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Parser failover for VibeOS Shell
+Holds the SDK parser and the legacy subprocess parser, tracks the health
+and latency of each, routes every request to the healthiest one and moves
+to the other mid-session when one starts failing or becomes slow
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Intents that say the backend failed, rather than the request
+FAILURE_INTENTS = frozenset({
+    'sdk_error', 'connection_error', 'process_error', 'json_error', 'error', 'timeout',
+    'sdk_not_available', 'cli_not_available', 'cli_not_found', 'claude_not_available',
+    'backend_unavailable', 'empty_response',
+})
+# Answers: the backend works, and how long it took counts towards its latency
+SUCCESS_INTENTS = frozenset({'sdk_response', 'execute_command', 'claude_error'})
+# Failures after which the same request is worth sending to the other backend:
+# they are quick, unlike a timeout which already used up the user's patience
+RETRY_ELSEWHERE_INTENTS = FAILURE_INTENTS - {'timeout', 'empty_response'}
+
+DEFAULT_THRESHOLD = 2
+DEFAULT_COOLDOWN = 30.0
+DEFAULT_MAX_COOLDOWN = 600.0
+DEFAULT_SLOW_FACTOR = 3.0
+LATENCY_ALPHA = 0.3
+
+
+def _sdk_parser() -> Any:
+    try:
+        from .claude_sdk_parser import ClaudeSDKParser
+    except ImportError:
+        from claude_sdk_parser import ClaudeSDKParser
+    return ClaudeSDKParser()
+
+
+def _legacy_parser() -> Any:
+    try:
+        from .claude_code_parser import ClaudeCodeParser
+    except ImportError:
+        from claude_code_parser import ClaudeCodeParser
+    return ClaudeCodeParser()
+
+
+# (name, description, factory) in order of preference
+BACKENDS: Tuple[Tuple[str, str, Callable[[], Any]], ...] = (
+    ('sdk', 'Claude SDK Parser', _sdk_parser),
+    ('legacy', 'legacy subprocess parser', _legacy_parser),
+)
+
+
+class _Backend:
+    """One parser and what is known about its health"""
+
+    __slots__ = ('name', 'description', 'factory', 'parser', 'error', 'requests', 'failures',
+                 'consecutive_failures', 'latency', 'down_until', 'cooldown')
+
+    def __init__(self, name: str, description: str, factory: Callable[[], Any]):
+        self.name = name
+        self.description = description
+        self.factory = factory
+        self.parser: Any = None
+        self.error: Optional[str] = None  # why the parser could not be created
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.latency: Optional[float] = None  # moving average of successful requests
+        self.down_until = 0.0
+        self.cooldown = 0.0
+
+    @property
+    def created(self) -> bool:
+        return self.parser is not None or self.error is not None
+
+    @property
+    def available(self) -> bool:
+        return self.parser is not None and bool(self.parser.claude_available)
+
+    def as_dict(self, now: float) -> Dict[str, Any]:
+        return {
+            'description': self.description,
+            'created': self.created,
+            'available': self.available if self.parser is not None else None,
+            'error': self.error,
+            'requests': self.requests,
+            'failures': self.failures,
+            'consecutive_failures': self.consecutive_failures,
+            'latency': round(self.latency, 3) if self.latency is not None else None,
+            'down_for': round(max(0.0, self.down_until - now), 1),
+        }
+
+
+class FailoverParser:
+    """
+    Routes requests between the SDK and the legacy parser.
+
+    The first backend in BACKENDS is created up front, the other only when
+    it is first needed. failover_threshold consecutive failures take a
+    backend out of rotation for failover_cooldown seconds (doubling while
+    it keeps failing), and a backend whose average latency is more than
+    failover_slow_factor times the other's is tried second. A request that
+    fails quickly on one backend, before any text was streamed, is sent to
+    the next one straight away. With failover disabled in claude_config.json
+    only the first backend that can be created is used.
+
+    The backends answer differently: the SDK parser with text, the legacy
+    parser with a shell command for vibesh to run. An answer from a later
+    backend while the first one exists is marked failed_over, so the shell
+    can ask before running a command the user did not expect.
+    """
+
+    def __init__(self, backends: Tuple[Tuple[str, str, Callable[[], Any]], ...] = BACKENDS):
+        self._lock = threading.Lock()
+        self.backends = [_Backend(*backend) for backend in backends]
+        self.failovers = 0
+
+        # The first backend that can be created supplies the configuration
+        first = next((b for b in self.backends if self._create(b)), None)
+        if first is None:
+            raise RuntimeError('; '.join(f"{b.name}: {b.error}" for b in self.backends))
+        self.config: Dict[str, Any] = first.parser.config
+        claude_config = self.config.get('claude_code', {})
+        self.debug_mode = bool(getattr(first.parser, 'debug_mode', False))
+        self.enabled = claude_config.get('failover', True)
+        self.threshold = max(1, claude_config.get('failover_threshold', DEFAULT_THRESHOLD))
+        self.base_cooldown = claude_config.get('failover_cooldown', DEFAULT_COOLDOWN)
+        self.slow_factor = claude_config.get('failover_slow_factor', DEFAULT_SLOW_FACTOR)
+        if not self.enabled:
+            self.backends = [first]
+
+    # ------------------------------------------------------- parser interface
+
+    @property
+    def supports_streaming(self) -> bool:
+        return any(getattr(b.parser, 'supports_streaming', False) for b in self.backends if b.parser)
+
+    @property
+    def claude_available(self) -> bool:
+        return any(self._create(b) and b.available for b in self.backends)
+
+    @property
+    def active(self) -> Optional[str]:
+        """Description of the backend the next request goes to"""
+        route = self._route()
+        return route[0].description if route else None
+
+    def parse(self, input_text: str, context: Dict[str, Any] = {},
+              on_text: Optional[Callable[[str], None]] = None) -> Tuple[str, Dict[str, Any]]:
+        """Parse with the healthiest backend, failing over when it breaks"""
+        route = self._route()
+        if not route:
+            return 'claude_not_available', {'error': 'No Claude backend is available'}
+
+        streamed = [False]
+
+        def forward(text: str) -> None:
+            streamed[0] = True
+            on_text(text)
+
+        backend = route[0]
+        preferred = self.backends[0]
+        tried: List[_Backend] = []
+        while backend is not None:
+            started = time.monotonic()
+            if on_text is not None and getattr(backend.parser, 'supports_streaming', False):
+                intent, params = backend.parser.parse(input_text, context, on_text=forward)
+            else:
+                intent, params = backend.parser.parse(input_text, context)
+            self._record(backend, intent, time.monotonic() - started)
+
+            if backend is not preferred and preferred.parser is not None:
+                params = dict(params, backend=backend.name, failed_over=True)
+            if intent not in RETRY_ELSEWHERE_INTENTS or streamed[0]:
+                return intent, params
+            tried.append(backend)
+            backend = next((b for b in self._route(create_all=True) if b not in tried), None)
+            if self.debug_mode and backend is not None:
+                print(f"[DEBUG] {tried[-1].description} failed ({intent}), trying {backend.description}")
+        return intent, params
+
+    def warm_up(self) -> None:
+        route = self._route()
+        if route and hasattr(route[0].parser, 'warm_up'):
+            route[0].parser.warm_up()
+
+    def new_session(self, cwd: Optional[str] = None) -> None:
+        for parser in self._parsers():
+            if hasattr(parser, 'new_session'):
+                parser.new_session(cwd)
+
+    def clear_context(self) -> None:
+        for parser in self._parsers():
+            parser.clear_context()
+
+    def get_suggestions(self, partial_input: str) -> List[str]:
+        route = self._route()
+        return route[0].parser.get_suggestions(partial_input) if route else []
+
+    def close(self) -> None:
+        for parser in self._parsers():
+            if hasattr(parser, 'close'):
+                parser.close()
+
+    def get_status(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        route = self._route()
+        return {
+            'failover': self.enabled,
+            'active': route[0].name if route else None,
+            'failovers': self.failovers,
+            'backends': {b.name: dict(b.as_dict(now),
+                                      status=b.parser.get_status() if b.parser and hasattr(b.parser, 'get_status')
+                                      else None)
+                         for b in self.backends},
+        }
+
+    # ----------------------------------------------------------------- routing
+
+    def _create(self, backend: _Backend) -> bool:
+        """Create the backend's parser on first use; False if it cannot be"""
+        with self._lock:
+            if not backend.created:
+                try:
+                    backend.parser = backend.factory()
+                except Exception as e:
+                    backend.error = str(e) or type(e).__name__
+            return backend.parser is not None
+
+    def _parsers(self) -> List[Any]:
+        return [b.parser for b in self.backends if b.parser is not None]
+
+    def _route(self, create_all: bool = False) -> List[_Backend]:
+        """Available backends, healthiest first"""
+        now = time.monotonic()
+        ordered: List[_Backend] = []
+        resting: List[_Backend] = []
+        for backend in self.backends:
+            # A backend is created once the ones before it fail or rest
+            if ordered and not backend.created and not create_all:
+                break
+            if not self._create(backend) or not backend.available:
+                continue
+            (resting if backend.down_until > now else ordered).append(backend)
+
+        # Prefer a markedly faster backend over the configured order
+        known = [b for b in ordered if b.latency is not None]
+        if len(known) > 1:
+            fastest = min(known, key=lambda b: b.latency)
+            if ordered[0] is not fastest and ordered[0].latency is not None \
+                    and ordered[0].latency > self.slow_factor * fastest.latency:
+                ordered.remove(fastest)
+                ordered.insert(0, fastest)
+
+        # Resting backends are the last resort, soonest back first
+        return ordered + sorted(resting, key=lambda b: b.down_until)
+
+    def _record(self, backend: _Backend, intent: str, seconds: float) -> None:
+        with self._lock:
+            backend.requests += 1
+            if intent in FAILURE_INTENTS:
+                backend.failures += 1
+                backend.consecutive_failures += 1
+                if backend.consecutive_failures >= self.threshold:
+                    backend.cooldown = (min(backend.cooldown * 2, DEFAULT_MAX_COOLDOWN)
+                                        if backend.cooldown else self.base_cooldown)
+                    backend.down_until = time.monotonic() + backend.cooldown
+                    self.failovers += 1
+                    if self.debug_mode:
+                        print(f"[DEBUG] {backend.description} is failing, "
+                              f"resting it for {backend.cooldown:g}s")
+                return
+            if intent not in SUCCESS_INTENTS:
+                return
+            backend.consecutive_failures = 0
+            backend.cooldown = 0.0
+            backend.down_until = 0.0
+            backend.latency = (seconds if backend.latency is None
+                               else LATENCY_ALPHA * seconds + (1 - LATENCY_ALPHA) * backend.latency)
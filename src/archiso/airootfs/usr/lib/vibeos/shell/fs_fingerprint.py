@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Working directory fingerprints for VibeOS Shell caches
+A fingerprint changes whenever the directory listing, the git index or the
+checked-out HEAD changes, so cached answers about a directory can be
+validated without waiting for their TTL
+"""
+
+import ctypes
+import ctypes.util
+import hashlib
+import os
+import struct
+import sys
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Set, Tuple
+
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_IGNORED = 0x00008000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+              IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class _Inotify:
+    """Minimal ctypes binding for inotify with a reader thread"""
+
+    def __init__(self, on_event):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+        self._add = libc.inotify_add_watch
+        self._add.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._rm = libc.inotify_rm_watch
+        self._rm.argtypes = [ctypes.c_int, ctypes.c_int]
+
+        self.fd = libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+
+        self._on_event = on_event
+        self._thread = threading.Thread(target=self._read_loop, name='vibeos-inotify', daemon=True)
+        self._thread.start()
+
+    def add_watch(self, path: str) -> int:
+        wd = self._add(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f'inotify_add_watch failed for {path}')
+        return wd
+
+    def rm_watch(self, wd: int) -> None:
+        self._rm(self.fd, wd)
+
+    def _read_loop(self) -> None:
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except OSError:
+                return
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size + length
+                self._on_event(wd, mask)
+
+
+class DirectoryFingerprinter:
+    """
+    Computes cheap fingerprints of a working directory.
+
+    The fingerprint combines the mtime of the directory itself (entries
+    added, removed or renamed), the mtime of the enclosing repository's git
+    index and the commit HEAD points at. On Linux each fingerprinted
+    directory is watched with inotify and its fingerprint is memoized until
+    an event arrives, so a lookup is a dictionary read; elsewhere the few
+    stat calls are repeated on every lookup.
+    """
+
+    MAX_WATCHED = 64
+
+    def __init__(self, use_inotify: bool = True):
+        self._lock = threading.Lock()
+        # directory -> memoized fingerprint (None once invalidated)
+        self._fingerprints: 'OrderedDict[str, Optional[str]]' = OrderedDict()
+        # directory -> event generation, bumped by every inotify event
+        self._generations: Dict[str, int] = {}
+        self._dir_wds: Dict[str, Tuple[int, ...]] = {}
+        # a .git directory is shared by every working directory below it
+        self._wd_dirs: Dict[int, Set[str]] = {}
+        self._inotify: Optional[_Inotify] = None
+
+        if use_inotify and sys.platform.startswith('linux'):
+            try:
+                self._inotify = _Inotify(self._on_event)
+            except (OSError, AttributeError):
+                self._inotify = None
+
+        self.lookups = 0
+        self.computed = 0
+        self.invalidations = 0
+
+    @property
+    def watching(self) -> bool:
+        return self._inotify is not None
+
+    def fingerprint(self, directory: str) -> str:
+        """Return the current fingerprint of a directory"""
+        self.lookups += 1
+        if self._inotify is None:
+            return self._compute(directory, self._find_git_dir(directory))
+
+        git_dir = None
+        with self._lock:
+            fingerprint = self._fingerprints.get(directory)
+            if fingerprint is not None:
+                self._fingerprints.move_to_end(directory)
+                return fingerprint
+            if directory not in self._dir_wds:
+                # Watch before computing so no change can slip in between
+                git_dir = self._find_git_dir(directory)
+                self._watch(directory, self._watch_paths(directory, git_dir))
+            generation = self._generations.get(directory, 0)
+
+        fingerprint = self._compute(directory, git_dir or self._find_git_dir(directory))
+
+        with self._lock:
+            # Only memoize when no event raced with the computation
+            if directory in self._dir_wds and self._generations.get(directory, 0) == generation:
+                self._fingerprints[directory] = fingerprint
+                self._fingerprints.move_to_end(directory)
+        return fingerprint
+
+    def _compute(self, directory: str, git_dir: Optional[Path]) -> str:
+        self.computed += 1
+        parts = [directory, self._mtime(directory)]
+        if git_dir is not None:
+            parts.append(self._mtime(git_dir / 'index'))
+            parts.append(self._read_head(git_dir))
+
+        digest = hashlib.blake2b('\0'.join(parts).encode('utf-8', 'surrogateescape'), digest_size=8)
+        return digest.hexdigest()
+
+    def _watch_paths(self, directory: str, git_dir: Optional[Path]) -> Tuple[str, ...]:
+        """The directory, its .git directory and the directory of the ref HEAD points at"""
+        paths = [directory]
+        if git_dir is not None:
+            paths.append(str(git_dir))
+            try:
+                head = (git_dir / 'HEAD').read_text().strip()
+            except OSError:
+                head = ''
+            if head.startswith('ref: '):
+                ref_dir = (git_dir / head[5:]).parent
+                if ref_dir.is_dir():
+                    paths.append(str(ref_dir))
+        return tuple(paths)
+
+    @staticmethod
+    def _mtime(path) -> str:
+        try:
+            return str(os.stat(path).st_mtime_ns)
+        except OSError:
+            return '-'
+
+    @staticmethod
+    def _find_git_dir(directory: str) -> Optional[Path]:
+        path = Path(directory)
+        for candidate in (path, *path.parents):
+            git_dir = candidate / '.git'
+            if git_dir.is_dir():
+                return git_dir
+        return None
+
+    @staticmethod
+    def _read_head(git_dir: Path) -> str:
+        """Resolve HEAD to a commit id (or the symbolic ref when unresolvable)"""
+        try:
+            head = (git_dir / 'HEAD').read_text().strip()
+        except OSError:
+            return '-'
+        if not head.startswith('ref: '):
+            return head
+        ref = head[5:]
+        try:
+            return (git_dir / ref).read_text().strip()
+        except OSError:
+            return head
+
+    def _watch(self, directory: str, paths: Tuple[str, ...]) -> None:
+        wds = []
+        try:
+            for path in paths:
+                wd = self._inotify.add_watch(path)
+                self._wd_dirs.setdefault(wd, set()).add(directory)
+                wds.append(wd)
+        except OSError:
+            # Out of watches or unreadable: this directory is recomputed each time
+            for wd in wds:
+                self._release(wd, directory)
+            return
+        self._dir_wds[directory] = tuple(wds)
+
+        while len(self._dir_wds) > self.MAX_WATCHED:
+            oldest = next(iter(self._fingerprints), None) or next(iter(self._dir_wds))
+            self._forget(oldest)
+
+    def _forget(self, directory: str) -> None:
+        self._fingerprints.pop(directory, None)
+        self._generations.pop(directory, None)
+        for wd in self._dir_wds.pop(directory, ()):
+            self._release(wd, directory)
+
+    def _release(self, wd: int, directory: str) -> None:
+        directories = self._wd_dirs.get(wd)
+        if directories is None:
+            return
+        directories.discard(directory)
+        if not directories:
+            del self._wd_dirs[wd]
+            self._inotify.rm_watch(wd)
+
+    def _on_event(self, wd: int, mask: int) -> None:
+        with self._lock:
+            for directory in tuple(self._wd_dirs.get(wd, ())):
+                self._generations[directory] = self._generations.get(directory, 0) + 1
+                if self._fingerprints.pop(directory, None) is not None:
+                    self.invalidations += 1
+                if mask & IN_IGNORED:
+                    # The kernel dropped the watch (directory deleted or unmounted)
+                    self._wd_dirs.pop(wd, None)
+                    self._dir_wds[directory] = tuple(w for w in self._dir_wds.get(directory, ()) if w != wd)
+                    self._forget(directory)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'inotify': self.watching,
+            'watched_directories': len(self._dir_wds),
+            'lookups': self.lookups,
+            'computed': self.computed,
+            'invalidations': self.invalidations,
+        }
+
+
+_fingerprinter: Optional[DirectoryFingerprinter] = None
+_fingerprinter_lock = threading.Lock()
+
+
+def get_fingerprinter() -> DirectoryFingerprinter:
+    """Process-wide fingerprinter shared by all parsers"""
+    global _fingerprinter
+    with _fingerprinter_lock:
+        if _fingerprinter is None:
+            _fingerprinter = DirectoryFingerprinter()
+        return _fingerprinter
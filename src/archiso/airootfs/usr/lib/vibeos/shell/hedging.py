@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Hedged requests for VibeOS Shell
+When a query has shown no output by the time most queries already have, a
+second identical query is started; whichever produces output first is kept
+and the other is cancelled
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+try:
+    from .tracing import get_tracer, percentile
+except ImportError:
+    from tracing import get_tracer, percentile
+
+DEFAULT_PERCENTILE = 0.95
+DEFAULT_INITIAL_DELAY = 8.0
+DEFAULT_MIN_DELAY = 1.0
+DEFAULT_MIN_SAMPLES = 20
+DEFAULT_MAX_EXTRA_LOAD = 0.1
+LATENCY_SAMPLES = 256
+
+# A racer is started with a claim callback and returns its future and a way
+# to cancel it. The callback is called on every output the racer produces
+# and returns False once another racer has won; the racer then discards
+# its output
+Claim = Callable[[], bool]
+Racer = Tuple[Future, Callable[[], None]]
+
+
+class _Race:
+    """Which racer produced output (or finished successfully) first"""
+
+    __slots__ = ('cond', 'winner', 'finished', 'started', 'latency')
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.winner: Optional[int] = None
+        self.finished = 0
+        self.started: List[float] = []
+        self.latency: Optional[float] = None
+
+    def claim(self, index: int) -> bool:
+        with self.cond:
+            if self.winner is None:
+                self.winner = index
+                self.latency = time.monotonic() - self.started[index]
+                self.cond.notify_all()
+            return self.winner == index
+
+    def finish(self, index: int, future: Future) -> None:
+        # A racer that fails without output does not win; the others keep going
+        succeeded = not future.cancelled() and future.exception() is None
+        with self.cond:
+            self.finished += 1
+            if succeeded and self.winner is None:
+                self.winner = index
+                self.latency = time.monotonic() - self.started[index]
+            self.cond.notify_all()
+
+    def wait(self, racers: int, timeout: Optional[float]) -> bool:
+        """True once there is a winner or every racer has finished"""
+        with self.cond:
+            return self.cond.wait_for(lambda: self.winner is not None or self.finished >= racers, timeout)
+
+
+class Hedger:
+    """
+    Races a hedge against queries that are slow to show output.
+
+    The hedge threshold is the configured percentile of recent time-to-
+    first-output latencies (initial_delay until min_samples are known, never
+    below min_delay). Hedges are capped at max_extra_load times the number
+    of requests, so a backend that is slow for everyone is not sent twice
+    the traffic.
+    """
+
+    def __init__(self, fraction: float = DEFAULT_PERCENTILE, initial_delay: float = DEFAULT_INITIAL_DELAY,
+                 min_delay: float = DEFAULT_MIN_DELAY, min_samples: int = DEFAULT_MIN_SAMPLES,
+                 max_extra_load: float = DEFAULT_MAX_EXTRA_LOAD, debug_mode: bool = False):
+        self.fraction = min(max(fraction, 0.5), 0.999)
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.min_samples = max(1, min_samples)
+        self.max_extra_load = max(0.0, max_extra_load)
+        self.debug_mode = debug_mode
+
+        self._lock = threading.Lock()
+        self._latencies: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.primary_wins = 0
+        self.throttled = 0
+
+    @classmethod
+    def from_config(cls, claude_config: Dict[str, Any], debug_mode: bool = False) -> Optional['Hedger']:
+        """Hedger for the claude_code section of claude_config.json; None when disabled"""
+        if not claude_config.get('hedge_requests', False):
+            return None
+        return cls(
+            fraction=claude_config.get('hedge_percentile', DEFAULT_PERCENTILE),
+            initial_delay=claude_config.get('hedge_initial_delay', DEFAULT_INITIAL_DELAY),
+            min_delay=claude_config.get('hedge_min_delay', DEFAULT_MIN_DELAY),
+            min_samples=claude_config.get('hedge_min_samples', DEFAULT_MIN_SAMPLES),
+            max_extra_load=claude_config.get('hedge_max_extra_load', DEFAULT_MAX_EXTRA_LOAD),
+            debug_mode=debug_mode,
+        )
+
+    # ------------------------------------------------------------------ public
+
+    def threshold(self) -> float:
+        """Seconds without output after which a hedge is sent"""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return max(self.initial_delay, self.min_delay)
+            samples = sorted(self._latencies)
+        return max(percentile(samples, self.fraction), self.min_delay)
+
+    def race(self, primary: Callable[[Claim], Racer], hedge: Callable[[Claim], Racer],
+             timeout: Optional[float] = None) -> Tuple[Future, bool]:
+        """
+        Run primary, and hedge as well if primary is slow to show output.
+
+        Returns the winner's future and whether it was the hedge. Losers are
+        cancelled. If nothing has won by timeout the primary's future is
+        returned for the caller's own deadline handling.
+        """
+        race = _Race()
+        racers: List[Racer] = []
+        started = time.monotonic()
+        with self._lock:
+            self.requests += 1
+        try:
+            racers.append(self._start(race, 0, primary))
+            delay = self.threshold()
+            if timeout is not None:
+                delay = min(delay, timeout)
+            if not race.wait(1, delay) and self._allow_hedge():
+                if self.debug_mode:
+                    print(f"[DEBUG] No output after {delay:.1f}s, sending a hedged request")
+                with get_tracer().span('hedge', threshold=round(delay, 3)):
+                    racers.append(self._start(race, 1, hedge))
+                remaining = None if timeout is None else max(0.0, started + timeout - time.monotonic())
+                race.wait(2, remaining)
+            else:
+                remaining = None if timeout is None else max(0.0, started + timeout - time.monotonic())
+                race.wait(1, remaining)
+        except BaseException:
+            # Ctrl+C while racing: stop every racer
+            for _, cancel in racers:
+                cancel()
+            raise
+
+        winner = race.winner if race.winner is not None else 0
+        for index, (_, cancel) in enumerate(racers):
+            if index != winner:
+                cancel()
+        with self._lock:
+            if race.latency is not None:
+                self._latencies.append(race.latency)
+            if len(racers) > 1:
+                if winner == 1:
+                    self.hedge_wins += 1
+                else:
+                    self.primary_wins += 1
+        if self.debug_mode and len(racers) > 1:
+            print(f"[DEBUG] Hedged request won by the {'hedge' if winner else 'primary'}")
+        return racers[winner][0], winner == 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            samples = sorted(self._latencies)
+        return {
+            'requests': self.requests,
+            'hedged': self.hedged,
+            'hedge_wins': self.hedge_wins,
+            'primary_wins': self.primary_wins,
+            'throttled': self.throttled,
+            'extra_load': round(self.hedged / self.requests, 3) if self.requests else 0.0,
+            'threshold_ms': round(self.threshold() * 1000, 1),
+            'first_output_ms': {
+                'p50': round(percentile(samples, 0.5) * 1000, 1),
+                'p99': round(percentile(samples, 0.99) * 1000, 1),
+            },
+        }
+
+    # ----------------------------------------------------------------- internal
+
+    def _allow_hedge(self) -> bool:
+        with self._lock:
+            if self.hedged >= self.max_extra_load * self.requests:
+                self.throttled += 1
+                return False
+            self.hedged += 1
+            return True
+
+    @staticmethod
+    def _start(race: _Race, index: int, start: Callable[[Claim], Racer]) -> Racer:
+        race.started.append(time.monotonic())
+        future, cancel = start(lambda: race.claim(index))
+        future.add_done_callback(lambda f: race.finish(index, f))
+        return future, cancel
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Adaptive timeouts for VibeOS Shell
+Keeps a streaming quantile sketch of Claude latency per request class and
+derives deadlines and retry budgets from it (p99 x factor, clamped), so a
+quick question is not given minutes and an agent task is not cut off;
+the sketches are persisted across restarts
+"""
+
+import atexit
+import json
+import math
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+try:
+    from .response_cache import default_cache_dir
+except ImportError:
+    from response_cache import default_cache_dir
+
+DEFAULT_ACCURACY = 0.02
+DEFAULT_MAX_COUNT = 2000
+DEFAULT_QUANTILE = 0.99
+DEFAULT_FACTOR = 1.5
+DEFAULT_FLOOR = 5.0
+DEFAULT_CEILING = 300.0
+DEFAULT_MIN_SAMPLES = 20
+DEFAULT_BUDGET_FACTOR = 2.0
+SAVE_EVERY = 10
+MIN_LATENCY = 0.001
+
+# Request classes
+QUERY = 'query'      # questions and lookups, usually a single turn
+AGENT = 'agent'      # requests that make Claude act: several tool turns
+COMMAND = 'command'  # legacy parser: translate a request into one command
+
+_AGENT_REQUEST = re.compile(
+    r"\b(?:create|make|build|install|set ?up|configure|fix|refactor|write|implement|generate|"
+    r"update|upgrade|migrate|deploy|convert|rename|organi[sz]e|clean ?up|add|remove|delete)\b",
+    re.IGNORECASE)
+
+
+def classify_request(text: str) -> str:
+    """Latency class of an SDK request"""
+    if len(text) > 200 or _AGENT_REQUEST.search(text):
+        return AGENT
+    return QUERY
+
+
+class QuantileSketch:
+    """
+    Streaming quantile sketch with bounded relative error.
+
+    Values are counted in logarithmic buckets (value in (gamma**(k-1),
+    gamma**k]), so any quantile is known within +-accuracy of its true value
+    using a few dozen buckets, whatever the number of samples. Once the
+    count passes max_count every bucket is halved, which makes old samples
+    fade and lets the sketch follow a changing backend.
+    """
+
+    __slots__ = ('accuracy', 'max_count', 'gamma', '_log_gamma', 'buckets', 'count', 'samples')
+
+    def __init__(self, accuracy: float = DEFAULT_ACCURACY, max_count: int = DEFAULT_MAX_COUNT):
+        self.accuracy = accuracy
+        self.max_count = max_count
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets: Dict[int, float] = {}
+        self.count = 0.0    # decayed weight
+        self.samples = 0    # values ever added
+
+    def add(self, value: float) -> None:
+        key = math.ceil(math.log(max(value, MIN_LATENCY)) / self._log_gamma)
+        self.buckets[key] = self.buckets.get(key, 0.0) + 1.0
+        self.count += 1.0
+        self.samples += 1
+        if self.count > self.max_count:
+            self._decay()
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.buckets:
+            return None
+        # Nearest rank: the first bucket holding the q * count-th value
+        rank = q * self.count
+        seen = 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen >= rank:
+                break
+        # Midpoint of the bucket in relative terms
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def _decay(self) -> None:
+        self.buckets = {key: weight / 2 for key, weight in self.buckets.items() if weight >= 0.5}
+        self.count = sum(self.buckets.values())
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'accuracy': self.accuracy,
+            'samples': self.samples,
+            'buckets': {str(key): round(weight, 3) for key, weight in self.buckets.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], max_count: int = DEFAULT_MAX_COUNT) -> 'QuantileSketch':
+        sketch = cls(data.get('accuracy', DEFAULT_ACCURACY), max_count)
+        sketch.buckets = {int(key): float(weight) for key, weight in data.get('buckets', {}).items()}
+        sketch.count = sum(sketch.buckets.values())
+        sketch.samples = int(data.get('samples', 0))
+        return sketch
+
+
+class LatencyModel:
+    """
+    Latency sketches per request class, and the deadlines derived from them.
+
+    deadline() is quantile x factor clamped to [floor, ceiling]; until a
+    class has min_samples the configured fixed timeout is used. Requests
+    that time out are recorded at their deadline, so a deadline that is
+    too short keeps growing until requests fit. The sketches are loaded
+    from and saved to a JSON file in the user cache; a save only rewrites
+    the classes this process recorded, so shells sharing the file do not
+    erase each other's classes.
+    """
+
+    def __init__(self, path: Optional[Path] = None, quantile: float = DEFAULT_QUANTILE,
+                 factor: float = DEFAULT_FACTOR, floor: float = DEFAULT_FLOOR, ceiling: float = DEFAULT_CEILING,
+                 min_samples: int = DEFAULT_MIN_SAMPLES, budget_factor: float = DEFAULT_BUDGET_FACTOR,
+                 debug_mode: bool = False):
+        self.path = Path(path) if path else default_cache_dir() / 'latency.json'
+        self.quantile = quantile
+        self.factor = factor
+        self.floor = floor
+        self.ceiling = max(floor, ceiling)
+        self.min_samples = max(1, min_samples)
+        self.budget_factor = budget_factor
+        self.debug_mode = debug_mode
+
+        self._lock = threading.Lock()
+        self._sketches: Optional[Dict[str, QuantileSketch]] = None
+        self._dirty = set()
+        self._unsaved = 0
+        self._atexit_registered = False
+
+        self.timeouts: Dict[str, int] = {}
+
+    @classmethod
+    def from_config(cls, claude_config: Dict[str, Any], debug_mode: bool = False) -> Optional['LatencyModel']:
+        """Model for the claude_code section of claude_config.json; None when disabled"""
+        if not claude_config.get('adaptive_timeouts', True):
+            return None
+        return cls(
+            quantile=claude_config.get('timeout_quantile', DEFAULT_QUANTILE),
+            factor=claude_config.get('timeout_factor', DEFAULT_FACTOR),
+            floor=claude_config.get('timeout_floor', DEFAULT_FLOOR),
+            ceiling=claude_config.get('timeout_ceiling', DEFAULT_CEILING),
+            min_samples=claude_config.get('timeout_min_samples', DEFAULT_MIN_SAMPLES),
+            budget_factor=claude_config.get('retry_budget_factor', DEFAULT_BUDGET_FACTOR),
+            debug_mode=debug_mode,
+        )
+
+    # ------------------------------------------------------------------ public
+
+    def deadline(self, request_class: str, fallback: float) -> float:
+        """Seconds a request of this class may take; fallback until enough is known"""
+        with self._lock:
+            sketch = self._load().get(request_class)
+            if sketch is None or sketch.count < self.min_samples:
+                return fallback
+            learned = sketch.quantile(self.quantile) * self.factor
+        return min(self.ceiling, max(self.floor, learned))
+
+    def budget(self, request_class: str, fallback: Optional[float]) -> Optional[float]:
+        """Total seconds for a request including retries; fallback until enough is known"""
+        with self._lock:
+            sketch = self._load().get(request_class)
+            known = sketch is not None and sketch.count >= self.min_samples
+        if not known:
+            return fallback
+        return self.deadline(request_class, 0.0) * self.budget_factor
+
+    def record(self, request_class: str, seconds: float, timed_out: bool = False) -> None:
+        """Add the latency of a finished request (or the deadline it hit)"""
+        with self._lock:
+            sketches = self._load()
+            sketch = sketches.get(request_class)
+            if sketch is None:
+                sketch = sketches[request_class] = QuantileSketch()
+            sketch.add(seconds)
+            if timed_out:
+                self.timeouts[request_class] = self.timeouts.get(request_class, 0) + 1
+            self._dirty.add(request_class)
+            self._unsaved += 1
+            save = self._unsaved >= SAVE_EVERY
+            if not self._atexit_registered:
+                atexit.register(self.save)
+                self._atexit_registered = True
+        if save:
+            self.save()
+
+    def save(self) -> None:
+        """Write the classes recorded by this process to the shared file"""
+        with self._lock:
+            if not self._dirty or self._sketches is None:
+                return
+            ours = {name: self._sketches[name].as_dict() for name in self._dirty}
+            self._dirty = set()
+            self._unsaved = 0
+        data = self._read()
+        data.update(ours)
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(f'.{os.getpid()}.tmp')
+            with open(tmp, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            if self.debug_mode:
+                print(f"[DEBUG] Could not save latency model: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            sketches = dict(self._load())
+        stats: Dict[str, Any] = {}
+        for name, sketch in sorted(sketches.items()):
+            p50, p99 = sketch.quantile(0.5), sketch.quantile(0.99)
+            stats[name] = {
+                'samples': sketch.samples,
+                'p50': round(p50, 2) if p50 is not None else None,
+                'p99': round(p99, 2) if p99 is not None else None,
+                'learned': sketch.count >= self.min_samples,
+                'timeouts': self.timeouts.get(name, 0),
+            }
+        return stats
+
+    # ----------------------------------------------------------------- internal
+
+    def _load(self) -> Dict[str, QuantileSketch]:
+        """Called with the lock held; reads the file on first use"""
+        if self._sketches is None:
+            self._sketches = {}
+            for name, data in self._read().items():
+                try:
+                    self._sketches[name] = QuantileSketch.from_dict(data)
+                except (AttributeError, TypeError, ValueError):
+                    continue
+        return self._sketches
+
+    def _read(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
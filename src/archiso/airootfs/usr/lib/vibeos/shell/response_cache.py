@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Response cache for VibeOS Shell parsers
+Bounded in-memory LRU cache with per-entry TTL and size accounting, backed
+by an optional SQLite store shared by every vibesh process of the user
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 1024 * 1024
+DEFAULT_TTL = 3600
+DEFAULT_DISK_MAX_ENTRIES = 5000
+
+
+def default_cache_dir() -> Path:
+    """Per-user VibeOS cache directory ($XDG_CACHE_HOME/vibeos)"""
+    base = os.environ.get('XDG_CACHE_HOME') or str(Path.home() / '.cache')
+    return Path(base) / 'vibeos'
+
+
+class DiskCacheStore:
+    """
+    Persistent response store in a SQLite database running in WAL mode.
+
+    WAL lets any number of vibesh processes read while one writes, so every
+    TTY and terminal shares one warm cache that survives restarts. The
+    database is opened lazily on first use, and expired or least recently
+    used rows are compacted away every few writes. Any SQLite failure
+    disables the store for the rest of the process instead of breaking
+    the shell.
+    """
+
+    COMPACT_EVERY = 100
+    SCHEMA_VERSION = 2
+
+    def __init__(self, namespace: str, path: Optional[Path] = None,
+                 max_entries: int = DEFAULT_DISK_MAX_ENTRIES, debug_mode: bool = False):
+        self.namespace = namespace
+        self.path = Path(path) if path else default_cache_dir() / 'responses.sqlite3'
+        self.max_entries = max(1, int(max_entries))
+        self.debug_mode = debug_mode
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._disabled = False
+        self._writes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.compactions = 0
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if self._conn is not None or self._disabled:
+            return self._conn
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=5.0, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute('PRAGMA busy_timeout=5000')
+            # auto_vacuum only takes effect before the first table is created
+            conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS responses ('
+                ' namespace TEXT NOT NULL,'
+                ' key TEXT NOT NULL,'
+                ' value TEXT NOT NULL,'
+                ' expires_at REAL NOT NULL,'
+                ' accessed_at REAL NOT NULL,'
+                ' fingerprint TEXT,'
+                ' PRIMARY KEY (namespace, key)'
+                ') WITHOUT ROWID'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (namespace, accessed_at)')
+            self._migrate(conn)
+            self._conn = conn
+        except (sqlite3.Error, OSError) as e:
+            self._fail(e)
+        return self._conn
+
+    def _migrate(self, conn: sqlite3.Connection) -> None:
+        """Upgrade databases created by older vibesh versions"""
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        if version >= self.SCHEMA_VERSION:
+            return
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(responses)')}
+        if 'fingerprint' not in columns:
+            conn.execute('ALTER TABLE responses ADD COLUMN fingerprint TEXT')
+        conn.execute(f'PRAGMA user_version={self.SCHEMA_VERSION}')
+
+    def _fail(self, error: Exception) -> None:
+        if self.debug_mode:
+            print(f"[DEBUG] Disk cache disabled ({self.path}): {error}")
+        self._disabled = True
+        self._conn = None
+
+    def get(self, key: str) -> Optional[Tuple[str, float, Optional[str]]]:
+        """Return (value, expires_at, fingerprint) for a live entry, or None"""
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return None
+            now = time.time()
+            try:
+                row = conn.execute(
+                    'SELECT value, expires_at, fingerprint FROM responses WHERE namespace = ? AND key = ?',
+                    (self.namespace, key)
+                ).fetchone()
+                if row is None or row[1] <= now:
+                    self.misses += 1
+                    return None
+                conn.execute(
+                    'UPDATE responses SET accessed_at = ? WHERE namespace = ? AND key = ?',
+                    (now, self.namespace, key)
+                )
+            except sqlite3.Error as e:
+                self._fail(e)
+                return None
+            self.hits += 1
+            return row[0], row[1], row[2]
+
+    def put(self, key: str, value: str, expires_at: float, fingerprint: Optional[str] = None) -> None:
+        """Insert or replace an entry; compacts the store every COMPACT_EVERY writes"""
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            try:
+                conn.execute(
+                    'INSERT OR REPLACE INTO responses'
+                    ' (namespace, key, value, expires_at, accessed_at, fingerprint)'
+                    ' VALUES (?, ?, ?, ?, ?, ?)',
+                    (self.namespace, key, value, expires_at, time.time(), fingerprint)
+                )
+                self._writes += 1
+                if self._writes % self.COMPACT_EVERY == 0:
+                    self._compact(conn)
+            except sqlite3.Error as e:
+                self._fail(e)
+
+    def compact(self) -> None:
+        """Drop expired and least recently used rows and return free pages"""
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            try:
+                self._compact(conn)
+            except sqlite3.Error as e:
+                self._fail(e)
+
+    def _compact(self, conn: sqlite3.Connection) -> None:
+        conn.execute('DELETE FROM responses WHERE expires_at <= ?', (time.time(),))
+        conn.execute(
+            'DELETE FROM responses WHERE namespace = ? AND key IN ('
+            ' SELECT key FROM responses WHERE namespace = ?'
+            ' ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)',
+            (self.namespace, self.namespace, self.max_entries)
+        )
+        conn.execute('PRAGMA incremental_vacuum')
+        conn.execute('PRAGMA wal_checkpoint(PASSIVE)')
+        self.compactions += 1
+
+    def delete(self, key: str) -> None:
+        """Remove one entry"""
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            try:
+                conn.execute('DELETE FROM responses WHERE namespace = ? AND key = ?', (self.namespace, key))
+            except sqlite3.Error as e:
+                self._fail(e)
+
+    def clear(self) -> None:
+        """Delete every entry of this namespace"""
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            try:
+                conn.execute('DELETE FROM responses WHERE namespace = ?', (self.namespace,))
+            except sqlite3.Error as e:
+                self._fail(e)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'path': str(self.path),
+            'namespace': self.namespace,
+            'open': self._conn is not None,
+            'disabled': self._disabled,
+            'hits': self.hits,
+            'misses': self.misses,
+            'compactions': self.compactions,
+        }
+
+
+class ResponseCache:
+    """
+    LRU cache of parser responses bounded by entry count and byte size.
+
+    Every entry carries its own expiry time; expired entries are dropped on
+    access. Entries may also record the fingerprint of the directory they
+    describe, and are dropped when looked up with a different one. When
+    either bound is exceeded the least recently used entries are evicted
+    first.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES,
+                 ttl: float = DEFAULT_TTL, store: Optional[DiskCacheStore] = None):
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = max(1, int(max_bytes))
+        self.ttl = ttl
+        self.store = store
+
+        # key -> (value, expires_at, size, fingerprint)
+        self._entries: 'OrderedDict[str, Tuple[str, float, int, Optional[str]]]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_config(cls, claude_config: Dict[str, Any], namespace: str,
+                    debug_mode: bool = False) -> 'ResponseCache':
+        """Build a cache from the claude_code section of claude_config.json"""
+        store = None
+        if claude_config.get('cache_persistent', True):
+            store = DiskCacheStore(
+                namespace,
+                max_entries=claude_config.get('cache_disk_max_entries', DEFAULT_DISK_MAX_ENTRIES),
+                debug_mode=debug_mode,
+            )
+        return cls(
+            max_entries=claude_config.get('cache_max_entries', DEFAULT_MAX_ENTRIES),
+            max_bytes=claude_config.get('cache_max_bytes', DEFAULT_MAX_BYTES),
+            ttl=claude_config.get('cache_ttl', DEFAULT_TTL),
+            store=store,
+        )
+
+    @staticmethod
+    def _entry_size(key: str, value: str) -> int:
+        return sys.getsizeof(key) + sys.getsizeof(value)
+
+    @staticmethod
+    def _stale(stored: Optional[str], current: Optional[str]) -> bool:
+        return stored is not None and current is not None and stored != current
+
+    def get(self, key: str, fingerprint: Optional[str] = None) -> Optional[str]:
+        """
+        Return the cached value, or None on a miss.
+
+        Expired entries and entries recorded with a fingerprint other than
+        the given one count as misses and are removed.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at, size, stored_fingerprint = entry
+                if self._stale(stored_fingerprint, fingerprint):
+                    # The persisted copy carries the same fingerprint
+                    self._remove(key)
+                    self.invalidations += 1
+                    self.misses += 1
+                    if self.store is not None:
+                        self.store.delete(key)
+                    return None
+                elif expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                else:
+                    self._remove(key)
+                    self.expirations += 1
+
+        # Fall back to the shared on-disk store and promote what it returns
+        if self.store is not None:
+            stored = self.store.get(key)
+            if stored is not None:
+                value, expires_at, stored_fingerprint = stored
+                if self._stale(stored_fingerprint, fingerprint):
+                    self.store.delete(key)
+                    with self._lock:
+                        self.invalidations += 1
+                else:
+                    self.put(key, value, ttl=expires_at - time.time(),
+                             fingerprint=stored_fingerprint, persist=False)
+                    with self._lock:
+                        self.hits += 1
+                    return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, value: str, ttl: Optional[float] = None, fingerprint: Optional[str] = None,
+            persist: bool = True) -> None:
+        """Store a value, evicting least recently used entries to stay in bounds"""
+        ttl = self.ttl if ttl is None else ttl
+        if persist and self.store is not None:
+            self.store.put(key, value, time.time() + ttl, fingerprint)
+
+        size = self._entry_size(key, value)
+        if size > self.max_bytes:
+            return
+
+        expires_at = time.monotonic() + ttl
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, expires_at, size, fingerprint)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        size = self._entries.pop(key)[2]
+        self._bytes -= size
+
+    def clear(self) -> None:
+        """Drop all entries, including persisted ones (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self.store is not None:
+            self.store.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Size, bounds and hit/miss/eviction counters"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+            'disk': self.store.get_stats() if self.store is not None else None,
+        }
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Span tracing for VibeOS Shell requests
+Set VIBEOS_TRACE=1 to record how long each stage of a request takes. Spans
+are written as Chrome trace events (open the file in chrome://tracing or
+Perfetto) and summarized in memory as p50/p95/p99 per stage.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+try:
+    from .response_cache import default_cache_dir
+except ImportError:
+    from response_cache import default_cache_dir
+
+
+SUMMARY_WINDOW = 1000
+
+
+def now_us() -> int:
+    """Monotonic timestamp in microseconds, the unit of trace events"""
+    return time.perf_counter_ns() // 1000
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Tracer:
+    """
+    Records spans as Chrome trace-event JSON and keeps per-stage latencies.
+
+    Events are appended to the trace file as they complete using the JSON
+    array format, which trace viewers accept without a closing bracket, so
+    the file stays readable even if the shell is killed. When disabled every
+    method is a cheap no-op.
+    """
+
+    def __init__(self, enabled: bool = False, path: Optional[Path] = None):
+        self.enabled = enabled
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+        self._pid = os.getpid()
+        self._durations: Dict[str, Deque[float]] = {}
+
+    @classmethod
+    def from_env(cls) -> 'Tracer':
+        """Enabled by VIBEOS_TRACE; VIBEOS_TRACE_FILE overrides the output path"""
+        enabled = os.environ.get('VIBEOS_TRACE', '').lower() in ('1', 'true', 'yes', 'on')
+        if not enabled:
+            return cls(False)
+        path = os.environ.get('VIBEOS_TRACE_FILE')
+        if not path:
+            stamp = time.strftime('%Y%m%d-%H%M%S')
+            path = default_cache_dir() / 'traces' / f"vibesh-{stamp}-{os.getpid()}.json"
+        return cls(True, Path(path))
+
+    @contextmanager
+    def span(self, name: str, **args: Any) -> Iterator[Dict[str, Any]]:
+        """Time a block; the yielded dict can be filled with extra arguments"""
+        if not self.enabled:
+            yield args
+            return
+        start = now_us()
+        try:
+            yield args
+        finally:
+            self.record(name, start, now_us(), **args)
+
+    def record(self, name: str, start_us: int, end_us: int, **args: Any) -> None:
+        """Record a span measured by the caller (e.g. across callbacks)"""
+        if not self.enabled:
+            return
+        duration = max(0, end_us - start_us)
+        event = {'name': name, 'ph': 'X', 'ts': start_us, 'dur': duration,
+                 'pid': self._pid, 'tid': threading.get_ident()}
+        if args:
+            event['args'] = {key: value if isinstance(value, (int, float, bool)) or value is None else str(value)
+                             for key, value in args.items()}
+        with self._lock:
+            window = self._durations.get(name)
+            if window is None:
+                window = self._durations[name] = deque(maxlen=SUMMARY_WINDOW)
+            window.append(duration / 1000.0)
+            self._write(event)
+
+    def _write(self, event: Dict[str, Any]) -> None:
+        try:
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.path, 'w')
+                self._file.write('[\n')
+                atexit.register(self.close)
+            self._file.write(json.dumps(event) + ',\n')
+            self._file.flush()
+        except OSError as e:
+            print(f"Warning: Tracing disabled, cannot write {self.path}: {e}")
+            self.enabled = False
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Latency percentiles in milliseconds per stage over the recent window"""
+        with self._lock:
+            windows = {name: sorted(values) for name, values in self._durations.items()}
+        return {
+            name: {
+                'count': len(values),
+                'p50': round(percentile(values, 0.50), 2),
+                'p95': round(percentile(values, 0.95), 2),
+                'p99': round(percentile(values, 0.99), 2),
+            }
+            for name, values in sorted(windows.items())
+        }
+
+    def format_summary(self) -> str:
+        lines = [f"{'stage':<32}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"]
+        for name, stats in self.summary().items():
+            lines.append(f"{name:<32}{stats['count']:>7}{stats['p50']:>10.1f}"
+                         f"{stats['p95']:>10.1f}{stats['p99']:>10.1f}")
+        return '\n'.join(lines)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                try:
+                    self._file.close()
+                except OSError:
+                    pass
+                self._file = None
+
+
+_tracer: Optional[Tracer] = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """Process-wide tracer configured from the environment"""
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = Tracer.from_env()
+        return _tracer
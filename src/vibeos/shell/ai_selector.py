@@ -13,6 +13,11 @@ import re
 from pathlib import Path
 from typing import Optional, Dict, Any
 
+try:
+    from .claude_cli import get_cli_discovery
+except ImportError:
+    from claude_cli import get_cli_discovery
+
 
 class AIAssistantSelector:
     """Manages AI assistant selection and configuration"""
@@ -126,41 +131,9 @@ class AIAssistantSelector:
     
     def is_claude_code_installed(self) -> bool:
         """Check if Claude Code is installed"""
-        # First try direct binary check (more reliable)
-        possible_paths = [
-            "/usr/bin/claude-code",
-            "/usr/local/bin/claude-code",
-            "/opt/claude-code/bin/claude-code"
-        ]
-        
-        for path in possible_paths:
-            if Path(path).exists() and Path(path).is_file():
-                return True
-        
-        # Fallback to which command if available
-        try:
-            result = subprocess.run(
-                ["which", "claude-code"],
-                capture_output=True,
-                text=True,
-                timeout=2
-            )
-            return result.returncode == 0
-        except (FileNotFoundError, subprocess.TimeoutExpired):
-            # which command not available or timed out
-            pass
-        
-        # Last resort: try to run claude-code directly
-        try:
-            result = subprocess.run(
-                ["claude-code", "--version"],
-                capture_output=True,
-                text=True,
-                timeout=2
-            )
-            return result.returncode == 0
-        except (FileNotFoundError, subprocess.TimeoutExpired):
-            return False
+        # Shared in-process lookup: PATH, the known wrappers and the global
+        # node module, re-scanned only when one of those directories changes
+        return get_cli_discovery().available
     
     def is_claude_code_preinstalled(self) -> bool:
         """Check if Claude Code was pre-installed during ISO build"""
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Claude Code CLI discovery for VibeOS
+Resolves the CLI in-process (PATH scan, the VibeOS wrapper and the global
+node_modules package) instead of forking `which`, caches the answer until
+one of the searched directories changes, and probes the version at most
+once per boot
+"""
+
+import json
+import os
+import subprocess
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from .response_cache import default_cache_dir
+except ImportError:
+    from response_cache import default_cache_dir
+
+CLI_NAMES = ('claude-code', 'claude')
+# Wrappers created by customize_airootfs.sh and vibeos-install-claude
+WRAPPER_PATHS = (
+    '/usr/bin/claude-code',
+    '/usr/local/bin/claude-code',
+    '/opt/claude-code/bin/claude-code',
+)
+PACKAGE_NAME = '@anthropic-ai/claude-code'
+NODE_MODULES_DIRS = (
+    '/usr/lib/node_modules',
+    '/usr/local/lib/node_modules',
+    '~/.npm-global/lib/node_modules',
+)
+
+BOOT_ID_PATH = Path('/proc/sys/kernel/random/boot_id')
+RUN_CACHE_PATH = Path('/run/vibeos/claude-cli.json')
+VERSION_TIMEOUT = 5
+
+
+class ClaudeCLI:
+    """A resolved Claude Code installation"""
+
+    __slots__ = ('path', 'package_dir', 'source')
+
+    def __init__(self, path: Optional[str], package_dir: Optional[Path], source: str):
+        self.path = path                # executable, None when only the package was found
+        self.package_dir = package_dir  # node_modules/@anthropic-ai/claude-code, if known
+        self.source = source            # 'path', 'wrapper' or 'package'
+
+    @property
+    def script(self) -> Optional[Path]:
+        return self.package_dir / 'cli.js' if self.package_dir is not None else None
+
+    @property
+    def command(self) -> List[str]:
+        """argv prefix that runs the CLI"""
+        if self.path:
+            return [self.path]
+        return ['node', str(self.script)]
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'path': self.path,
+            'package_dir': str(self.package_dir) if self.package_dir else None,
+            'source': self.source,
+        }
+
+
+def _boot_id() -> str:
+    try:
+        return BOOT_ID_PATH.read_text().strip()
+    except OSError:
+        return ''
+
+
+def _mtime(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class ClaudeCLIDiscovery:
+    """
+    Finds the Claude Code CLI without spawning processes.
+
+    A lookup is cached together with the mtimes of every directory that was
+    searched; installing, removing or upgrading the CLI touches one of them,
+    so the next lookup rescans. Re-validating costs a dozen stat() calls.
+    The version is read from the package's package.json when possible and
+    otherwise probed with `--version`, once per boot: the result is stored
+    in /run (or the user cache, keyed by boot id) and shared across shells.
+    """
+
+    def __init__(self, cache_path: Optional[Path] = None):
+        self.cache_path = cache_path
+        self._lock = threading.Lock()
+        self._signature: Optional[Tuple] = None
+        self._cli: Optional[ClaudeCLI] = None
+        self._version: Optional[str] = None
+        self._version_key: Optional[str] = None
+
+        self.lookups = 0
+        self.scans = 0
+        self.version_probes = 0
+
+    # ------------------------------------------------------------------ public
+
+    def find(self) -> Optional[ClaudeCLI]:
+        """The installed CLI, or None"""
+        with self._lock:
+            self.lookups += 1
+            signature = self._current_signature()
+            if signature != self._signature:
+                self.scans += 1
+                self._cli = self._scan()
+                self._signature = signature
+            return self._cli
+
+    @property
+    def available(self) -> bool:
+        return self.find() is not None
+
+    def version(self) -> Optional[str]:
+        """CLI version string, probed at most once per boot per installation"""
+        cli = self.find()
+        if cli is None:
+            return None
+        key = self._version_cache_key(cli)
+        with self._lock:
+            if key == self._version_key:
+                return self._version
+            cached = self._read_version_cache(key)
+            if cached is not None:
+                version = cached.get('version')
+            else:
+                version = self._probe_version(cli)
+                self._write_version_cache({'key': key, 'version': version})
+            self._version, self._version_key = version, key
+            return version
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'cli': self._cli.as_dict() if self._cli else None,
+            'version': self._version,
+            'lookups': self.lookups,
+            'scans': self.scans,
+            'version_probes': self.version_probes,
+        }
+
+    # ----------------------------------------------------------------- internal
+
+    @staticmethod
+    def _search_dirs() -> List[str]:
+        dirs = [d for d in os.environ.get('PATH', '').split(os.pathsep) if d]
+        dirs.extend(os.path.dirname(p) for p in WRAPPER_PATHS)
+        for modules in NODE_MODULES_DIRS:
+            modules = os.path.expanduser(modules)
+            dirs.append(os.path.join(modules, PACKAGE_NAME))
+            dirs.append(os.path.join(modules, os.path.dirname(PACKAGE_NAME)))
+        return dirs
+
+    def _current_signature(self) -> Tuple:
+        return tuple((d, _mtime(d)) for d in self._search_dirs())
+
+    def _scan(self) -> Optional[ClaudeCLI]:
+        for directory in os.environ.get('PATH', '').split(os.pathsep):
+            for name in CLI_NAMES:
+                candidate = os.path.join(directory or '.', name)
+                if os.path.isfile(candidate) and os.access(candidate, os.X_OK):
+                    return ClaudeCLI(candidate, self._package_for(candidate), 'path')
+        for candidate in WRAPPER_PATHS:
+            if os.path.isfile(candidate) and os.access(candidate, os.X_OK):
+                return ClaudeCLI(candidate, self._package_for(candidate), 'wrapper')
+        package = self._installed_package()
+        if package is not None:
+            return ClaudeCLI(None, package, 'package')
+        return None
+
+    def _package_for(self, executable: str) -> Optional[Path]:
+        # npm links the command to <package>/cli.js; the VibeOS wrapper is a
+        # script that runs the globally installed package
+        target = Path(os.path.realpath(executable))
+        if target != Path(executable):
+            for directory in target.parents:
+                if (directory / 'package.json').is_file():
+                    return directory
+                if directory.name == 'node_modules':
+                    break
+        return self._installed_package()
+
+    @staticmethod
+    def _installed_package() -> Optional[Path]:
+        for modules in NODE_MODULES_DIRS:
+            package = Path(os.path.expanduser(modules)) / PACKAGE_NAME
+            if (package / 'cli.js').is_file():
+                return package
+        return None
+
+    @staticmethod
+    def _version_cache_key(cli: ClaudeCLI) -> str:
+        stamp = cli.script if cli.script is not None else Path(cli.path)
+        return f"{_boot_id()}:{cli.path or stamp}:{_mtime(str(stamp))}"
+
+    def _probe_version(self, cli: ClaudeCLI) -> Optional[str]:
+        self.version_probes += 1
+        if cli.package_dir is not None:
+            try:
+                with open(cli.package_dir / 'package.json', 'r') as f:
+                    version = json.load(f).get('version')
+                if version:
+                    return str(version)
+            except (OSError, ValueError):
+                pass
+        try:
+            result = subprocess.run(cli.command + ['--version'], capture_output=True,
+                                    text=True, timeout=VERSION_TIMEOUT)
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        if result.returncode != 0:
+            return None
+        return result.stdout.strip() or None
+
+    def _cache_paths(self) -> List[Path]:
+        if self.cache_path is not None:
+            return [self.cache_path]
+        return [RUN_CACHE_PATH, default_cache_dir() / 'claude-cli.json']
+
+    def _read_version_cache(self, key: str) -> Optional[Dict[str, Any]]:
+        for path in self._cache_paths():
+            try:
+                with open(path, 'r') as f:
+                    cached = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if isinstance(cached, dict) and cached.get('key') == key:
+                return cached
+        return None
+
+    def _write_version_cache(self, data: Dict[str, Any]) -> None:
+        for path in self._cache_paths():
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_suffix(f'.{os.getpid()}.tmp')
+                with open(tmp, 'w') as f:
+                    json.dump(data, f)
+                os.replace(tmp, path)
+                return
+            except OSError:
+                continue
+
+
+_discovery: Optional[ClaudeCLIDiscovery] = None
+_discovery_lock = threading.Lock()
+
+
+def get_cli_discovery() -> ClaudeCLIDiscovery:
+    """Process-wide CLI discovery shared by the parsers and the assistant selector"""
+    global _discovery
+    with _discovery_lock:
+        if _discovery is None:
+            _discovery = ClaudeCLIDiscovery()
+        return _discovery
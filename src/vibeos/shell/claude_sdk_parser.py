@@ -7,27 +7,122 @@ Uses the official Claude Code SDK for programmatic access to Claude
 import os
 import sys
 import json
-import asyncio
-import tempfile
-import logging
+import importlib.util
+import threading
 from pathlib import Path
-from typing import Tuple, Dict, Any, Optional, List, AsyncGenerator
+from typing import Tuple, Dict, Any, Optional, List, AsyncGenerator, Callable
 import time
+from concurrent.futures import CancelledError, TimeoutError as FutureTimeout
+
+# The SDK pulls in anyio, mcp and pydantic, which takes most of a second, so
+# it is imported on first use by _load_sdk() together with asyncio and the
+# session machinery; here we only check that it is installed
+SDK_AVAILABLE = importlib.util.find_spec('claude_code_sdk') is not None
+SDK_IMPORT_ERROR: Optional[str] = None
+# ClaudeSDKClient (persistent sessions) only exists in newer SDK releases
+SDK_CLIENT_AVAILABLE = False
+_sdk_loaded = False
+_sdk_lock = threading.Lock()
+
+
+def _load_sdk() -> bool:
+    """Import the Claude Code SDK into this module; returns SDK_AVAILABLE"""
+    global SDK_AVAILABLE, SDK_IMPORT_ERROR, SDK_CLIENT_AVAILABLE, _sdk_loaded
+    global asyncio, BackgroundLoop, SDKSession
+    global query, ClaudeCodeOptions, AssistantMessage, UserMessage, TextBlock, ResultMessage
+    global ToolUseBlock, ToolResultBlock, ClaudeSDKClient
+    global ClaudeSDKError, CLINotFoundError, CLIConnectionError, ProcessError, CLIJSONDecodeError
+    with _sdk_lock:
+        if _sdk_loaded:
+            return SDK_AVAILABLE
+        _sdk_loaded = True
+        try:
+            from claude_code_sdk import query, ClaudeCodeOptions, AssistantMessage, UserMessage, TextBlock, ResultMessage
+            from claude_code_sdk import ToolUseBlock, ToolResultBlock
+            from claude_code_sdk import ClaudeSDKError, CLINotFoundError, CLIConnectionError, ProcessError, CLIJSONDecodeError
+        except ImportError as e:
+            SDK_AVAILABLE = False
+            SDK_IMPORT_ERROR = str(e)
+            return False
+        import asyncio
+        try:
+            from .sdk_session import BackgroundLoop, SDKSession
+        except ImportError:
+            from sdk_session import BackgroundLoop, SDKSession
+        try:
+            from claude_code_sdk import ClaudeSDKClient
+            SDK_CLIENT_AVAILABLE = True
+        except ImportError:
+            pass
+        return True
 
-# Try to import the Claude Code SDK
 try:
-    import anyio
-    from claude_code_sdk import query, ClaudeCodeOptions, AssistantMessage, TextBlock
-    from claude_code_sdk import ClaudeSDKError, CLINotFoundError, CLIConnectionError, ProcessError, CLIJSONDecodeError
-    SDK_AVAILABLE = True
-except ImportError as e:
-    SDK_AVAILABLE = False
-    print(f"Warning: Claude Code SDK not available: {e}")
+    from .response_cache import ResponseCache
+    from .cache_policy import CacheAdmissionPolicy, ToolUseTracker
+    from .fs_fingerprint import get_fingerprinter
+    from .query_normalizer import NearDuplicateIndex, normalize_query
+    from .singleflight import SingleFlight
+    from .conversation_history import ConversationHistory, DEFAULT_CAPACITY
+    from .conversation_sessions import ConversationSessions, is_follow_up
+    from .tracing import get_tracer, now_us
+    from .usage import UsageRecord, UsageTracker
+    from .warmup import prime_page_cache, warm_files
+    from .claude_cli import get_cli_discovery
+    from .hedging import Hedger, Claim, Racer
+    from .latency_model import LatencyModel, classify_request
+    from .sanitizer import sanitize_input, MAX_PROMPT_LENGTH
+except ImportError:
+    from response_cache import ResponseCache
+    from cache_policy import CacheAdmissionPolicy, ToolUseTracker
+    from fs_fingerprint import get_fingerprinter
+    from query_normalizer import NearDuplicateIndex, normalize_query
+    from singleflight import SingleFlight
+    from conversation_history import ConversationHistory, DEFAULT_CAPACITY
+    from conversation_sessions import ConversationSessions, is_follow_up
+    from tracing import get_tracer, now_us
+    from usage import UsageRecord, UsageTracker
+    from warmup import prime_page_cache, warm_files
+    from claude_cli import get_cli_discovery
+    from hedging import Hedger, Claim, Racer
+    from latency_model import LatencyModel, classify_request
+    from sanitizer import sanitize_input, MAX_PROMPT_LENGTH
+
+
+class SDKResponse:
+    """Everything collected from the SDK message stream for one request"""
+
+    def __init__(self, on_text: Optional[Callable[[str], None]] = None):
+        self.text_parts: List[str] = []
+        self.on_text = on_text
+        self.tools = ToolUseTracker()
+        # Fingerprint of the working directory when the request started
+        self.fingerprint: Optional[str] = None
+        # Set on Ctrl+C or at the hard deadline; messages arriving afterwards are ignored
+        self.cancelled = False
+        # Set when Claude was asked to stop at the soft deadline
+        self.partial = False
+        # Set when the request refers back to earlier turns of a live
+        # conversation ("do it", "delete that"), so its answer depends on
+        # them and is neither served from nor put in cache
+        self.in_conversation = False
+        # Claude session the request ran in and what it cost, from the final ResultMessage
+        self.session_id: Optional[str] = None
+        self.usage: Optional[UsageRecord] = None
+        self.budget_warning: Optional[str] = None
+        # Trace timestamps: request start, first message, first text block,
+        # and the start of each tool call by tool_use_id
+        self.started_us = 0
+        self.first_message_us: Optional[int] = None
+        self.first_block_us: Optional[int] = None
+        self.tool_starts: Dict[str, Tuple[int, str]] = {}
 
 
 class ClaudeSDKParser:
     """Parse natural language using Claude Code SDK instead of subprocess calls"""
 
+    # parse() accepts an on_text callback that receives text blocks as they arrive
+    supports_streaming = True
+
     def __init__(self):
         self.config = self._load_config()
         self.debug_mode = self._is_debug_enabled()
@@ -39,12 +134,54 @@ class ClaudeSDKParser:
         # SDK requires both the Python module AND the CLI to be available
         self.sdk_available = SDK_AVAILABLE and self._check_claude_code()
         self.context_file = Path("/tmp/.vibeos_claude_context.json")
-        self.conversation_history = []
-        self.cache = {} if self.config.get('claude_code', {}).get('cache_commands', True) else None
+        claude_config = self.config.get('claude_code', {})
+        # Recent exchanges stay in memory, older ones are paged out to disk
+        self.conversation_history = ConversationHistory(
+            capacity=claude_config.get('history_size', DEFAULT_CAPACITY),
+            debug_mode=self.debug_mode
+        )
+        self.cache = (ResponseCache.from_config(claude_config, 'claude_sdk', self.debug_mode)
+                      if claude_config.get('cache_commands', True) else None)
+        self.cache_policy = CacheAdmissionPolicy.from_config(claude_config)
+        # Cached answers are tied to the state of the directory they describe
+        self.fingerprinter = (get_fingerprinter()
+                              if self.cache is not None and claude_config.get('cache_fingerprint', True) else None)
+        # Reworded requests resolve to an already cached answer
+        self.near_index = None
+        if self.cache is not None and claude_config.get('cache_fuzzy', True):
+            self.near_index = NearDuplicateIndex(
+                threshold=claude_config.get('cache_fuzzy_threshold', 0.8),
+                max_entries=max(self.cache.max_entries, claude_config.get('cache_disk_max_entries', 0))
+            )
+
+        # One long-lived SDK client per shell instead of a new CLI per request;
+        # turned off by _ensure_sdk() if the SDK has no ClaudeSDKClient
+        self.persistent = self.config.get('claude_code', {}).get('persistent_session', True)
+        self.session: Optional['SDKSession'] = None
+        self._session_lock = threading.Lock()
+        # Follow-up requests resume the conversation of their working directory
+        self.sessions = (ConversationSessions.from_config(claude_config)
+                         if claude_config.get('resume_sessions', True) else None)
+        # Queries run on a background event loop so the calling thread can be
+        # interrupted with Ctrl+C while the SDK cleans up; created with the SDK
+        self.loop: Optional['BackgroundLoop'] = None
+        self.tracer = get_tracer()
+        # Token, cost and turn accounting with optional budgets
+        self.usage = (UsageTracker.from_config(self.config, self.debug_mode)
+                      if self.config.get('usage', {}).get('track', True) else None)
+        # Identical requests arriving together share one query
+        self.single_flight = SingleFlight() if claude_config.get('coalesce_queries', True) else None
+        # Deadlines learned from observed latency, per request class
+        self.latency = LatencyModel.from_config(claude_config, self.debug_mode)
+        # A one-shot query races requests that are slow to show output
+        self.hedger = Hedger.from_config(claude_config, self.debug_mode)
+        self.warmup: Dict[str, Any] = {'state': 'idle'}
+        self._warmup_thread: Optional[threading.Thread] = None
 
         if self.debug_mode:
             print(f"[DEBUG] Claude SDK available: {self.sdk_available}")
             print(f"[DEBUG] Cache enabled: {self.cache is not None}")
+            print(f"[DEBUG] Persistent session: {self.persistent}")
 
     def _load_config(self) -> Dict[str, Any]:
         """Load configuration from file"""
@@ -62,7 +199,8 @@ class ClaudeSDKParser:
                 'fallback_to_regex': False,
                 'command_timeout': 30,
                 'max_turns': 3,
-                'cache_commands': True
+                'cache_commands': True,
+                'cache_ttl': 3600
             }
         }
 
@@ -87,33 +225,14 @@ class ClaudeSDKParser:
             print("\n[DEBUG] === Claude Code CLI Detection for SDK ===")
 
         # The SDK requires the Claude Code CLI to be installed
-        try:
-            import subprocess
-            result = subprocess.run(
-                ["which", "claude-code"],
-                capture_output=True,
-                text=True,
-                timeout=2
-            )
-
-            if self.debug_mode:
-                print(f"[DEBUG] which claude-code exit code: {result.returncode}")
-                if result.stdout:
-                    print(f"[DEBUG] CLI found at: {result.stdout.strip()}")
-
-            if result.returncode == 0:
-                if self.debug_mode:
-                    print("[DEBUG] ✓ Claude Code CLI available for SDK")
-                return True
+        cli = get_cli_discovery().find()
+        if self.debug_mode:
+            if cli is not None:
+                print(f"[DEBUG] CLI found at: {cli.path or cli.script} ({cli.source})")
+                print("[DEBUG] ✓ Claude Code CLI available for SDK")
             else:
-                if self.debug_mode:
-                    print("[DEBUG] ✗ Claude Code CLI not found")
-                return False
-
-        except Exception as e:
-            if self.debug_mode:
-                print(f"[DEBUG] Exception checking CLI: {e}")
-            return False
+                print("[DEBUG] ✗ Claude Code CLI not found")
+        return cli is not None
 
     def _create_vibeos_system_prompt(self) -> str:
         """Create a system prompt optimized for VibeOS operations"""
@@ -142,92 +261,397 @@ Guidelines:
 Current environment: VibeOS Natural Language Shell
 Working directory will be provided with each command."""
 
-    async def _query_claude_sdk(self, user_input: str, context: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
-        """Use Claude Code SDK to process natural language input"""
+    def _create_options(self, cwd: str, resume: Optional[str] = None) -> 'ClaudeCodeOptions':
+        """Build SDK options for a working directory, optionally resuming a session"""
+        if self.debug_mode and resume:
+            print(f"[DEBUG] Resuming Claude session {resume}")
+        return ClaudeCodeOptions(
+            system_prompt=self._create_vibeos_system_prompt(),
+            max_turns=self.config.get('claude_code', {}).get('max_turns', 3),
+            cwd=cwd,
+            resume=resume
+        )
 
-        if not self.sdk_available:
-            return 'sdk_not_available', {'error': 'Claude Code SDK is not installed or configured'}
+    def _resume_id(self, cwd: str) -> Optional[str]:
+        return self.sessions.resume_id(cwd) if self.sessions is not None else None
 
-        try:
-            # Prepare options for Claude Code
-            options = ClaudeCodeOptions(
-                system_prompt=self._create_vibeos_system_prompt(),
-                max_turns=self.config.get('claude_code', {}).get('max_turns', 3),
-                cwd=context.get('cwd', os.getcwd())
-            )
+    def _create_prompt(self, user_input: str, cwd: str) -> str:
+        """Add working directory context to the prompt"""
+        contextual_prompt = f"Current working directory: {cwd}\n\nUser request: {user_input}"
 
-            # Add working directory context to the prompt
-            cwd = context.get('cwd', os.getcwd())
-            contextual_prompt = f"Current working directory: {cwd}\n\nUser request: {user_input}"
-
-            if self.debug_mode:
-                print(f"[DEBUG] Sending to Claude SDK: {contextual_prompt}")
-                print(f"[DEBUG] Working directory: {cwd}")
+        if self.debug_mode:
+            print(f"[DEBUG] Sending to Claude SDK: {contextual_prompt}")
+            print(f"[DEBUG] Working directory: {cwd}")
 
-            # Query Claude Code SDK
-            response_parts = []
-            async for message in query(prompt=contextual_prompt, options=options):
-                if isinstance(message, AssistantMessage):
-                    for block in message.content:
-                        if isinstance(block, TextBlock):
-                            response_parts.append(block.text)
-                            if self.debug_mode:
-                                print(f"[DEBUG] Received text block: {block.text[:100]}...")
+        return contextual_prompt
 
-            # Combine all response parts
-            full_response = '\n'.join(response_parts)
+    def _collect_message(self, message: Any, response: SDKResponse, claim: Optional[Claim] = None) -> None:
+        """
+        Record text blocks and tool activity of an SDK message, streaming text.
 
-            if self.debug_mode:
-                print(f"[DEBUG] Full Claude response: {full_response}")
-
-            # Process the response
-            if full_response:
-                # Add to conversation history
-                self.conversation_history.append({
-                    'input': user_input,
-                    'response': full_response,
-                    'timestamp': time.time()
-                })
-
-                # Cache the response
-                if self.cache is not None:
-                    cache_key = f"{user_input.lower().strip()}:{context.get('cwd', '')}"
-                    self.cache[cache_key] = full_response
-
-                return 'sdk_response', {
-                    'response': full_response,
-                    'original_input': user_input,
-                    'context': context
-                }
-            else:
-                return 'empty_response', {'error': 'Claude SDK returned empty response'}
+        Hedged racers share one response; claim makes sure only the racer
+        that produced output first writes to it.
+        """
+        if isinstance(message, ResultMessage):
+            # Accounted even after Ctrl+C or for a losing racer: the tokens were spent either way
+            usage = UsageRecord.from_result(message)
+            budget_warning = self.usage.record(usage) if self.usage is not None else None
+            if claim is None or claim():
+                response.session_id = message.session_id
+                response.usage = usage
+                response.budget_warning = budget_warning
+            return
+        if response.cancelled or (claim is not None and not claim()):
+            return
+        tracing = self.tracer.enabled
+        if tracing and response.first_message_us is None:
+            response.first_message_us = now_us()
+            self.tracer.record('sdk.first_message', response.started_us, response.first_message_us)
+        if isinstance(message, AssistantMessage):
+            for block in message.content:
+                if isinstance(block, TextBlock):
+                    if tracing and response.first_block_us is None:
+                        response.first_block_us = now_us()
+                        self.tracer.record('sdk.first_block', response.started_us, response.first_block_us)
+                    response.text_parts.append(block.text)
+                    if self.debug_mode:
+                        print(f"[DEBUG] Received text block: {block.text[:100]}...")
+                    if response.on_text is not None:
+                        response.on_text(block.text)
+                elif isinstance(block, ToolUseBlock):
+                    if tracing:
+                        response.tool_starts[block.id] = (now_us(), block.name)
+                    response.tools.record_tool_use(block.name, block.input)
+                    if self.debug_mode:
+                        print(f"[DEBUG] Tool use: {block.name}")
+        elif isinstance(message, UserMessage) and isinstance(message.content, list):
+            for block in message.content:
+                if isinstance(block, ToolResultBlock):
+                    if tracing and block.tool_use_id in response.tool_starts:
+                        start, name = response.tool_starts.pop(block.tool_use_id)
+                        self.tracer.record('sdk.tool_turn', start, now_us(), tool=name)
+                    response.tools.record_tool_result(block.is_error)
+
+    def _build_response(self, user_input: str, context: Dict[str, Any],
+                        response: SDKResponse) -> Tuple[str, Dict[str, Any]]:
+        """Turn the collected stream into the (intent, params) result"""
+        # Combine all response parts
+        full_response = '\n'.join(response.text_parts)
 
-        except CLINotFoundError:
+        if self.debug_mode:
+            print(f"[DEBUG] Full Claude response: {full_response}")
+
+        # Process the response
+        if full_response:
+            # Add to conversation history
+            self.conversation_history.append(user_input, full_response)
+
+            # Cache only complete answers that are safe to replay
+            cacheable = False
+            if self.cache is not None and not response.partial and not response.in_conversation:
+                cacheable, reason = self.cache_policy.admit(user_input, context, response.tools)
+                if cacheable:
+                    cache_key = self._cache_key(user_input, context)
+                    self.cache.put(cache_key, full_response, fingerprint=response.fingerprint)
+                    # Rewordings may only reuse answers that are read-only
+                    # text; an always-cache answer may have changed things
+                    if self.near_index is not None and reason == 'read_only':
+                        self.near_index.add(cache_key, normalize_query(user_input), scope=context.get('cwd', ''))
+                elif self.debug_mode:
+                    print(f"[DEBUG] Response not cached: {reason}")
+            elif self.debug_mode and response.in_conversation:
+                print("[DEBUG] Response not cached: refers to earlier turns")
+
+            params = {
+                'response': full_response,
+                'original_input': user_input,
+                'context': context,
+                'streamed': response.on_text is not None,
+                'tools_used': list(response.tools.tools),
+                'cached': cacheable,
+                'usage': response.usage.to_dict() if response.usage else None
+            }
+            if response.budget_warning:
+                params['budget_warning'] = response.budget_warning
+            if response.partial:
+                params['partial'] = True
+            return 'sdk_response', params
+        else:
+            return 'empty_response', {'error': 'Claude SDK returned empty response'}
+
+    @staticmethod
+    def _cache_key(user_input: str, context: Dict[str, Any]) -> str:
+        """Cache key for the normalized wording of an input in a working directory"""
+        return f"{normalize_query(user_input)}:{context.get('cwd', '')}"
+
+    def _cache_lookup(self, user_input: str, context: Dict[str, Any],
+                      fingerprint: Optional[str]) -> Tuple[Optional[str], Optional[float]]:
+        """Return (cached response, similarity) using the exact key, then the near-duplicate index"""
+        cache_key = self._cache_key(user_input, context)
+        cached_response = self.cache.get(cache_key, fingerprint)
+        if cached_response is not None or self.near_index is None:
+            return cached_response, None
+
+        match = self.near_index.lookup(normalize_query(user_input), scope=context.get('cwd', ''))
+        if match is None or match[0] == cache_key:
+            return None, None
+        cached_response = self.cache.get(match[0], fingerprint)
+        if cached_response is None:
+            self.near_index.discard(match[0])
+            return None, None
+        return cached_response, match[1]
+
+    def _fingerprint(self, context: Dict[str, Any]) -> Optional[str]:
+        """Current fingerprint of the request's working directory"""
+        if self.fingerprinter is None or not context.get('cwd'):
+            return None
+        return self.fingerprinter.fingerprint(context['cwd'])
+
+    def _sdk_error(self, error: Exception) -> Tuple[str, Dict[str, Any]]:
+        """Map SDK exceptions to (intent, params) results"""
+        if isinstance(error, CLINotFoundError):
             return 'cli_not_found', {
                 'error': 'Claude Code CLI not found. Please install: npm install -g @anthropic-ai/claude-code'
             }
-        except CLIConnectionError:
+        if isinstance(error, CLIConnectionError):
             return 'connection_error', {
                 'error': 'Could not connect to Claude Code. Please check authentication: claude-code auth'
             }
-        except ProcessError as e:
+        if isinstance(error, ProcessError):
             return 'process_error', {
-                'error': f'Claude Code process failed: {e}',
-                'exit_code': getattr(e, 'exit_code', None)
+                'error': f'Claude Code process failed: {error}',
+                'exit_code': getattr(error, 'exit_code', None)
             }
-        except CLIJSONDecodeError as e:
+        if isinstance(error, CLIJSONDecodeError):
             return 'json_error', {
-                'error': f'Failed to parse Claude Code response: {e}'
+                'error': f'Failed to parse Claude Code response: {error}'
             }
+        if self.debug_mode:
+            print(f"[DEBUG] SDK exception: {error}")
+        return 'sdk_error', {'error': f'SDK error: {str(error)}'}
+
+    async def _query_claude_sdk(self, user_input: str, context: Dict[str, Any],
+                                response: Optional[SDKResponse] = None,
+                                resume: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+        """Use Claude Code SDK to process natural language input"""
+
+        if not self.sdk_available:
+            return 'sdk_not_available', {'error': 'Claude Code SDK is not installed or configured'}
+
+        try:
+            # Query Claude Code SDK
+            response = response or SDKResponse()
+            await self._stream_query(user_input, context, response, resume)
+            return self._build_response(user_input, context, response)
+
         except Exception as e:
-            if self.debug_mode:
-                print(f"[DEBUG] SDK exception: {e}")
-            return 'sdk_error', {'error': f'SDK error: {str(e)}'}
+            return self._sdk_error(e)
+
+    async def _stream_query(self, user_input: str, context: Dict[str, Any], response: SDKResponse,
+                            resume: Optional[str] = None, claim: Optional[Claim] = None) -> None:
+        """Run a one-shot query, collecting its messages into response"""
+        cwd = context.get('cwd', os.getcwd())
+        options = self._create_options(cwd, resume)
+        contextual_prompt = self._create_prompt(user_input, cwd)
+        with self.tracer.span('sdk.query', persistent=False, resumed=bool(resume), hedge=claim is not None):
+            async for message in query(prompt=contextual_prompt, options=options):
+                self._collect_message(message, response, claim)
+
+    def _one_shot_racer(self, user_input: str, context: Dict[str, Any], response: SDKResponse,
+                        resume: Optional[str]) -> Callable[[Claim], Racer]:
+        """Starts one-shot queries for Hedger.race; cancelling the task terminates the CLI"""
+        def start(claim: Claim) -> Racer:
+            future = self.loop.submit(self._stream_query(user_input, context, response, resume, claim))
+            return future, future.cancel
+        return start
+
+    def _ensure_sdk(self) -> bool:
+        """Import the SDK on first use; False (and the parser disabled) if it cannot be"""
+        if not _load_sdk():
+            if self.sdk_available:
+                print(f"Warning: Claude Code SDK not available: {SDK_IMPORT_ERROR}")
+            self.sdk_available = False
+            return False
+        if not SDK_CLIENT_AVAILABLE:
+            self.persistent = False
+        with self._session_lock:
+            if self.loop is None:
+                self.loop = BackgroundLoop()
+        return True
+
+    def _get_session(self) -> 'SDKSession':
+        """Create the long-lived SDK session on first use"""
+        with self._session_lock:
+            if self.session is None:
+                self.session = SDKSession(
+                    lambda cwd: ClaudeSDKClient(options=self._create_options(cwd, self._resume_id(cwd))),
+                    loop=self.loop,
+                    debug_mode=self.debug_mode
+                )
+            return self.session
+
+    def warm_up(self, cwd: Optional[str] = None) -> None:
+        """
+        Warm the backend in the background while the banner is displayed.
+
+        The CLI and Node are pulled into the page cache and, with a
+        persistent session, the CLI is spawned and connected for cwd so the
+        first request costs about as much as later ones.
+        """
+        if (not self.sdk_available or self._warmup_thread is not None or
+                not self.config.get('claude_code', {}).get('warm_start', True)):
+            return
+        self.warmup['state'] = 'running'
+        self._warmup_thread = threading.Thread(
+            target=self._warm_up, args=(cwd or os.getcwd(),),
+            name='vibesh-warmup', daemon=True
+        )
+        self._warmup_thread.start()
+
+    def _warm_up(self, cwd: str) -> None:
+        started = time.perf_counter()
+        with self.tracer.span('sdk.warmup') as args:
+            primed = prime_page_cache(warm_files())
+            self.warmup['page_cache'] = primed
+            args['primed_bytes'] = primed['bytes']
+            state = 'primed'
+            # Importing the SDK here takes it off the first request as well
+            if not self._ensure_sdk():
+                state = 'failed'
+            elif self.persistent:
+                session = self._get_session()
+                timeout = self.config.get('claude_code', {}).get('command_timeout', 30)
+                try:
+                    session.warm(cwd).result(timeout)
+                    state = 'connected'
+                except Exception as e:
+                    # The first request connects on its own
+                    state = 'failed'
+                    if self.debug_mode:
+                        print(f"[DEBUG] Warm-up failed: {e}")
+            args['state'] = state
+        self.warmup['state'] = state
+        self.warmup['seconds'] = round(time.perf_counter() - started, 3)
+
+    def _query_persistent(self, user_input: str, context: Dict[str, Any],
+                          response: SDKResponse, request_class: str) -> Tuple[str, Dict[str, Any]]:
+        """Send the request over the long-lived SDK session"""
+        cwd = context.get('cwd', os.getcwd())
+        contextual_prompt = self._create_prompt(user_input, cwd)
+
+        session = self._get_session()
+        # The live client carries the conversation; a retired one is dropped
+        # so the next connection starts fresh
+        if self.sessions is not None and self.sessions.expire(cwd):
+            session.reset()
+
+        def submit(claim: Optional[Claim] = None) -> Racer:
+            future = session.submit(
+                contextual_prompt, cwd,
+                lambda message: self._collect_message(message, response, claim)
+            )
+            # A request that lost a hedged race is interrupted and its client
+            # dropped: that conversation lacks the turn, so the next
+            # connection resumes the winner's session instead
+            return future, lambda: (session.cancel(future), session.reset())
+
+        soft, hard = self._deadlines(request_class)
+        started = time.monotonic()
+        future, hedge_won = None, False
+        try:
+            with self.tracer.span('sdk.query', persistent=True) as span:
+                # The hedge resumes the saved conversation, so it needs one to resume
+                if self.hedger is not None and self.sessions is not None:
+                    hedge = self._one_shot_racer(user_input, context, response, self._resume_id(cwd))
+                    future, hedge_won = self.hedger.race(submit, hedge, hard)
+                    span['hedge_won'] = hedge_won
+                else:
+                    future, _ = submit()
+                waited = time.monotonic() - started
+                if hedge_won:
+                    # A one-shot query cannot be interrupted, so only the hard deadline applies
+                    future.result(timeout=max(0.0, hard - waited) if hard else None)
+                else:
+                    try:
+                        future.result(timeout=max(0.0, soft - waited) if soft else None)
+                    except FutureTimeout:
+                        # Soft deadline: interrupt so Claude ends its turn with what it
+                        # has; the session drops the connection at the hard deadline
+                        if self.debug_mode:
+                            print(f"[DEBUG] Soft deadline of {soft:g}s reached, interrupting Claude")
+                        response.partial = True
+                        session.cancel(future, grace=hard - soft)
+                        future.result(timeout=hard - soft + 1.0)
+        except KeyboardInterrupt:
+            if hedge_won:
+                future.cancel()
+            elif future is not None:
+                session.cancel(future)
+            return self._cancelled_response(user_input, response)
+        except (FutureTimeout, CancelledError):
+            if hedge_won:
+                future.cancel()
+            return self._deadline_response(user_input, response, hard)
+        except Exception as e:
+            return self._sdk_error(e)
+
+        if response.partial and not response.text_parts:
+            return self._deadline_response(user_input, response, hard)
+        return self._build_response(user_input, context, response)
 
-    def parse_with_sdk(self, input_text: str, context: Dict[str, Any] = {}) -> Tuple[str, Dict[str, Any]]:
+    def _deadlines(self, request_class: Optional[str] = None) -> Tuple[Optional[float], Optional[float]]:
+        """
+        (soft, hard) deadline in seconds; (None, None) disables them.
+
+        command_timeout and soft_timeout apply until the latency model knows
+        the request class; then the learned deadline replaces the hard one
+        and the soft one keeps its configured proportion.
+        """
+        claude_config = self.config.get('claude_code', {})
+        hard = claude_config.get('command_timeout', 30)
+        if not hard or hard <= 0:
+            return None, None
+        soft = claude_config.get('soft_timeout') or hard * 0.75
+        if self.latency is not None and request_class is not None:
+            learned = self.latency.deadline(request_class, hard)
+            soft, hard = soft * learned / hard, learned
+        return min(soft, hard), float(hard)
+
+    def _partial_response(self, intent: str, user_input: str, response: SDKResponse,
+                          **extra: Any) -> Tuple[str, Dict[str, Any]]:
+        """Result for a request that was stopped, keeping the text received so far"""
+        response.cancelled = True
+        partial = '\n'.join(response.text_parts)
+        if self.debug_mode:
+            print(f"[DEBUG] Query stopped ({intent}) after {len(partial)} characters")
+        return intent, dict({
+            'response': partial,
+            'original_input': user_input,
+            'partial': bool(partial),
+            'streamed': response.on_text is not None
+        }, **extra)
+
+    def _cancelled_response(self, user_input: str, response: SDKResponse) -> Tuple[str, Dict[str, Any]]:
+        """Result for a request stopped with Ctrl+C"""
+        return self._partial_response('cancelled', user_input, response)
+
+    def _deadline_response(self, user_input: str, response: SDKResponse,
+                           hard: float) -> Tuple[str, Dict[str, Any]]:
+        """Result for a request stopped at its hard deadline"""
+        return self._partial_response('timeout', user_input, response,
+                                      error=f'Claude did not finish within {hard:g} seconds')
+
+    def parse_with_sdk(self, input_text: str, context: Dict[str, Any] = {},
+                       on_text: Optional[Callable[[str], None]] = None) -> Tuple[str, Dict[str, Any]]:
         """
         Use Claude Code SDK to interpret natural language into responses
 
+        Args:
+            input_text: User's natural language input
+            context: Context information including working directory
+            on_text: Optional callback receiving each text block as soon as it
+                arrives; the full response is still returned in params
+
         Returns:
             Tuple of (intent, parameters)
         """
@@ -236,44 +660,138 @@ Working directory will be provided with each command."""
                 'error': 'Claude Code SDK is not installed or not accessible'
             }
 
-        # Check cache first
-        if self.cache is not None:
-            cache_key = f"{input_text.lower().strip()}:{context.get('cwd', '')}"
-            if cache_key in self.cache:
-                cached_response = self.cache[cache_key]
-                return 'sdk_response', {
+        response = SDKResponse(on_text)
+        response.fingerprint = self._fingerprint(context)
+        response.in_conversation = (is_follow_up(input_text) and
+                                    self._in_conversation(context.get('cwd', os.getcwd())))
+
+        # Check cache first (never-cache inputs always go to Claude); a follow-up
+        # such as "yes" or "do it" means something else in every conversation,
+        # while a self-contained request is answered the same in any of them
+        if (self.cache is not None and not response.in_conversation and
+                self.cache_policy.allows_lookup(input_text, context)):
+            cached_response, similarity = self._cache_lookup(input_text, context, response.fingerprint)
+            if cached_response is not None:
+                params = {
                     'response': cached_response,
                     'original_input': input_text,
                     'from_cache': True
                 }
+                if similarity is not None:
+                    params['fuzzy_match'] = round(similarity, 3)
+                return 'sdk_response', params
+
+        if (self.single_flight is None or response.in_conversation or
+                not self.cache_policy.allows_lookup(input_text, context)):
+            return self._run_query(input_text, context, response)
 
+        flight_key = f"{self._cache_key(input_text, context)}@{response.fingerprint}"
+        (intent, params), shared = self.single_flight.do(
+            flight_key, lambda: self._run_query(input_text, context, response))
+        if not shared:
+            return intent, params
+
+        if self.debug_mode:
+            print(f"[DEBUG] Coalesced with in-flight query: {flight_key}")
+        # Text was streamed to the leader only, so this caller prints it itself
+        params = dict(params, original_input=input_text, streamed=False, coalesced=True)
+        return intent, params
+
+    def _run_query(self, input_text: str, context: Dict[str, Any],
+                   response: SDKResponse) -> Tuple[str, Dict[str, Any]]:
+        """Send one request to Claude and learn from how long it took"""
+        if self.usage is not None:
+            reason = self.usage.check(input_text)
+            if reason:
+                return 'budget_exceeded', {'error': reason, 'original_input': input_text}
+
+        response.started_us = now_us()
+        request_class = classify_request(input_text)
+        started = time.monotonic()
+        intent, params = self._send_query(input_text, context, response, request_class)
+        if self.latency is not None and intent in ('sdk_response', 'timeout'):
+            # A request stopped at a deadline only shows the deadline was too short
+            self.latency.record(request_class, time.monotonic() - started,
+                                timed_out=intent == 'timeout' or bool(params.get('partial')))
+        return intent, params
+
+    def _send_query(self, input_text: str, context: Dict[str, Any], response: SDKResponse,
+                    request_class: str) -> Tuple[str, Dict[str, Any]]:
+        """Send one request to Claude through the session or a one-shot query"""
+        # The session answers one request at a time; concurrent callers (batch
+        # mode) run their own one-shot query instead of queueing behind it
+        if self.persistent and not (self.session is not None and self.session.busy):
+            result = self._query_persistent(input_text, context, response, request_class)
+            self._record_session(context, response)
+            return result
+
+        # Such an overflow query is independent of the shell's conversation
+        resume = None if self.persistent else self._resume_id(context.get('cwd', os.getcwd()))
+        # A one-shot query cannot be interrupted, so only the hard deadline applies
+        _, hard = self._deadlines(request_class)
+        started = time.monotonic()
+        future = None
         try:
-            # Run the async query in a synchronous context
-            return anyio.run(self._query_claude_sdk, input_text, context)
+            try:
+                if self.hedger is None:
+                    future = self.loop.submit(self._query_claude_sdk(input_text, context, response, resume))
+                else:
+                    start = self._one_shot_racer(input_text, context, response, resume)
+                    future, _ = self.hedger.race(start, start, hard)
+                remaining = max(0.0, hard - (time.monotonic() - started)) if hard else None
+                try:
+                    result = future.result(timeout=remaining)
+                except (KeyboardInterrupt, FutureTimeout):
+                    raise
+                except Exception as e:
+                    # Hedged racers raise SDK errors instead of returning them
+                    return self._sdk_error(e)
+                if self.hedger is not None:
+                    # Racers only collect; the result is built once, from the winner's output
+                    result = self._build_response(input_text, context, response)
+                if not self.persistent:
+                    self._record_session(context, response)
+                return result
+            except KeyboardInterrupt:
+                # Cancelling the task closes the SDK query, which terminates the CLI
+                if future is not None:
+                    future.cancel()
+                return self._cancelled_response(input_text, response)
+            except FutureTimeout:
+                future.cancel()
+                return self._deadline_response(input_text, response, hard)
         except Exception as e:
             if self.debug_mode:
                 print(f"[DEBUG] Error running async query: {e}")
             return 'sdk_error', {'error': f'Failed to execute SDK query: {str(e)}'}
 
-    def _sanitize_input(self, text: str) -> str:
-        """Simple input sanitization"""
-        if not text or not isinstance(text, str):
-            return ""
-
-        # Basic cleanup
-        text = text.strip()
-        if len(text) > 5000:  # Reasonable limit
-            text = text[:5000]
-
-        return text
-
-    def parse(self, input_text: str, context: Dict[str, Any] = {}) -> Tuple[str, Dict[str, Any]]:
-        """Main parse method that uses Claude Code SDK"""
+    def _in_conversation(self, cwd: str) -> bool:
+        """True when a request in cwd would resume or continue an earlier exchange"""
+        if self.sessions is not None and self.sessions.active(cwd):
+            return True
+        return self.persistent and self.session is not None and self.session.continues(cwd)
+
+    def _record_session(self, context: Dict[str, Any], response: SDKResponse) -> None:
+        if self.sessions is not None and response.session_id:
+            self.sessions.record(context.get('cwd', os.getcwd()), response.session_id)
+
+    def new_session(self, cwd: Optional[str] = None) -> None:
+        """Start a fresh Claude conversation in cwd (everywhere when None)"""
+        if self.sessions is not None:
+            self.sessions.retire(cwd)
+        if self.session is not None:
+            self.session.reset()
+
+    def parse(self, input_text: str, context: Dict[str, Any] = {},
+              on_text: Optional[Callable[[str], None]] = None) -> Tuple[str, Dict[str, Any]]:
+        """Main parse method that uses Claude Code SDK; on_text streams text blocks"""
         # Basic input validation
         if not input_text or not isinstance(input_text, str):
             return 'input_error', {'error': 'Input must be a non-empty string'}
 
-        sanitized_input = self._sanitize_input(input_text)
+        # A prompt, not a shell command: only trimmed and capped
+        max_length = self.config.get('security', {}).get('max_input_length', MAX_PROMPT_LENGTH)
+        sanitized_input = sanitize_input(input_text, max_length, shell=False)
         if not sanitized_input:
             return 'input_error', {'error': 'Empty input'}
 
@@ -284,13 +802,13 @@ Working directory will be provided with each command."""
             context['cwd'] = os.getcwd()
 
         # Check SDK availability
-        if not self.sdk_available:
+        if not self.sdk_available or not self._ensure_sdk():
             return 'sdk_not_available', {
                 'error': 'Claude Code is not installed or not authenticated',
                 'help': 'Run: vibeos-install-claude'
             }
 
-        return self.parse_with_sdk(sanitized_input, context)
+        return self.parse_with_sdk(sanitized_input, context, on_text)
 
     def get_suggestions(self, partial_input: str) -> List[str]:
         """Get command suggestions based on partial input"""
@@ -311,10 +829,13 @@ Working directory will be provided with each command."""
         return suggestions[:3]
 
     def clear_context(self) -> None:
-        """Clear conversation history and cache."""
+        """Clear conversation history, cache and the live SDK conversation."""
         self.conversation_history.clear()
-        if self.cache:
+        if self.cache is not None:
             self.cache.clear()
+        if self.near_index is not None:
+            self.near_index.clear()
+        self.new_session()
 
         if self.context_file.exists():
             try:
@@ -322,6 +843,18 @@ Working directory will be provided with each command."""
             except (OSError, PermissionError) as e:
                 print(f"Warning: Could not remove context file: {e}")
 
+    def close(self) -> None:
+        """Disconnect the persistent SDK session, stop the event loop, drop the history log and save latencies"""
+        if self.session is not None:
+            self.session.close()
+        if self.loop is not None:
+            self.loop.stop()
+        self.conversation_history.close()
+        if self.usage is not None:
+            self.usage.close()
+        if self.latency is not None:
+            self.latency.save()
+
     @property
     def claude_available(self) -> bool:
         """Compatibility property for existing code"""
@@ -329,11 +862,27 @@ Working directory will be provided with each command."""
 
     def get_status(self) -> Dict[str, Any]:
         """Get current status of the SDK parser"""
+        discovery = get_cli_discovery()
+        discovery.version()
         return {
             'sdk_available': self.sdk_available,
             'sdk_imported': SDK_AVAILABLE,
             'cli_available': self._check_claude_code(),
+            'cli': discovery.get_stats(),
             'conversation_items': len(self.conversation_history),
-            'cache_items': len(self.cache) if self.cache else 0,
+            'conversation_history': self.conversation_history.get_stats(),
+            'cache_items': len(self.cache) if self.cache is not None else 0,
+            'cache': self.cache.get_stats() if self.cache is not None else None,
+            'cache_policy': self.cache_policy.get_stats(),
+            'fingerprints': self.fingerprinter.get_stats() if self.fingerprinter else None,
+            'near_duplicates': self.near_index.get_stats() if self.near_index else None,
+            'single_flight': self.single_flight.get_stats() if self.single_flight else None,
+            'persistent_session': self.session.get_status() if self.session else None,
+            'conversations': self.sessions.get_stats() if self.sessions else None,
+            'trace': self.tracer.summary() if self.tracer.enabled else None,
+            'usage': self.usage.get_stats() if self.usage else None,
+            'warmup': dict(self.warmup),
+            'hedging': self.hedger.get_stats() if self.hedger else None,
+            'latency': self.latency.get_stats() if self.latency else None,
             'debug_mode': self.debug_mode
         }
\ No newline at end of file
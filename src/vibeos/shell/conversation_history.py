@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Bounded conversation history for VibeOS Shell parsers
+Keeps the most recent exchanges in a fixed-size ring buffer and spills older
+ones to an append-only log on disk, so a long session uses constant memory
+"""
+
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+try:
+    from .response_cache import default_cache_dir
+except ImportError:
+    from response_cache import default_cache_dir
+
+
+DEFAULT_CAPACITY = 50
+LOG_PREFIX = 'conversation-'
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # Exists, but belongs to another user
+        return True
+    return True
+
+
+def prune_stale_logs(directory: Optional[Path] = None) -> int:
+    """Remove conversation logs left behind by shells that are no longer running"""
+    directory = Path(directory) if directory else default_cache_dir()
+    removed = 0
+    try:
+        paths = list(directory.glob(f"{LOG_PREFIX}*.jsonl"))
+    except OSError:
+        return 0
+    for path in paths:
+        pid = path.stem[len(LOG_PREFIX):]
+        if not pid.isdigit() or int(pid) == os.getpid() or _pid_alive(int(pid)):
+            continue
+        try:
+            path.unlink()
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+class HistoryEntry:
+    """One exchange; __slots__ keeps the per-record overhead small"""
+
+    __slots__ = ('input', 'response', 'timestamp')
+
+    def __init__(self, user_input: str, response: str, timestamp: float):
+        self.input = user_input
+        self.response = response
+        self.timestamp = timestamp
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'input': self.input, 'response': self.response, 'timestamp': self.timestamp}
+
+    def size(self) -> int:
+        return (sys.getsizeof(self) + sys.getsizeof(self.input) +
+                sys.getsizeof(self.response) + sys.getsizeof(self.timestamp))
+
+
+class ConversationHistory:
+    """
+    Ring buffer of the last `capacity` exchanges backed by a JSON lines log.
+
+    Entries pushed out of the ring are appended to the log; the byte offset
+    of every spilled record is kept in a compact array so any page of older
+    history can be read back with a single seek. Entries are addressed by
+    position, 0 being the oldest exchange of the session. The log is
+    removed on close() or at interpreter exit, and logs of shells that died
+    without either are pruned when the next default history is created.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, log_path: Optional[Path] = None,
+                 debug_mode: bool = False):
+        self.capacity = max(1, int(capacity))
+        self.debug_mode = debug_mode
+        if log_path:
+            self.log_path = Path(log_path)
+        else:
+            self.log_path = default_cache_dir() / f"{LOG_PREFIX}{os.getpid()}.jsonl"
+            removed = prune_stale_logs(self.log_path.parent)
+            if removed and self.debug_mode:
+                print(f"[DEBUG] Removed {removed} stale conversation log(s)")
+
+        self._lock = threading.Lock()
+        self._ring: List[Optional[HistoryEntry]] = [None] * self.capacity
+        self._start = 0
+        self._count = 0
+        self._ring_bytes = 0
+        self._offsets = array('Q')
+        self._log = None
+        self._log_bytes = 0
+        self._spill_failed = False
+        self._atexit_registered = False
+
+    def append(self, user_input: str, response: str, timestamp: Optional[float] = None) -> None:
+        entry = HistoryEntry(user_input, response, time.time() if timestamp is None else timestamp)
+        with self._lock:
+            if self._count == self.capacity:
+                oldest = self._ring[self._start]
+                self._spill(oldest)
+                self._ring_bytes -= oldest.size()
+                self._ring[self._start] = entry
+                self._start = (self._start + 1) % self.capacity
+            else:
+                self._ring[(self._start + self._count) % self.capacity] = entry
+                self._count += 1
+            self._ring_bytes += entry.size()
+
+    def _spill(self, entry: HistoryEntry) -> None:
+        if self._spill_failed:
+            return
+        try:
+            if self._log is None:
+                self.log_path.parent.mkdir(parents=True, exist_ok=True)
+                self._log = open(self.log_path, 'ab')
+                self._log_bytes = self._log.tell()
+                # Shells that exit without close() still remove their log
+                if not self._atexit_registered:
+                    atexit.register(self.close)
+                    self._atexit_registered = True
+            line = (json.dumps(entry.to_dict(), ensure_ascii=False) + '\n').encode('utf-8')
+            self._log.write(line)
+            self._log.flush()
+        except OSError as e:
+            # History beyond the ring is lost, but the shell keeps working
+            self._spill_failed = True
+            if self.debug_mode:
+                print(f"[DEBUG] Conversation log disabled: {e}")
+            return
+        self._offsets.append(self._log_bytes)
+        self._log_bytes += len(line)
+
+    def __len__(self) -> int:
+        return len(self._offsets) + self._count
+
+    @property
+    def spilled(self) -> int:
+        return len(self._offsets)
+
+    def recent(self, count: Optional[int] = None) -> List[HistoryEntry]:
+        """The newest in-memory entries, oldest first"""
+        with self._lock:
+            entries = [self._ring[(self._start + i) % self.capacity] for i in range(self._count)]
+        return entries if count is None else entries[-count:] if count > 0 else []
+
+    def page(self, start: int, count: int) -> List[HistoryEntry]:
+        """Entries start .. start+count-1 of the whole session, reading spilled ones from disk"""
+        with self._lock:
+            spilled = len(self._offsets)
+            end = min(start + count, spilled + self._count)
+            start = max(0, start)
+            entries: List[HistoryEntry] = []
+
+            if start < spilled:
+                entries.extend(self._read_spilled(start, min(end, spilled)))
+            for position in range(max(start, spilled), end):
+                entries.append(self._ring[(self._start + position - spilled) % self.capacity])
+            return entries
+
+    def _read_spilled(self, start: int, end: int) -> List[HistoryEntry]:
+        entries = []
+        try:
+            with open(self.log_path, 'rb') as log:
+                log.seek(self._offsets[start])
+                for _ in range(end - start):
+                    record = json.loads(log.readline())
+                    entries.append(HistoryEntry(record['input'], record['response'], record['timestamp']))
+        except (OSError, ValueError, KeyError) as e:
+            if self.debug_mode:
+                print(f"[DEBUG] Could not read conversation log: {e}")
+        return entries
+
+    def clear(self) -> None:
+        """Forget the whole session, including its log"""
+        with self._lock:
+            self._ring = [None] * self.capacity
+            self._start = 0
+            self._count = 0
+            self._ring_bytes = 0
+            self._offsets = array('Q')
+            self._close_log(remove=True)
+
+    def close(self) -> None:
+        """Close and remove the session log"""
+        with self._lock:
+            self._close_log(remove=True)
+
+    def _close_log(self, remove: bool) -> None:
+        if self._log is not None:
+            try:
+                self._log.close()
+            except OSError:
+                pass
+            self._log = None
+        self._log_bytes = 0
+        if remove:
+            try:
+                self.log_path.unlink()
+            except OSError:
+                pass
+
+    def memory_bytes(self) -> int:
+        """Approximate memory held by the ring, its entries and the spill index"""
+        return (self._ring_bytes + sys.getsizeof(self._ring) +
+                self._offsets.itemsize * len(self._offsets))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'entries': len(self),
+            'in_memory': self._count,
+            'capacity': self.capacity,
+            'spilled': self.spilled,
+            'memory_bytes': self.memory_bytes(),
+            'log_bytes': self._log_bytes,
+            'log_path': str(self.log_path) if self._offsets else None,
+        }
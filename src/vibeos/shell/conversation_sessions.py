@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Claude conversation sessions for VibeOS Shell
+Remembers the SDK session id of the conversation in each working directory
+so follow-up requests resume it instead of starting from scratch
+"""
+
+import re
+import threading
+import time
+from typing import Any, Dict, Optional
+
+SCOPE_CWD = 'cwd'
+SCOPE_SHELL = 'shell'
+
+DEFAULT_MAX_TURNS = 20
+DEFAULT_IDLE_TIMEOUT = 1800
+
+# Replies that only mean something as an answer to Claude's last turn
+FOLLOW_UP_REPLIES = frozenset({
+    'yes', 'y', 'yeah', 'yep', 'sure', 'ok', 'okay', 'no', 'n', 'nope', 'why', 'how',
+    'do it', 'go ahead', 'go on', 'continue', 'proceed', 'explain', 'undo', 'retry', 'try again',
+    'thanks', 'thank you',
+})
+# Words pointing back at an earlier turn ("delete it", "run that again");
+# a false positive only costs a cache miss
+BACK_REFERENCES = frozenset({
+    'it', 'that', 'those', 'them', 'these', 'again', 'previous', 'last', 'above',
+    'earlier', 'instead', 'same', 'else', 'more', 'one', 'ones', 'also', 'too',
+})
+_FOLLOW_UP_OPENERS = ('and ', 'but ', 'then ', 'now ', 'what about ', 'how about ', 'what if ', 'why ')
+_ABOUT_CLAUDE = re.compile(r"\byou(?:'ve)?\s+(?:just|said|did|ran|suggested|mentioned|meant)\b|\byour\s+(?:answer|last)\b")
+_WORDS = re.compile(r"[a-z]+(?:'[a-z]+)?")
+
+
+def is_follow_up(text: str) -> bool:
+    """True when a request refers back to an earlier turn of the conversation"""
+    lowered = text.strip().lower()
+    words = _WORDS.findall(lowered)
+    if not words or ' '.join(words) in FOLLOW_UP_REPLIES:
+        return True
+    if lowered.startswith(_FOLLOW_UP_OPENERS) or _ABOUT_CLAUDE.search(lowered):
+        return True
+    return any(word in BACK_REFERENCES or word.startswith(("it'", "that'")) for word in words)
+
+
+class ConversationRecord:
+    """The live conversation of one scope"""
+
+    __slots__ = ('session_id', 'turns', 'started_at', 'last_used')
+
+    def __init__(self, session_id: str, now: float):
+        self.session_id = session_id
+        self.turns = 1
+        self.started_at = now
+        self.last_used = now
+
+
+class ConversationSessions:
+    """
+    Tracks which Claude session each scope (working directory, or the whole
+    shell) continues, and retires conversations that grew too long or sat
+    idle: a retired scope starts a fresh conversation on its next request.
+    """
+
+    def __init__(self, scope: str = SCOPE_CWD, max_turns: int = DEFAULT_MAX_TURNS,
+                 idle_timeout: float = DEFAULT_IDLE_TIMEOUT):
+        if scope not in (SCOPE_CWD, SCOPE_SHELL):
+            raise ValueError(f"Session scope must be '{SCOPE_CWD}' or '{SCOPE_SHELL}', got {scope!r}")
+        self.scope = scope
+        self.max_turns = max_turns
+        self.idle_timeout = idle_timeout
+
+        self._lock = threading.Lock()
+        self._records: Dict[str, ConversationRecord] = {}
+
+        self.resumed = 0
+        self.retired: Dict[str, int] = {}
+
+    @classmethod
+    def from_config(cls, claude_config: Dict[str, Any]) -> 'ConversationSessions':
+        """Build the policy from the claude_code section of claude_config.json"""
+        return cls(
+            scope=claude_config.get('session_scope', SCOPE_CWD),
+            max_turns=claude_config.get('session_max_turns', DEFAULT_MAX_TURNS),
+            idle_timeout=claude_config.get('session_idle_timeout', DEFAULT_IDLE_TIMEOUT),
+        )
+
+    def _key(self, cwd: str) -> str:
+        return cwd if self.scope == SCOPE_CWD else ''
+
+    def expire(self, cwd: str) -> bool:
+        """Retire the conversation of cwd if the policy says so; True if it was retired"""
+        now = time.time()
+        with self._lock:
+            record = self._records.get(self._key(cwd))
+            if record is None:
+                return False
+            if self.max_turns and record.turns >= self.max_turns:
+                reason = 'max_turns'
+            elif self.idle_timeout and now - record.last_used > self.idle_timeout:
+                reason = 'idle'
+            else:
+                return False
+            del self._records[self._key(cwd)]
+            self.retired[reason] = self.retired.get(reason, 0) + 1
+            return True
+
+    def active(self, cwd: str) -> bool:
+        """True when a request in cwd would continue a live conversation"""
+        self.expire(cwd)
+        with self._lock:
+            return self._key(cwd) in self._records
+
+    def resume_id(self, cwd: str) -> Optional[str]:
+        """Session id to resume for a request in cwd, or None to start fresh"""
+        self.expire(cwd)
+        with self._lock:
+            record = self._records.get(self._key(cwd))
+            if record is None:
+                return None
+            self.resumed += 1
+            return record.session_id
+
+    def record(self, cwd: str, session_id: str) -> None:
+        """Remember the session a finished request ran in"""
+        now = time.time()
+        with self._lock:
+            key = self._key(cwd)
+            record = self._records.get(key)
+            if record is None:
+                self._records[key] = ConversationRecord(session_id, now)
+                return
+            # Resuming may fork the conversation under a new id
+            record.session_id = session_id
+            record.turns += 1
+            record.last_used = now
+
+    def retire(self, cwd: Optional[str] = None) -> None:
+        """Start fresh in cwd, or everywhere when cwd is None"""
+        with self._lock:
+            if cwd is None:
+                count = len(self._records)
+                self._records.clear()
+            else:
+                count = 1 if self._records.pop(self._key(cwd), None) else 0
+            if count:
+                self.retired['explicit'] = self.retired.get('explicit', 0) + count
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'scope': self.scope,
+                'active': len(self._records),
+                'resumed': self.resumed,
+                'retired': dict(self.retired),
+                'max_turns': self.max_turns,
+                'idle_timeout': self.idle_timeout,
+            }
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Local fast path for VibeOS Shell
+Answers mechanical requests ("list files", "git status", "go to src") from a
+compiled pattern table in microseconds; anything the table does not match
+exactly goes to Claude
+"""
+
+import os
+import re
+import shlex
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+CHANGE_DIRECTORY = 'cd'
+# Target of CHANGE_DIRECTORY for the previous working directory ("cd -")
+PREVIOUS_DIRECTORY = '-'
+
+# Shorthands expanded in rule patterns
+_MACROS = {
+    '{show}': r"(?:show|display|print|list|get|check|view)(?: me)?(?: the| my)?",
+    '{here}': r"(?: here| in (?:this|the current) (?:directory|folder|dir))?",
+    # Never starts with '-', which the program would read as an option
+    '{path}': r"(?P<path>[\w./~+][\w./~+-]*)",
+    # Short options only ("-la -h"), which are safe to pass through unquoted
+    '{flags}': r"(?P<flags>-[a-zA-Z1]+(?: -[a-zA-Z1]+)*)",
+}
+
+# (name, patterns, command); a pattern must match the whole request.
+# command is a shell command, with {path} replaced by the quoted capture
+# (a leading '~' expanded first) and {flags} by the options as typed, or
+# CHANGE_DIRECTORY to move the shell itself to {path}
+DEFAULT_RULES: Tuple[Tuple[str, Tuple[str, ...], str], ...] = (
+    ('pwd', (r"pwd", r"where am i", r"{show} (?:current|working|present) (?:working )?(?:directory|dir|folder|path)",
+             r"what(?:'s| is) (?:the |my )?(?:current|working) (?:directory|dir|folder)"), "pwd"),
+    ('list_files', (r"ls", r"ll", r"dir", r"{show} (?:all )?(?:files|contents|directory contents|folder contents){here}",
+                    r"what(?:'s| is) (?:in )?(?:here|this (?:directory|folder))"), "ls -la"),
+    ('list_path', (r"ls {path}", r"{show} (?:all )?(?:files|contents) (?:in|of) (?:the )?{path}(?: (?:folder|directory|dir))?"),
+     "ls -la -- {path}"),
+    # Typed ls commands run as they are
+    ('ls', (r"ls {flags}",), "ls {flags}"),
+    ('ls_path', (r"ls {flags} {path}",), "ls {flags} -- {path}"),
+    ('git_status', (r"git status", r"{show} (?:git|repo|repository) status"), "git status"),
+    ('git_log', (r"git log", r"{show} (?:git log|recent commits|commit history|commits|last commits)"),
+     "git log --oneline -20"),
+    ('git_diff', (r"git diff", r"{show} (?:git diff|diff|changes|unstaged changes)"), "git diff"),
+    ('git_branches', (r"git branch(?:es)?", r"{show} (?:all )?(?:git )?branch(?:es)?"), "git branch -a"),
+    ('disk_usage', (r"df", r"disk usage", r"disk space", r"{show} (?:disk|storage) (?:usage|space)",
+                    r"how much (?:disk |free )?space (?:is left|do i have|is free)"), "df -h"),
+    ('memory', (r"free", r"memory usage", r"{show} (?:memory|ram)(?: usage)?",
+                r"how much (?:memory|ram) (?:is free|is used|do i have)"), "free -h"),
+    ('processes', (r"ps", r"top processes", r"{show} (?:running |all |top )?processes"),
+     "ps aux --sort=-%cpu | head -20"),
+    ('uptime', (r"uptime", r"{show} uptime", r"how long (?:has the system been|have i been) (?:up|running)"), "uptime"),
+    ('whoami', (r"whoami", r"who am i"), "whoami"),
+    ('date', (r"date", r"time", r"{show} (?:date|time|date and time)",
+              r"what(?:'s| is) the (?:date|time)(?: today)?", r"what time is it"), "date"),
+    ('ip_address', (r"{show} (?:ip|ip address|ip addresses)", r"what(?:'s| is) my ip(?: address)?"),
+     "ip -brief address"),
+    ('clear', (r"clear", r"cls", r"clear (?:the )?screen"), "clear"),
+    ('cd_home', (r"cd", r"cd ~", r"go home", r"(?:go|cd|change directory) (?:to )?(?:my )?home(?: directory| folder)?"),
+     CHANGE_DIRECTORY + " ~"),
+    ('cd_up', (r"cd \.\.", r"go (?:up|back)(?: one (?:level|directory|folder))?", r"(?:go to |open )?(?:the )?parent (?:directory|folder)"),
+     CHANGE_DIRECTORY + " .."),
+    ('cd_back', (r"cd -", r"(?:go|cd|change directory) (?:back )?to (?:the )?previous (?:directory|folder|dir)"),
+     CHANGE_DIRECTORY + " " + PREVIOUS_DIRECTORY),
+    ('cd', (r"cd {path}", r"(?:go|change|move|navigate|switch|jump)(?: directory)? (?:in)?to (?:the )?{path}(?: (?:folder|directory|dir))?",
+            r"open (?:the )?{path} (?:folder|directory|dir)"), CHANGE_DIRECTORY + " {path}"),
+)
+
+_POLITE_PREFIX = re.compile(r"^(?:(?:please|pls|kindly|can you|could you|would you|will you|hey|ok|okay)[\s,]+)+",
+                            re.IGNORECASE)
+_POLITE_SUFFIX = re.compile(r"(?:[\s,]+(?:please|pls|thanks|thank you|for me|now))+$", re.IGNORECASE)
+# A trailing full stop is dropped, but not the dots of "cd .."
+_TRAILING_PUNCTUATION = re.compile(r"\s*[!?]+$|(?<![\s.])[.!?]+$")
+_SPACES = re.compile(r"\s+")
+
+
+class LocalIntentEngine:
+    """
+    Classifies requests against a table of whole-request patterns.
+
+    All rules are compiled into one case-insensitive alternation, one named
+    group per rule, so classification is a single regex match after the
+    request is trimmed of politeness and punctuation. Only exact matches are
+    answered locally; everything else returns None and goes to Claude.
+    """
+
+    def __init__(self, rules: Iterable[Tuple[str, Iterable[str], str]] = DEFAULT_RULES):
+        self._commands: Dict[str, Tuple[str, str]] = {}
+        alternatives = []
+        for index, (name, patterns, command) in enumerate(rules):
+            group = f"r{index}"
+            body = '|'.join(self._expand(pattern, f"{group}_{n}") for n, pattern in enumerate(patterns))
+            alternatives.append(f"(?P<{group}>{body})")
+            self._commands[group] = (name, command)
+        self._pattern = re.compile('|'.join(alternatives), re.IGNORECASE)
+        # Capture groups of each rule, by the rule's group name
+        self._paths = self._captures('path')
+        self._flags = self._captures('flags')
+
+        self.lookups = 0
+        self.hits = 0
+        self.rule_hits: Dict[str, int] = {}
+
+    @classmethod
+    def from_config(cls, claude_config: Dict[str, Any]) -> Optional['LocalIntentEngine']:
+        """Engine for the claude_code section of claude_config.json; None when disabled"""
+        if not claude_config.get('fast_path', True):
+            return None
+        extra = [(rule['name'], rule['patterns'], rule['command'])
+                 for rule in claude_config.get('fast_path_rules', [])]
+        # Site rules come first so they can shadow the defaults
+        return cls(extra + list(DEFAULT_RULES))
+
+    @staticmethod
+    def _expand(pattern: str, suffix: str) -> str:
+        for macro, expansion in _MACROS.items():
+            pattern = pattern.replace(macro, expansion)
+        # Capture names must be unique across the combined pattern
+        return re.sub(r"\(\?P<(\w+)>", rf"(?P<\1_{suffix}>", pattern)
+
+    def _captures(self, name: str) -> Dict[str, Tuple[str, ...]]:
+        return {
+            group: tuple(capture for capture in self._pattern.groupindex
+                         if capture.startswith(f"{name}_{group}_"))
+            for group in self._commands
+        }
+
+    @staticmethod
+    def _capture(match: 're.Match', captures: Tuple[str, ...]) -> Optional[str]:
+        return next((match.group(capture) for capture in captures if match.group(capture) is not None), None)
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        text = _SPACES.sub(' ', text.strip())
+        text = _TRAILING_PUNCTUATION.sub('', text)
+        text = _POLITE_PREFIX.sub('', text)
+        return _POLITE_SUFFIX.sub('', text)
+
+    def classify(self, text: str, navigation: bool = True) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """
+        ('execute_command', {'command': ...}) or ('change_directory', {'path': ...})
+        for a request the table answers, otherwise None. Without navigation,
+        directory changes are left to Claude as well.
+        """
+        self.lookups += 1
+        match = self._pattern.fullmatch(self.normalize(text))
+        if match is None:
+            return None
+
+        group = match.lastgroup
+        name, command = self._commands[group]
+        change_directory = command.startswith(CHANGE_DIRECTORY + ' ')
+        if change_directory and not navigation:
+            return None
+        path = self._capture(match, self._paths[group])
+        self.hits += 1
+        self.rule_hits[name] = self.rule_hits.get(name, 0) + 1
+
+        params: Dict[str, Any] = {'original_input': text, 'fast_path': name}
+        if change_directory:
+            target = command[len(CHANGE_DIRECTORY) + 1:]
+            params['path'] = path if target == '{path}' else target
+            return 'change_directory', params
+        if path is not None:
+            # Quoting would keep the shell from expanding '~'
+            command = command.replace('{path}', shlex.quote(os.path.expanduser(path)))
+        flags = self._capture(match, self._flags[group])
+        params['command'] = command.replace('{flags}', flags) if flags is not None else command
+        return 'execute_command', params
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'lookups': self.lookups,
+            'hits': self.hits,
+            'misses': self.lookups - self.hits,
+            'hit_rate': round(self.hit_rate, 3),
+            'rules': dict(sorted(self.rule_hits.items(), key=lambda item: -item[1])),
+        }
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Query normalization and near-duplicate lookup for VibeOS Shell caches
+Maps politely worded requests ("please list files", "list files") onto the
+same cache key, and finds reworded read-only questions ("show me the files
+here", "show the files in here") among cached answers
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+
+# Only politeness is removed from a request. Case, globs, paths and every
+# other word stay in the key, because 'rm -rf /' and 'rm -rf', 'delete *.log'
+# and 'delete logs' or 'open README.md' and 'open readme.md' are different
+# requests
+_POLITE_PREFIX = re.compile(
+    r'^(?:(?:hey|hi|hello|ok|okay)\b[,!]?\s+)?'
+    r'(?:(?:can|could|would|will)\s+you\s+)?'
+    r'(?:(?:please|pls|plz|kindly)\b[,]?\s+)?',
+    re.IGNORECASE)
+_POLITE_SUFFIX = re.compile(
+    r'(?:,\s*(?:please|pls|plz)|[,\s]\s*(?:thanks|thank\s+you|thx))\s*$',
+    re.IGNORECASE)
+# A closing '.' or '!' after a word ends the sentence; '.' after a space,
+# a dot or a slash ('ls .', 'cd ..', 'ls src/.') is a path
+_TRAILING_STOP = re.compile(r'(?<=[^\W_])[.!]+$')
+# A closing '?' is only punctuation for a question; 'rm file?' is a glob
+_TRAILING_QUESTION = re.compile(r'(?<=[^\W_])\?+$')
+QUESTION_WORDS = frozenset({
+    'what', 'which', 'where', 'who', 'when', 'why', 'how', 'is', 'are', 'am', 'was',
+    'were', 'do', 'does', 'did', 'can', 'could', 'will', 'would', 'should', 'has', 'have',
+})
+
+# Words that change what a request means. Requests differing in any of them
+# are never near-duplicates, however similar the rest of the wording is
+SIGNIFICANT_WORDS = frozenset({
+    'not', 'no', 'never', "don't", 'dont', "doesn't", "isn't", "aren't", "can't", 'cannot',
+    'without', 'except', 'unless', 'only', 'all', 'any', 'none', 'and', 'or', 'from', 'into',
+})
+
+# Filler words left out of the near-duplicate comparison only; the exact key
+# keeps them. Nothing in SIGNIFICANT_WORDS is a stop word
+STOP_WORDS = frozenset({
+    'a', 'an', 'the', 'me', 'my', 'i', 'you', 'your', 'we', 'us', 'our', 'it', 'its',
+    'is', 'are', 'am', 'be', 'been', 'was', 'were', 'do', 'does', 'did',
+    'please', 'pls', 'can', 'could', 'would', 'will', 'shall', 'should', 'kindly',
+    'in', 'on', 'at', 'of', 'for', 'with', 'to', 'by', 'about',
+    'that', 'there', 'just', 'some', 'let', 'lets', 'want', 'need', 'like', 'now',
+})
+
+# Sentence punctuation around a word; quotes, dots and slashes inside it stay
+_WORD_EDGES = ',;:!?()"\''
+
+
+def normalize_query(text: str) -> str:
+    """Canonical form of a natural-language request used as cache key"""
+    text = text.strip()
+    # Inside quotes whitespace may be part of an argument
+    if '"' not in text and "'" not in text:
+        text = ' '.join(text.split())
+    first = text.split(None, 1)[0].lower() if text else ''
+    text = _TRAILING_STOP.sub('', text)
+    if first in QUESTION_WORDS:
+        text = _TRAILING_QUESTION.sub('', text)
+    stripped = _POLITE_SUFFIX.sub('', _POLITE_PREFIX.sub('', text, count=1), count=1).strip()
+    # An input made only of politeness ("thanks") keeps its words
+    return stripped or text
+
+
+def stem(word: str) -> str:
+    """Very small suffix-stripping stemmer (files -> file, listing -> list)"""
+    if len(word) <= 3 or not word.isalpha():
+        return word
+    if word.endswith('ies') and len(word) > 4:
+        return word[:-3] + 'y'
+    if word.endswith(('sses', 'xes', 'zes', 'ches', 'shes')):
+        return word[:-2]
+    for suffix in ('ing', 'ed', 'ly'):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    if word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        return word[:-1]
+    return word
+
+
+def similarity_terms(normalized: str) -> List[str]:
+    """
+    Words of a normalized query as compared for near-duplicates.
+
+    Plain words are lowercased, stemmed and stripped of stop words, so
+    "show me the files here" and "show the file in here" compare equal.
+    Anything else (paths, globs, flags, numbers, 'README') is kept as typed.
+    """
+    terms = []
+    for token in normalized.split():
+        word = token.strip(_WORD_EDGES)
+        if not word:
+            continue
+        # Lowercase or sentence-capitalized words only; 'README' is a file name
+        if word.isalpha() and (word.islower() or word.istitle()):
+            word = word.lower()
+            if word in STOP_WORDS:
+                continue
+            word = stem(word)
+        terms.append(word)
+    # An input made only of stop words ("what is it") keeps its words
+    return terms or normalized.lower().split()
+
+
+def shingles(normalized: str) -> FrozenSet[str]:
+    """Unigrams plus word bigrams of the similarity terms, so word order still matters"""
+    tokens = similarity_terms(normalized)
+    grams = set(tokens)
+    grams.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+    return frozenset(grams)
+
+
+def significant_words(normalized: str) -> FrozenSet[str]:
+    """The meaning-changing words of a normalized query"""
+    words = (token.strip(_WORD_EDGES) for token in normalized.lower().split())
+    return frozenset(w for w in words if w in SIGNIFICANT_WORDS)
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class NearDuplicateIndex:
+    """
+    MinHash/LSH index of normalized queries.
+
+    Each entry is summarized by a MinHash signature split into bands; two
+    queries become candidates when any band matches exactly, and candidates
+    are confirmed with the exact shingle Jaccard similarity against the
+    threshold. Bands of six rows keep queries well below the threshold out
+    of the candidate set. Shingles are built from similarity_terms(), so
+    filler words and plural or -ing forms do not count against a match,
+    but candidates whose negations, quantifiers or conjunctions differ
+    from the query are never returned. A lookup touches
+    only the handful of entries sharing a bucket, so its cost stays flat as
+    the index grows. Entries are scoped (by working directory) and bounded
+    with LRU eviction.
+    """
+
+    _MASK = (1 << 32) - 1
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 48, bands: int = 8,
+                 max_entries: int = 100_000):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_entries = max_entries
+
+        # Fixed seeds keep signatures stable across runs
+        seed = hashlib.sha256(b'vibeos-minhash').digest()
+        params = []
+        for i in range(num_perm):
+            digest = hashlib.blake2b(seed + i.to_bytes(2, 'big'), digest_size=8).digest()
+            params.append((int.from_bytes(digest[:4], 'big') | 1, int.from_bytes(digest[4:], 'big')))
+        self._perms = params
+
+        self._lock = threading.Lock()
+        # key -> (scope, shingles, significant words, band hashes)
+        self._entries: 'OrderedDict[str, Tuple[str, FrozenSet[str], FrozenSet[str], Tuple[int, ...]]]' = \
+            OrderedDict()
+        self._buckets: Dict[Tuple[str, int, int], set] = {}
+
+        self.lookups = 0
+        self.matches = 0
+
+    def _signature_bands(self, grams: FrozenSet[str]) -> Tuple[int, ...]:
+        hashes = [int.from_bytes(hashlib.blake2b(g.encode(), digest_size=4).digest(), 'big') for g in grams]
+        if not hashes:
+            hashes = [0]
+        mask = self._MASK
+        # 32-bit multiply-add hashing stands in for random permutations and
+        # keeps every product within a machine-sized integer
+        signature = [min((a * h + b) & mask for h in hashes) for a, b in self._perms]
+        rows = self.rows
+        return tuple(hash(tuple(signature[i:i + rows])) for i in range(0, len(signature), rows))
+
+    def add(self, key: str, normalized: str, scope: str = '') -> None:
+        """Index a cache key under its normalized query"""
+        grams = shingles(normalized)
+        bands = self._signature_bands(grams)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (scope, grams, significant_words(normalized), bands)
+            for band, value in enumerate(bands):
+                self._buckets.setdefault((scope, band, value), set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def lookup(self, normalized: str, scope: str = '') -> Optional[Tuple[str, float]]:
+        """Return (key, similarity) of the most similar entry above threshold"""
+        grams = shingles(normalized)
+        significant = significant_words(normalized)
+        bands = self._signature_bands(grams)
+        with self._lock:
+            self.lookups += 1
+            candidates = set()
+            for band, value in enumerate(bands):
+                bucket = self._buckets.get((scope, band, value))
+                if bucket:
+                    candidates.update(bucket)
+
+            best: Optional[Tuple[str, float]] = None
+            for key in candidates:
+                _, entry_grams, entry_significant, _ = self._entries[key]
+                if entry_significant != significant:
+                    continue
+                similarity = jaccard(grams, entry_grams)
+                if similarity >= self.threshold and (best is None or similarity > best[1]):
+                    best = (key, similarity)
+            if best is not None:
+                self._entries.move_to_end(best[0])
+                self.matches += 1
+            return best
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def _remove(self, key: str) -> None:
+        scope, _, _, bands = self._entries.pop(key)
+        for band, value in enumerate(bands):
+            bucket = self._buckets.get((scope, band, value))
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[(scope, band, value)]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> Dict[str, object]:
+        return {
+            'entries': len(self._entries),
+            'threshold': self.threshold,
+            'lookups': self.lookups,
+            'matches': self.matches,
+        }
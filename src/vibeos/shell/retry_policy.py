@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Retry policy and circuit breaker for VibeOS Shell
+Decides per failure class whether a Claude call is worth repeating, spaces
+the attempts with jittered exponential backoff, and stops calling a backend
+that keeps failing until a background probe sees it healthy again
+"""
+
+import random
+import re
+import subprocess
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+# Failure classes
+TIMEOUT = 'timeout'            # no answer within the timeout
+RATE_LIMITED = 'rate_limited'  # 429 / overloaded: retry, but back off harder
+AUTH = 'auth'                  # not logged in or key rejected: retrying cannot help
+TRANSIENT = 'transient'        # crashed worker, network error, other non-zero exit
+FATAL = 'fatal'                # CLI missing or not executable
+
+# Retries allowed per class, capped by max_retries. A timed out attempt has
+# already cost a full command_timeout, so it gets one more chance only
+DEFAULT_RETRIES = {TRANSIENT: 3, RATE_LIMITED: 3, TIMEOUT: 1, AUTH: 0, FATAL: 0}
+# Failures that say something about the backend's health
+BREAKER_CLASSES = frozenset({TIMEOUT, TRANSIENT, RATE_LIMITED})
+
+_RATE_LIMITED = re.compile(r"\b(?:429|529)\b|rate.?limit|overloaded|too many requests", re.IGNORECASE)
+_AUTH = re.compile(r"\b(?:401|403)\b|unauthori[sz]ed|not (?:logged|signed) in|invalid (?:api )?key|"
+                   r"authentication|please (?:run )?.*login", re.IGNORECASE)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+def classify_failure(error: Optional[BaseException] = None, stderr: str = '') -> str:
+    """Failure class of an exception or of a failed run's stderr"""
+    if isinstance(error, subprocess.TimeoutExpired):
+        return TIMEOUT
+    if isinstance(error, (FileNotFoundError, PermissionError)):
+        return FATAL
+    if error is not None:
+        return TRANSIENT
+    if _RATE_LIMITED.search(stderr):
+        return RATE_LIMITED
+    if _AUTH.search(stderr):
+        return AUTH
+    return TRANSIENT
+
+
+class RetryPolicy:
+    """
+    When and after how long to retry.
+
+    The delay before retry n is drawn uniformly from [0, min(max_delay,
+    base_delay * 2**n)] ("full jitter"), so shells that failed together do
+    not retry together. Rate limits start from four times the base delay.
+    A retry is refused once its class has used up its retries or when it
+    would end after the request's total retry budget.
+    """
+
+    def __init__(self, max_retries: int = 3, base_delay: float = 0.5, max_delay: float = 8.0,
+                 budget: Optional[float] = None, retries: Optional[Dict[str, int]] = None):
+        self.max_retries = max(0, max_retries)
+        self.base_delay = max(0.0, base_delay)
+        self.max_delay = max(self.base_delay, max_delay)
+        self.budget = budget
+        self.retries = dict(DEFAULT_RETRIES)
+        self.retries.update(retries or {})
+
+        self.scheduled: Dict[str, int] = {}
+        self.refused: Dict[str, int] = {}
+
+    @classmethod
+    def from_config(cls, claude_config: Dict[str, Any]) -> 'RetryPolicy':
+        """Policy for the claude_code section of claude_config.json"""
+        return cls(
+            max_retries=claude_config.get('max_retries', 3),
+            base_delay=claude_config.get('retry_base_delay', 0.5),
+            max_delay=claude_config.get('retry_max_delay', 8.0),
+            budget=claude_config.get('retry_budget'),
+            retries=claude_config.get('retry_on'),
+        )
+
+    def backoff(self, error_class: str, attempt: int) -> float:
+        """Jittered delay before retrying after the given (0-based) attempt"""
+        base = self.base_delay * (4 if error_class == RATE_LIMITED else 1)
+        return random.uniform(0, min(self.max_delay, base * (2 ** attempt)))
+
+    def next_delay(self, error_class: str, attempt: int, elapsed: float,
+                   attempt_cost: float = 0.0, budget: Optional[float] = None) -> Optional[float]:
+        """
+        Seconds to wait before the next attempt, or None to give up.
+
+        attempt_cost is how long another attempt may take; it counts against
+        the budget together with the delay. budget overrides the configured
+        retry budget for this request.
+        """
+        budget = self.budget if budget is None else budget
+        limit = min(self.max_retries, self.retries.get(error_class, 0))
+        delay = self.backoff(error_class, attempt) if attempt < limit else None
+        if delay is not None and budget is not None and elapsed + delay + attempt_cost > budget:
+            delay = None
+        counter = self.refused if delay is None else self.scheduled
+        counter[error_class] = counter.get(error_class, 0) + 1
+        return delay
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'max_retries': self.max_retries,
+            'retries': dict(self.scheduled),
+            'gave_up': dict(self.refused),
+        }
+
+
+class CircuitBreaker:
+    """
+    Fails requests fast while a backend is down.
+
+    failure_threshold consecutive backend failures open the circuit. While
+    it is open allow() returns False immediately. With a probe, a background
+    thread calls it after reset_timeout, then at doubling intervals up to
+    max_reset_timeout, and closes the circuit when it succeeds. Without one,
+    the first request after reset_timeout is let through as a trial
+    (half-open) and its outcome decides.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0,
+                 max_reset_timeout: float = 300.0, probe: Optional[Callable[[], bool]] = None,
+                 debug_mode: bool = False):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = max(0.1, reset_timeout)
+        self.max_reset_timeout = max(self.reset_timeout, max_reset_timeout)
+        self.probe = probe
+        self.debug_mode = debug_mode
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._probe_thread: Optional[threading.Thread] = None
+        self.state = CLOSED
+        self.failures = 0
+        self._interval = self.reset_timeout
+        self._retry_at = 0.0
+
+        self.trips = 0
+        self.rejected = 0
+        self.probes = 0
+
+    @classmethod
+    def from_config(cls, claude_config: Dict[str, Any], probe: Optional[Callable[[], bool]] = None,
+                    debug_mode: bool = False) -> Optional['CircuitBreaker']:
+        """Breaker for the claude_code section of claude_config.json; None when disabled"""
+        if not claude_config.get('circuit_breaker', True):
+            return None
+        return cls(
+            failure_threshold=claude_config.get('breaker_failure_threshold', 3),
+            reset_timeout=claude_config.get('breaker_reset_timeout', 30.0),
+            max_reset_timeout=claude_config.get('breaker_max_reset_timeout', 300.0),
+            probe=probe,
+            debug_mode=debug_mode,
+        )
+
+    # ------------------------------------------------------------------ public
+
+    def allow(self) -> bool:
+        """Whether a call may go to the backend now"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and self.probe is None and time.monotonic() >= self._retry_at:
+                self.state = HALF_OPEN
+                return True
+            self.rejected += 1
+            return False
+
+    @property
+    def closed(self) -> bool:
+        """True while calls flow normally; unlike allow() this neither counts nor starts a trial"""
+        return self.state == CLOSED
+
+    @property
+    def retry_after(self) -> float:
+        """Seconds until the backend is tried again"""
+        if self.state == CLOSED:
+            return 0.0
+        return max(0.0, self._retry_at - time.monotonic())
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            if self.state != CLOSED:
+                self._close()
+
+    def record_failure(self, error_class: str) -> None:
+        """Count a failed call; classes that say nothing about the backend are ignored"""
+        if error_class not in BREAKER_CLASSES:
+            return
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN:
+                self._interval = min(self._interval * 2, self.max_reset_timeout)
+                self._open()
+            elif self.state == CLOSED and self.failures >= self.failure_threshold:
+                self._interval = self.reset_timeout
+                self._open()
+
+    def close(self) -> None:
+        """Stop the probe thread"""
+        self._stop.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'state': self.state,
+            'failures': self.failures,
+            'retry_after': round(self.retry_after, 1),
+            'trips': self.trips,
+            'rejected': self.rejected,
+            'probes': self.probes,
+        }
+
+    # ----------------------------------------------------------------- internal
+
+    def _open(self) -> None:
+        """Called with the lock held"""
+        if self.state == CLOSED:
+            self.trips += 1
+            if self.debug_mode:
+                print(f"[DEBUG] Circuit opened after {self.failures} failures")
+        self.state = OPEN
+        self._retry_at = time.monotonic() + self._interval
+        if self.probe is not None and (self._probe_thread is None or not self._probe_thread.is_alive()):
+            self._probe_thread = threading.Thread(target=self._probe_loop, name='vibesh-breaker-probe',
+                                                  daemon=True)
+            self._probe_thread.start()
+
+    def _close(self) -> None:
+        """Called with the lock held"""
+        self.state = CLOSED
+        self.failures = 0
+        self._interval = self.reset_timeout
+        if self.debug_mode:
+            print("[DEBUG] Circuit closed, backend is healthy")
+
+    def _probe_loop(self) -> None:
+        while not self._stop.wait(self.retry_after):
+            with self._lock:
+                if self.state == CLOSED:
+                    return
+            self.probes += 1
+            try:
+                healthy = bool(self.probe())
+            except Exception:
+                healthy = False
+            with self._lock:
+                if self.state == CLOSED:
+                    return
+                if healthy:
+                    self._close()
+                    return
+                self._interval = min(self._interval * 2, self.max_reset_timeout)
+                self._retry_at = time.monotonic() + self._interval
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Input sanitizer for VibeOS Shell
+The one place user input is cleaned before it reaches either parser. Input
+is trimmed and capped in length; for requests that end up in a shell command
+(the legacy parser), shell metacharacters also become spaces, hex and octal
+escape sequences are dropped and whitespace is collapsed
+"""
+
+import logging
+import re
+
+MAX_INPUT_LENGTH = 10000
+# Natural-language prompts for the Claude SDK, unless security.max_input_length says otherwise
+MAX_PROMPT_LENGTH = 5000
+
+# Shell metacharacters, each replaced by a space
+_METACHARACTERS = str.maketrans(';&|`$()', ' ' * 7)
+# Literal \xNN and \NNN escape sequences
+_ESCAPE = re.compile(r'\\(?:x[0-9a-fA-F]{2}|[0-7]{3})')
+
+
+def sanitize_input(text: str, max_length: int = MAX_INPUT_LENGTH, shell: bool = True) -> str:
+    """
+    Sanitized input, or '' when nothing is left.
+
+    With shell=False the input is a prompt no shell ever runs, so it is only
+    trimmed and capped; quotes, '$' and newlines in it reach Claude as typed.
+    Every step is a single linear scan in C (translate, split, join); the
+    escape pattern only runs when the input contains a backslash.
+    """
+    if not text or not isinstance(text, str):
+        return ''
+
+    text = text.strip()
+    if len(text) > max_length:
+        logging.warning("Input too long, truncating")
+        text = text[:max_length]
+    if not shell:
+        return text
+
+    text = text.translate(_METACHARACTERS)
+    if '\\' in text:
+        text = _ESCAPE.sub('', text)
+    # split() without arguments also strips, like re.sub(r'\s+', ' ', text).strip()
+    return ' '.join(text.split())
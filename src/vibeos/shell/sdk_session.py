@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Persistent Claude Code SDK session for VibeOS Shell
+Keeps one connected ClaudeSDKClient alive on a background event loop thread
+so consecutive requests reuse the same Claude CLI process
+"""
+
+import asyncio
+import atexit
+import threading
+import time
+from concurrent.futures import CancelledError, Future
+from typing import Any, Callable, Dict, Optional
+
+try:
+    from .tracing import get_tracer
+except ImportError:
+    from tracing import get_tracer
+
+
+class BackgroundLoop:
+    """An asyncio event loop running forever in a daemon thread"""
+
+    def __init__(self, name: str = "vibeos-sdk-loop"):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> asyncio.AbstractEventLoop:
+        """Start the loop thread if needed and return the loop"""
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                ready = threading.Event()
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._run, args=(self._loop, ready), name=self.name, daemon=True
+                )
+                self._thread.start()
+                ready.wait()
+            return self._loop
+
+    @staticmethod
+    def _run(loop: asyncio.AbstractEventLoop, ready: threading.Event) -> None:
+        asyncio.set_event_loop(loop)
+        loop.call_soon(ready.set)
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+
+    @property
+    def running(self) -> bool:
+        return self._loop is not None and self._loop.is_running()
+
+    def submit(self, coro) -> Future:
+        """Schedule a coroutine on the loop thread"""
+        return asyncio.run_coroutine_threadsafe(coro, self.start())
+
+    def stop(self, timeout: float = 2.0) -> None:
+        """Stop the loop and wait for its thread to exit"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop, self._thread = None, None
+        if loop is not None and loop.is_running():
+            loop.call_soon_threadsafe(self._cancel_and_stop, loop)
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    @staticmethod
+    def _cancel_and_stop(loop: asyncio.AbstractEventLoop) -> None:
+        """Let pending tasks (cancelled queries, deadline timers) unwind before stopping"""
+        tasks = asyncio.all_tasks(loop)
+        if not tasks:
+            loop.stop()
+            return
+        for task in tasks:
+            task.cancel()
+        asyncio.gather(*tasks, return_exceptions=True).add_done_callback(lambda _: loop.stop())
+
+
+class _WarmUp:
+    """Queued request to connect the client without sending a prompt"""
+
+    __slots__ = ('cwd', 'future')
+
+    def __init__(self, cwd: str, future: Future):
+        self.cwd = cwd
+        self.future = future
+
+
+class SDKSession:
+    """
+    One long-lived, connected ClaudeSDKClient served by a single owner task.
+
+    The SDK requires connect(), query(), receive_response() and disconnect()
+    to run inside the same task, so all requests are queued to one owner
+    coroutine which processes them in order and reconnects on failure.
+    """
+
+    def __init__(self, client_factory: Callable[[str], Any], loop: Optional[BackgroundLoop] = None,
+                 debug_mode: bool = False):
+        """
+        Args:
+            client_factory: Builds an unconnected ClaudeSDKClient for a working directory
+            loop: Event loop thread to run on (a private one is created if omitted)
+            debug_mode: Print connection lifecycle messages
+        """
+        self._client_factory = client_factory
+        self._loop = loop or BackgroundLoop()
+        self.debug_mode = debug_mode
+
+        self._lock = threading.Lock()
+        self._requests: Optional[asyncio.Queue] = None
+        self._owner: Optional[Future] = None
+        self._owner_task: Optional[asyncio.Task] = None
+        self._started = threading.Event()
+        self._current: Optional[Future] = None
+        self._cancelled = set()
+        self._client = None
+        self._client_cwd: Optional[str] = None
+        self._pending = 0
+        self._lost_connection = False
+        self._atexit_registered = False
+
+        self.created_at = time.time()
+        self.connected_at: Optional[float] = None
+        self.connects = 0
+        self.reconnects = 0
+        self.failures = 0
+        self.requests_served = 0
+        self.requests_on_connection = 0
+        self.cancellations = 0
+
+    # ------------------------------------------------------------------ public
+
+    @property
+    def connected(self) -> bool:
+        return self._client is not None
+
+    @property
+    def busy(self) -> bool:
+        """True while a request is queued or running on the session"""
+        return self._pending > 0
+
+    def continues(self, cwd: str) -> bool:
+        """True when the next request in cwd joins a conversation that already has turns"""
+        return self._client is not None and self._client_cwd == cwd and self.requests_on_connection > 0
+
+    def submit(self, prompt: str, cwd: str, on_message: Callable[[Any], None]) -> Future:
+        """
+        Queue a prompt on the long-lived client.
+
+        on_message is called on the loop thread for every SDK message of the
+        response. The returned future resolves once the response is complete.
+        """
+        future: Future = Future()
+        self._ensure_owner()
+        with self._lock:
+            self._pending += 1
+        self._loop.start().call_soon_threadsafe(
+            self._requests.put_nowait, (prompt, cwd, on_message, future)
+        )
+        return future
+
+    def warm(self, cwd: str) -> Future:
+        """
+        Spawn and connect the CLI for cwd ahead of the first request.
+
+        connect() runs the SDK's initialize handshake, so the CLI is loaded
+        and authenticated without sending a prompt or spending tokens. The
+        warm-up does not count as pending: a request arriving meanwhile
+        still queues behind it instead of falling back to a one-shot query.
+        """
+        future: Future = Future()
+        self._ensure_owner()
+        self._loop.start().call_soon_threadsafe(self._requests.put_nowait, _WarmUp(cwd, future))
+        return future
+
+    def cancel(self, future: Future, grace: float = 2.0) -> None:
+        """
+        Stop the request behind a future returned by submit() without waiting.
+
+        A queued request is dropped. A running one is interrupted so Claude
+        ends its turn and the connection stays usable; if the response has
+        not finished within grace seconds the connection is torn down and
+        the CLI process terminated.
+        """
+        if future.done() or not self._loop.running:
+            return
+        self._loop.submit(self._cancel(future, grace))
+
+    def reset(self) -> None:
+        """Drop the current connection; the next request starts a fresh one"""
+        if self._owner is None:
+            return
+        self._loop.start().call_soon_threadsafe(self._requests.put_nowait, 'reset')
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Disconnect the client and stop the owner task"""
+        with self._lock:
+            owner, self._owner = self._owner, None
+        if owner is None or not self._loop.running:
+            return
+        self._loop.start().call_soon_threadsafe(self._requests.put_nowait, None)
+        try:
+            owner.result(timeout)
+        except Exception:
+            pass
+
+    def get_status(self) -> Dict[str, Any]:
+        """Session age, connection lifecycle and reuse counters"""
+        now = time.time()
+        return {
+            'connected': self.connected,
+            'cwd': self._client_cwd,
+            'session_age': round(now - self.connected_at, 1) if self.connected_at else None,
+            'connects': self.connects,
+            'reconnects': self.reconnects,
+            'failures': self.failures,
+            'requests_served': self.requests_served,
+            'reuse_count': max(0, self.requests_on_connection - 1),
+            'pending': self._pending,
+            'cancellations': self.cancellations,
+        }
+
+    # ----------------------------------------------------------------- internal
+
+    def _ensure_owner(self) -> None:
+        with self._lock:
+            if self._owner is None or self._owner.done():
+                self._started = threading.Event()
+                self._owner = self._loop.submit(self._serve(self._started))
+                if not self._atexit_registered:
+                    atexit.register(self.close)
+                    self._atexit_registered = True
+            started = self._started
+        # Concurrent callers all wait until the request queue exists
+        started.wait()
+
+    async def _serve(self, started: threading.Event) -> None:
+        self._requests = asyncio.Queue()
+        self._owner_task = asyncio.current_task()
+        started.set()
+        try:
+            while True:
+                job = await self._requests.get()
+                if job is None:
+                    break
+                if job == 'reset':
+                    await self._disconnect()
+                    continue
+                if isinstance(job, _WarmUp):
+                    await self._warm(job)
+                    continue
+                await self._handle(*job)
+        finally:
+            await self._disconnect()
+            self._fail_queued()
+
+    def _fail_queued(self) -> None:
+        """Resolve requests still queued when the owner task stops"""
+        while not self._requests.empty():
+            job = self._requests.get_nowait()
+            if isinstance(job, _WarmUp):
+                if job.future.set_running_or_notify_cancel():
+                    job.future.set_exception(RuntimeError('SDK session stopped'))
+                continue
+            if not isinstance(job, tuple):
+                continue
+            future = job[3]
+            if future.set_running_or_notify_cancel():
+                future.set_exception(RuntimeError('SDK session stopped'))
+            with self._lock:
+                self._pending -= 1
+
+    async def _handle(self, prompt: str, cwd: str, on_message: Callable[[Any], None], future: Future) -> None:
+        try:
+            if not future.set_running_or_notify_cancel():
+                return
+
+            self._current = future
+            for attempt in range(2):
+                delivered = False
+                try:
+                    client = await self._ensure_client(cwd)
+                    await client.query(prompt)
+                    async for message in client.receive_response():
+                        delivered = True
+                        on_message(message)
+                    self.requests_served += 1
+                    self.requests_on_connection += 1
+                    future.set_result(None)
+                    return
+                except asyncio.CancelledError:
+                    # The owner task is being torn down by cancel(); callers
+                    # waiting in other threads see the concurrent.futures error
+                    future.set_exception(CancelledError())
+                    raise
+                except Exception as e:
+                    cancelled = future in self._cancelled
+                    if not cancelled:
+                        self.failures += 1
+                    self._lost_connection = True
+                    if self.debug_mode:
+                        print(f"[DEBUG] SDK session request failed: {e}")
+                    await self._disconnect()
+                    # A broken connection is retried once on a fresh client, but
+                    # never after part of the response was already delivered
+                    # or once the request was cancelled
+                    if delivered or attempt > 0 or cancelled:
+                        future.set_exception(e)
+                        return
+        finally:
+            self._current = None
+            self._cancelled.discard(future)
+            with self._lock:
+                self._pending -= 1
+
+    async def _warm(self, job: '_WarmUp') -> None:
+        if not job.future.set_running_or_notify_cancel():
+            return
+        try:
+            client = await self._ensure_client(job.cwd)
+        except Exception as e:
+            self.failures += 1
+            await self._disconnect()
+            job.future.set_exception(e)
+            return
+        job.future.set_result(client)
+
+    async def _cancel(self, future: Future, grace: float) -> None:
+        self.cancellations += 1
+        if future.cancel():
+            # Still queued; _handle skips it
+            return
+        self._cancelled.add(future)
+
+        client = self._client
+        if self._current is future and client is not None:
+            try:
+                await asyncio.wait_for(client.interrupt(), grace)
+            except Exception as e:
+                if self.debug_mode:
+                    print(f"[DEBUG] Interrupt failed: {e}")
+
+        deadline = time.monotonic() + grace
+        while not future.done() and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if not future.done() and self._current is future and self._owner_task is not None:
+            if self.debug_mode:
+                print("[DEBUG] Claude did not stop, closing the SDK session")
+            self._owner_task.cancel()
+
+    async def _ensure_client(self, cwd: str):
+        if self._client is not None and self._client_cwd == cwd:
+            return self._client
+        if self._client is not None:
+            # Tools run in the client's cwd, so a directory change needs a new CLI
+            await self._disconnect()
+
+        if self.debug_mode:
+            print(f"[DEBUG] Connecting persistent Claude SDK session in {cwd}")
+        client = self._client_factory(cwd)
+        with get_tracer().span('sdk.session.connect', reconnect=self._lost_connection):
+            await client.connect()
+
+        self._client = client
+        self._client_cwd = cwd
+        self.connected_at = time.time()
+        self.requests_on_connection = 0
+        self.connects += 1
+        if self._lost_connection:
+            self.reconnects += 1
+            self._lost_connection = False
+        return client
+
+    async def _disconnect(self) -> None:
+        client, self._client = self._client, None
+        self._client_cwd = None
+        self.connected_at = None
+        if client is None:
+            return
+        try:
+            await asyncio.wait_for(client.disconnect(), 5.0)
+        except Exception as e:
+            if self.debug_mode:
+                print(f"[DEBUG] Error disconnecting SDK session: {e}")
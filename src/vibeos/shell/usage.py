@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Token, cost and turn accounting for VibeOS Shell
+Aggregates the usage reported by Claude's result messages per shell session
+and per day in a small SQLite store, and enforces the budgets configured in
+the "usage" section of claude_config.json
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    from .response_cache import default_cache_dir
+except ImportError:
+    from response_cache import default_cache_dir
+
+
+# Rough characters-per-token ratio used to estimate a prompt before sending it
+CHARS_PER_TOKEN = 4
+
+# Hourly buckets are only needed for the hourly budget
+HOURLY_RETENTION = 48
+
+# Totals from other vibesh processes are re-read at most this often
+REFRESH_INTERVAL = 60.0
+
+
+class UsageRecord:
+    """Usage of one request, taken from the SDK ResultMessage"""
+
+    __slots__ = ('input_tokens', 'output_tokens', 'cache_read_tokens', 'cache_creation_tokens',
+                 'cost_usd', 'turns', 'duration_ms', 'is_error')
+
+    def __init__(self, usage: Optional[Dict[str, Any]] = None, cost_usd: Optional[float] = None,
+                 turns: int = 0, duration_ms: int = 0, is_error: bool = False):
+        usage = usage or {}
+        self.input_tokens = int(usage.get('input_tokens') or 0)
+        self.output_tokens = int(usage.get('output_tokens') or 0)
+        self.cache_read_tokens = int(usage.get('cache_read_input_tokens') or 0)
+        self.cache_creation_tokens = int(usage.get('cache_creation_input_tokens') or 0)
+        self.cost_usd = float(cost_usd or 0.0)
+        self.turns = int(turns or 0)
+        self.duration_ms = int(duration_ms or 0)
+        self.is_error = bool(is_error)
+
+    @classmethod
+    def from_result(cls, message: Any) -> 'UsageRecord':
+        return cls(getattr(message, 'usage', None), getattr(message, 'total_cost_usd', None),
+                   getattr(message, 'num_turns', 0), getattr(message, 'duration_ms', 0),
+                   getattr(message, 'is_error', False))
+
+    @property
+    def tokens(self) -> int:
+        return self.input_tokens + self.output_tokens + self.cache_read_tokens + self.cache_creation_tokens
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'input_tokens': self.input_tokens,
+            'output_tokens': self.output_tokens,
+            'cache_read_tokens': self.cache_read_tokens,
+            'cache_creation_tokens': self.cache_creation_tokens,
+            'cost_usd': round(self.cost_usd, 6),
+            'turns': self.turns,
+            'duration_ms': self.duration_ms,
+        }
+
+
+class UsageStore:
+    """
+    Per-day/per-session and per-hour usage totals in SQLite (WAL mode).
+
+    Rows are aggregates updated with an upsert, so the database grows by a
+    row per session per day rather than per request. Failures disable the
+    store; accounting then continues in memory only.
+    """
+
+    def __init__(self, path: Optional[Path] = None, debug_mode: bool = False):
+        self.path = Path(path) if path else default_cache_dir() / 'usage.sqlite3'
+        self.debug_mode = debug_mode
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._disabled = False
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if self._conn is not None or self._disabled:
+            return self._conn
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=5.0, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute('PRAGMA busy_timeout=5000')
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS usage_daily ('
+                ' day TEXT NOT NULL,'
+                ' session TEXT NOT NULL,'
+                ' requests INTEGER NOT NULL,'
+                ' input_tokens INTEGER NOT NULL,'
+                ' output_tokens INTEGER NOT NULL,'
+                ' cache_read_tokens INTEGER NOT NULL,'
+                ' cache_creation_tokens INTEGER NOT NULL,'
+                ' cost_usd REAL NOT NULL,'
+                ' turns INTEGER NOT NULL,'
+                ' duration_ms INTEGER NOT NULL,'
+                ' PRIMARY KEY (day, session)'
+                ') WITHOUT ROWID'
+            )
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS usage_hourly ('
+                ' hour INTEGER PRIMARY KEY,'
+                ' tokens INTEGER NOT NULL,'
+                ' cost_usd REAL NOT NULL'
+                ')'
+            )
+            self._conn = conn
+        except (sqlite3.Error, OSError) as e:
+            self._fail(e)
+        return self._conn
+
+    def _fail(self, error: Exception) -> None:
+        if self.debug_mode:
+            print(f"[DEBUG] Usage store disabled ({self.path}): {error}")
+        self._disabled = True
+        self._conn = None
+
+    def add(self, day: str, hour: int, session: str, record: UsageRecord) -> None:
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                conn.execute(
+                    'INSERT INTO usage_daily VALUES (?, ?, 1, ?, ?, ?, ?, ?, ?, ?) '
+                    'ON CONFLICT (day, session) DO UPDATE SET'
+                    ' requests = requests + 1,'
+                    ' input_tokens = input_tokens + excluded.input_tokens,'
+                    ' output_tokens = output_tokens + excluded.output_tokens,'
+                    ' cache_read_tokens = cache_read_tokens + excluded.cache_read_tokens,'
+                    ' cache_creation_tokens = cache_creation_tokens + excluded.cache_creation_tokens,'
+                    ' cost_usd = cost_usd + excluded.cost_usd,'
+                    ' turns = turns + excluded.turns,'
+                    ' duration_ms = duration_ms + excluded.duration_ms',
+                    (day, session, record.input_tokens, record.output_tokens, record.cache_read_tokens,
+                     record.cache_creation_tokens, record.cost_usd, record.turns, record.duration_ms)
+                )
+                conn.execute(
+                    'INSERT INTO usage_hourly VALUES (?, ?, ?) ON CONFLICT (hour) DO UPDATE SET'
+                    ' tokens = tokens + excluded.tokens, cost_usd = cost_usd + excluded.cost_usd',
+                    (hour, record.tokens, record.cost_usd)
+                )
+                conn.execute('DELETE FROM usage_hourly WHERE hour < ?', (hour - HOURLY_RETENTION,))
+                conn.execute('COMMIT')
+            except sqlite3.Error as e:
+                try:
+                    conn.execute('ROLLBACK')
+                except sqlite3.Error:
+                    pass
+                self._fail(e)
+
+    def totals(self, day: str, hour: int) -> Optional[Tuple[int, float, int, float]]:
+        """(tokens today, cost today, tokens this hour, cost this hour) across all sessions"""
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return None
+            try:
+                day_row = conn.execute(
+                    'SELECT COALESCE(SUM(input_tokens + output_tokens + cache_read_tokens'
+                    ' + cache_creation_tokens), 0), COALESCE(SUM(cost_usd), 0) FROM usage_daily WHERE day = ?',
+                    (day,)
+                ).fetchone()
+                hour_row = conn.execute(
+                    'SELECT tokens, cost_usd FROM usage_hourly WHERE hour = ?', (hour,)
+                ).fetchone() or (0, 0.0)
+                return int(day_row[0]), float(day_row[1]), int(hour_row[0]), float(hour_row[1])
+            except sqlite3.Error as e:
+                self._fail(e)
+                return None
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class UsageTracker:
+    """
+    Accounts usage for one shell session and checks budgets.
+
+    Hourly and daily totals are kept in memory and refreshed from the store
+    when the hour changes or at most every REFRESH_INTERVAL seconds, so the
+    pre-dispatch budget check is a few comparisons. Limits of 0 mean
+    unlimited.
+    """
+
+    def __init__(self, budgets: Optional[Dict[str, Any]] = None, store: Optional[UsageStore] = None):
+        budgets = budgets or {}
+        self.max_tokens_per_request = budgets.get('max_tokens_per_request', 0)
+        self.max_tokens_per_hour = budgets.get('max_tokens_per_hour', 0)
+        self.max_tokens_per_day = budgets.get('max_tokens_per_day', 0)
+        self.max_cost_per_hour = budgets.get('max_cost_per_hour_usd', 0)
+        self.max_cost_per_day = budgets.get('max_cost_per_day_usd', 0)
+        self.store = store
+
+        self.session = f"{os.getpid()}@{int(time.time())}"
+        self._lock = threading.Lock()
+        self._day = ''
+        self._hour = -1
+        self._refreshed_at = 0.0
+        self._day_tokens = 0
+        self._day_cost = 0.0
+        self._hour_tokens = 0
+        self._hour_cost = 0.0
+
+        self.requests = 0
+        self.totals = UsageRecord()
+        self.rejected = 0
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], debug_mode: bool = False) -> 'UsageTracker':
+        """Build the tracker from the "usage" section of claude_config.json"""
+        usage_config = config.get('usage', {})
+        store = UsageStore(debug_mode=debug_mode) if usage_config.get('persist', True) else None
+        return cls(usage_config, store)
+
+    def _refresh(self, now: float) -> None:
+        day = time.strftime('%Y-%m-%d', time.localtime(now))
+        hour = int(now // 3600)
+        if day == self._day and hour == self._hour and now - self._refreshed_at < REFRESH_INTERVAL:
+            return
+        totals = self.store.totals(day, hour) if self.store is not None else None
+        if totals is not None:
+            self._day_tokens, self._day_cost, self._hour_tokens, self._hour_cost = totals
+        else:
+            if day != self._day:
+                self._day_tokens, self._day_cost = 0, 0.0
+            if hour != self._hour:
+                self._hour_tokens, self._hour_cost = 0, 0.0
+        self._day, self._hour, self._refreshed_at = day, hour, now
+
+    def check(self, prompt: str) -> Optional[str]:
+        """Pre-dispatch budget check; returns the reason a request must not be sent"""
+        if self.max_tokens_per_request and len(prompt) // CHARS_PER_TOKEN > self.max_tokens_per_request:
+            return self._reject(f"Request is larger than the {self.max_tokens_per_request} token per-request budget")
+
+        with self._lock:
+            self._refresh(time.time())
+            if self.max_tokens_per_hour and self._hour_tokens >= self.max_tokens_per_hour:
+                reason = f"Hourly token budget of {self.max_tokens_per_hour} used up"
+            elif self.max_cost_per_hour and self._hour_cost >= self.max_cost_per_hour:
+                reason = f"Hourly cost budget of ${self.max_cost_per_hour:.2f} used up"
+            elif self.max_tokens_per_day and self._day_tokens >= self.max_tokens_per_day:
+                reason = f"Daily token budget of {self.max_tokens_per_day} used up"
+            elif self.max_cost_per_day and self._day_cost >= self.max_cost_per_day:
+                reason = f"Daily cost budget of ${self.max_cost_per_day:.2f} used up"
+            else:
+                return None
+        return self._reject(reason)
+
+    def _reject(self, reason: str) -> str:
+        self.rejected += 1
+        return reason
+
+    def record(self, record: UsageRecord) -> Optional[str]:
+        """Account a finished request; returns a warning if it exceeded the per-request budget"""
+        now = time.time()
+        with self._lock:
+            self._refresh(now)
+            self.requests += 1
+            for field in UsageRecord.__slots__[:-1]:
+                setattr(self.totals, field, getattr(self.totals, field) + getattr(record, field))
+            self._day_tokens += record.tokens
+            self._day_cost += record.cost_usd
+            self._hour_tokens += record.tokens
+            self._hour_cost += record.cost_usd
+            day, hour = self._day, self._hour
+
+        if self.store is not None:
+            self.store.add(day, hour, self.session, record)
+
+        if self.max_tokens_per_request and record.tokens > self.max_tokens_per_request:
+            return f"Request used {record.tokens} tokens, over the {self.max_tokens_per_request} token budget"
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'session': dict(self.totals.to_dict(), requests=self.requests),
+                'hour': {'tokens': self._hour_tokens, 'cost_usd': round(self._hour_cost, 6)},
+                'today': {'tokens': self._day_tokens, 'cost_usd': round(self._day_cost, 6)},
+                'rejected': self.rejected,
+            }
+
+    def close(self) -> None:
+        if self.store is not None:
+            self.store.close()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Shared utilities for VibeOS Shell parsers
+Configuration loading, logging setup, the in-memory command cache and history
+of the legacy parser, and history-based suggestions
+"""
+
+import copy
+import json
+import logging
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+try:
+    from .response_cache import ResponseCache
+except ImportError:
+    from response_cache import ResponseCache
+
+
+CONFIG_PATH = Path("/etc/vibeos/claude_config.json")
+DEFAULT_HISTORY_SIZE = 50
+MAX_SUGGESTIONS = 5
+
+
+class VibeOSConfig:
+    """Loads /etc/vibeos/claude_config.json over a parser's defaults"""
+
+    @staticmethod
+    def load_config(default_config: Optional[Dict[str, Any]] = None,
+                    path: Optional[Path] = None) -> Dict[str, Any]:
+        """
+        Defaults with the file's values merged in section by section.
+
+        A missing file gives the defaults; an unreadable one gives the
+        defaults with a warning.
+        """
+        config = copy.deepcopy(default_config or {})
+        config_path = Path(path) if path else CONFIG_PATH
+        try:
+            with open(config_path, 'r') as f:
+                loaded = json.load(f)
+        except FileNotFoundError:
+            return config
+        except (OSError, ValueError) as e:
+            logging.warning(f"Could not load config {config_path}: {e}")
+            return config
+        if not isinstance(loaded, dict):
+            logging.warning(f"Ignoring config {config_path}: not a JSON object")
+            return config
+
+        for section, values in loaded.items():
+            if isinstance(values, dict) and isinstance(config.get(section), dict):
+                config[section].update(values)
+            else:
+                config[section] = values
+        return config
+
+
+class VibeOSDebug:
+    """Debug switch and logging setup"""
+
+    @staticmethod
+    def is_debug_enabled(config: Dict[str, Any]) -> bool:
+        return bool(config.get('debug', {}).get('enabled', False))
+
+    @staticmethod
+    def setup_logging(debug_mode: bool) -> None:
+        """Configure the root logger once; later calls leave it alone"""
+        logging.basicConfig(level=logging.DEBUG if debug_mode else logging.WARNING,
+                            format='[%(levelname)s] %(message)s')
+
+
+class VibeOSContextManager:
+    """
+    Command cache and recent history of the legacy parser.
+
+    The cache is a ResponseCache (LRU with TTL) that the caller keys with
+    create_cache_key(); the history keeps the last history_size
+    (input, command) pairs for suggestions.
+    """
+
+    def __init__(self, cache_enabled: bool = True, cache_ttl: float = 3600,
+                 history_size: int = DEFAULT_HISTORY_SIZE):
+        self.cache = ResponseCache(ttl=cache_ttl) if cache_enabled else None
+        self.history: Deque[Tuple[str, str]] = deque(maxlen=max(1, history_size))
+
+    @staticmethod
+    def create_cache_key(text: str, context: Dict[str, Any]) -> str:
+        """Cache key for a request in the working directory of its context"""
+        return f"{text}:{context.get('cwd', '')}"
+
+    def get_cached_response(self, key: str) -> Optional[Dict[str, Any]]:
+        if self.cache is None:
+            return None
+        response = self.cache.get(key)
+        return {'response': response} if response is not None else None
+
+    def cache_response(self, key: str, response: str) -> None:
+        if self.cache is not None:
+            self.cache.put(key, response)
+
+    def add_to_history(self, user_input: str, command: str) -> None:
+        self.history.append((user_input, command))
+
+    def clear_context(self) -> None:
+        self.history.clear()
+        if self.cache is not None:
+            self.cache.clear()
+
+
+class BaseSuggestionEngine:
+    """Suggests earlier requests and commands that start with what was typed"""
+
+    def __init__(self, context_manager: VibeOSContextManager):
+        self.context_manager = context_manager
+
+    def get_suggestions(self, partial_input: str) -> List[str]:
+        """Up to MAX_SUGGESTIONS matches, most recent first"""
+        prefix = partial_input.lower()
+        suggestions: List[str] = []
+        for user_input, command in reversed(self.context_manager.history):
+            for candidate in (user_input, command):
+                if candidate.lower().startswith(prefix) and candidate not in suggestions:
+                    suggestions.append(candidate)
+                    if len(suggestions) == MAX_SUGGESTIONS:
+                        return suggestions
+        return suggestions
@@ -16,21 +16,40 @@ from typing import Optional, Dict, List, Tuple
 if '/usr/lib/vibeos' not in sys.path:
     sys.path.insert(0, '/usr/lib/vibeos')
 
+# FailoverParser holds the SDK parser and the legacy subprocess parser and
+# routes each request to the healthier one. The parser modules, and their
+# heavy dependencies (the Claude SDK), are imported when the parsers are
+# created, so importing vibesh stays fast
 try:
-    # Try SDK parser first (new implementation)
-    from .claude_sdk_parser import ClaudeSDKParser as ClaudeParser
-    print("[VIBEOS] Using Claude SDK Parser (new)")
+    from .failover import FailoverParser
+    from .batch import run_batch, EXIT_UNAVAILABLE
+    from .fast_path import LocalIntentEngine, PREVIOUS_DIRECTORY
+    from .tracing import get_tracer
 except ImportError:
-    try:
-        # Fall back to old subprocess parser
-        from .claude_code_parser import ClaudeCodeParser as ClaudeParser
-        print("[VIBEOS] Using legacy subprocess parser")
-    except ImportError:
-        # Last resort - try absolute imports
-        try:
-            from claude_sdk_parser import ClaudeSDKParser as ClaudeParser
-        except ImportError:
-            from claude_code_parser import ClaudeCodeParser as ClaudeParser
+    from failover import FailoverParser
+    from batch import run_batch, EXIT_UNAVAILABLE
+    from fast_path import LocalIntentEngine, PREVIOUS_DIRECTORY
+    from tracing import get_tracer
+
+
+class StreamRenderer:
+    """Prints Claude's text blocks to the terminal as they arrive"""
+
+    def __init__(self):
+        self.started = False
+
+    def __call__(self, text: str) -> None:
+        if not self.started:
+            print("\n🤖 Claude: ", end='')
+            self.started = True
+        else:
+            print()
+        print(text, end='', flush=True)
+
+    def finish(self) -> None:
+        """Terminate the streamed output line"""
+        if self.started:
+            print()
 
 
 class VibeShell:
@@ -48,7 +67,9 @@ class VibeShell:
 
         # Claude Code is mandatory - but we'll offer to install it
         try:
-            self.parser = ClaudeParser()
+            self.parser = FailoverParser()
+            if self.debug_mode:
+                print(f"[DEBUG] Using {self.parser.active}")
         except Exception as e:
             if self.debug_mode:
                 print(f"[DEBUG] Failed to initialize parser: {e}")
@@ -96,6 +117,15 @@ class VibeShell:
             if self.debug_mode:
                 print("[DEBUG] Claude Code detection successful")
 
+        # Per-stage timings when VIBEOS_TRACE is set
+        self.tracer = get_tracer()
+
+        # Mechanical requests are answered locally instead of by Claude;
+        # fallback_to_regex keeps them working while Claude is unavailable
+        claude_config = getattr(self.parser, 'config', {}).get('claude_code', {})
+        self.fast_path = LocalIntentEngine.from_config(claude_config)
+        self.fallback_to_regex = claude_config.get('fallback_to_regex', False)
+
         # No executor or context needed - Claude Code handles everything
         self.running = True
         self.history_file = Path.home() / '.vibesh_history'
@@ -159,6 +189,10 @@ class VibeShell:
     
     def get_prompt(self) -> str:
         """Generate context-aware prompt"""
+        with self.tracer.span('vibesh.get_prompt'):
+            return self._get_prompt()
+
+    def _get_prompt(self) -> str:
         cwd = os.getcwd()
         home = str(Path.home())
         
@@ -169,12 +203,13 @@ class VibeShell:
         # Check for git repository
         git_info = ""
         try:
-            result = subprocess.run(
-                ["git", "rev-parse", "--abbrev-ref", "HEAD"],
-                capture_output=True,
-                text=True,
-                timeout=1
-            )
+            with self.tracer.span('vibesh.get_prompt.git'):
+                result = subprocess.run(
+                    ["git", "rev-parse", "--abbrev-ref", "HEAD"],
+                    capture_output=True,
+                    text=True,
+                    timeout=1
+                )
             if result.returncode == 0:
                 branch = result.stdout.strip()
                 git_info = f" ({branch})"
@@ -185,6 +220,10 @@ class VibeShell:
     
     def process_input(self, user_input: str) -> bool:
         """Process user input and execute appropriate commands"""
+        with self.tracer.span('vibesh.process_input'):
+            return self._process_input(user_input)
+
+    def _process_input(self, user_input: str) -> bool:
         # Basic validation
         if not user_input or not isinstance(user_input, str):
             return True
@@ -202,6 +241,21 @@ class VibeShell:
             self.show_help()
             return True
 
+        # Start a fresh Claude conversation instead of continuing the last one
+        if user_input.lower() in ['new session', 'start fresh', 'new conversation']:
+            if self.parser and hasattr(self.parser, 'new_session'):
+                self.parser.new_session(os.getcwd())
+                print("🆕 Starting a fresh conversation with Claude")
+            return True
+
+        # Answer trivial requests locally; must run before the GUI keywords,
+        # which would otherwise open the file manager for "list files"
+        if self.fast_path and (self.fallback_to_regex or (self.parser and self.parser.claude_available)):
+            local = self.fast_path.classify(user_input)
+            if local is not None:
+                with self.tracer.span('vibesh.fast_path', rule=local[1]['fast_path']):
+                    return self.handle_local_intent(*local)
+
         # Handle GUI application commands
         if self.handle_gui_commands(user_input):
             return True
@@ -233,56 +287,56 @@ class VibeShell:
             'cwd': os.getcwd()
         }
 
-        # Claude Code processes everything
-        intent, params = self.parser.parse(user_input, context_data)
+        # Claude Code processes everything, streaming text when the parser supports it
+        if getattr(self.parser, 'supports_streaming', False):
+            renderer = StreamRenderer()
+            try:
+                with self.tracer.span('vibesh.parse') as span:
+                    intent, params = self.parser.parse(user_input, context_data, on_text=renderer)
+                    span['intent'] = intent
+            finally:
+                renderer.finish()
+        else:
+            with self.tracer.span('vibesh.parse') as span:
+                intent, params = self.parser.parse(user_input, context_data)
+                span['intent'] = intent
 
         # Handle SDK responses
         if intent == "sdk_response":
             # SDK provided a direct response - this IS the conversation
             response = params.get('response', '')
             if response:
-                print(f"\n🤖 Claude: {response}")
+                if not params.get('streamed'):
+                    print(f"\n🤖 Claude: {response}")
 
                 # Check if response cached
                 if params.get('from_cache'):
                     print("   (from cache)")
+                if params.get('partial'):
+                    print("   ⏱️  (stopped at the time limit, answer may be incomplete)")
+                if params.get('budget_warning'):
+                    print(f"   ⚠️  {params['budget_warning']}")
+                if params.get('failed_over'):
+                    print(f"   ↪️  (answered by the {params['backend']} backend)")
             else:
                 print("\n❌ Empty response from Claude")
             return True
 
+        # Ctrl+C stopped the query; keep whatever Claude already said
+        elif intent == "cancelled":
+            response = params.get('response', '')
+            if response and not params.get('streamed'):
+                print(f"\n🤖 Claude: {response}")
+            print("\n⏹️  Cancelled")
+            return True
+
         # Handle legacy command execution (for backward compatibility)
         elif intent == "execute_command":
-            try:
-                command = params.get('command', '')
-                if not command:
-                    print("⚠️  No command provided")
-                    return True
-
-                print(f"💭 Executing: {command}")
-
-                # Execute command with timeout
-                result = subprocess.run(
-                    command,
-                    shell=True,
-                    capture_output=True,
-                    text=True,
-                    timeout=60,  # Keep the timeout improvement
-                    cwd=os.getcwd()
-                )
-
-                if result.stdout:
-                    print(result.stdout)
-                if result.stderr and result.returncode != 0:
-                    print(f"⚠️  {result.stderr}")
-
-                return True
-
-            except subprocess.TimeoutExpired:
-                print("⚠️  Command timed out after 60 seconds")
-                return True
-            except Exception as e:
-                print(f"⚠️  Error executing command: {e}")
+            # The SDK backend answers in text; a command from the legacy
+            # backend it failed over to is only run once the user agrees
+            if params.get('failed_over') and not self.confirm_failover(params):
                 return True
+            return self.execute_command(params.get('command', ''))
 
         # Handle various error states
         elif intent in ["sdk_not_available", "cli_not_available", "cli_not_found"]:
@@ -308,6 +362,28 @@ class VibeShell:
                 print("\n💡 Check if Claude Code CLI is properly installed")
             return True
 
+        # Hard deadline: show whatever arrived instead of nothing
+        elif intent == "timeout":
+            response = params.get('response', '')
+            if response and not params.get('streamed'):
+                print(f"\n🤖 Claude: {response}")
+            print(f"\n⏱️  {params.get('error', 'Claude Code took too long to respond')}")
+            if params.get('partial'):
+                print("   (the answer above is incomplete)")
+            return True
+
+        # Circuit breaker is open: the backend failed repeatedly and is being probed
+        elif intent == "backend_unavailable":
+            print(f"\n⛔ {params.get('error', 'Claude Code is not responding')}")
+            if params.get('retry_after'):
+                print(f"💡 Claude Code will be tried again in about {params['retry_after']}s")
+            return True
+
+        elif intent == "budget_exceeded":
+            print(f"\n💸 {params.get('error', 'Usage budget exceeded')}")
+            print("💡 Raise the limits in the \"usage\" section of /etc/vibeos/claude_config.json")
+            return True
+
         elif intent == "empty_response":
             print(f"\n❌ {params.get('error', 'Claude returned an empty response')}")
             print("💡 Try rephrasing your request or check your internet connection")
@@ -323,6 +399,86 @@ class VibeShell:
 
         return True
 
+    def handle_local_intent(self, intent: str, params: Dict) -> bool:
+        """Carry out a request resolved by the local fast path"""
+        if intent == "change_directory":
+            return self.change_directory(params['path'])
+        print(f"⚡ {params['command']}")
+        return self.execute_command(params['command'], announce=False)
+
+    def change_directory(self, path: str) -> bool:
+        """Move the shell itself; a subprocess could not change our cwd"""
+        if path == PREVIOUS_DIRECTORY:
+            # Like a shell's "cd -", through OLDPWD
+            if not os.environ.get('OLDPWD'):
+                print("⚠️  Cannot change directory: no previous directory")
+                return True
+            path = os.environ['OLDPWD']
+        target = Path(os.path.expanduser(path))
+        try:
+            previous = os.getcwd()
+            if not target.is_dir() and not target.is_absolute():
+                # "go to documents" finds ./Documents
+                matches = [entry for entry in Path.cwd().iterdir()
+                           if entry.is_dir() and entry.name.lower() == path.lower()]
+                if len(matches) == 1:
+                    target = matches[0]
+            os.chdir(target)
+            os.environ['OLDPWD'] = previous
+        except OSError as e:
+            print(f"⚠️  Cannot change directory: {e.strerror or e}")
+            return True
+        print(f"📁 {os.getcwd()}")
+        return True
+
+    def confirm_failover(self, params: Dict) -> bool:
+        """Ask before running a command proposed by the fallback backend"""
+        print(f"\n↪️  Claude SDK is not answering; the {params.get('backend', 'fallback')} backend "
+              f"proposes running:\n   {params.get('command', '')}")
+        try:
+            answer = input("Run it? (y/N): ").strip().lower()
+        except (EOFError, KeyboardInterrupt):
+            answer = ''
+        if answer not in ('y', 'yes'):
+            print("Not run.")
+            return False
+        return True
+
+    def execute_command(self, command: str, announce: bool = True) -> bool:
+        """Run a shell command in the current directory and print its output"""
+        try:
+            if not command:
+                print("⚠️  No command provided")
+                return True
+
+            if announce:
+                print(f"💭 Executing: {command}")
+
+            # Execute command with timeout
+            with self.tracer.span('vibesh.execute_command'):
+                result = subprocess.run(
+                    command,
+                    shell=True,
+                    capture_output=True,
+                    text=True,
+                    timeout=60,  # Keep the timeout improvement
+                    cwd=os.getcwd()
+                )
+
+            if result.stdout:
+                print(result.stdout)
+            if result.stderr and result.returncode != 0:
+                print(f"⚠️  {result.stderr}")
+
+            return True
+
+        except subprocess.TimeoutExpired:
+            print("⚠️  Command timed out after 60 seconds")
+            return True
+        except Exception as e:
+            print(f"⚠️  Error executing command: {e}")
+            return True
+
     def handle_gui_commands(self, user_input: str) -> bool:
         """Handle GUI application launching commands"""
         user_input = user_input.lower().strip()
@@ -442,6 +598,9 @@ class VibeShell:
         print("  • go to [directory]")
         print("  • show current directory")
         print("  • list files")
+        print("\n  (simple navigation, listing, git and system checks run locally without Claude)")
+        print("\nConversation:")
+        print("  • new session / start fresh - forget the current conversation with Claude")
         print("\n" + "="*60)
     
     def launch_ai_assistant(self):
@@ -463,6 +622,18 @@ class VibeShell:
     
     def run(self):
         """Main shell loop"""
+        try:
+            self._run()
+        finally:
+            # Stops the SDK session and CLI workers, saves usage and latency
+            # data and removes the conversation spill log
+            if self.parser and hasattr(self.parser, 'close'):
+                self.parser.close()
+
+    def _run(self):
+        # Spawn and connect the backend while the banner and first prompt are shown
+        if self.parser and hasattr(self.parser, 'warm_up'):
+            self.parser.warm_up()
         self.print_banner()
         
         while self.running:
@@ -490,9 +661,42 @@ class VibeShell:
                 print("\nGoodbye!")
                 break
 
+        if self.tracer.enabled:
+            print(f"\nTrace written to {self.tracer.path}")
+            print(self.tracer.format_summary())
+        if self.debug_mode and self.fast_path:
+            stats = self.fast_path.get_stats()
+            print(f"[DEBUG] Fast path: {stats['hits']}/{stats['lookups']} answered locally "
+                  f"(hit rate {stats['hit_rate']:.0%})")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> 'argparse.Namespace':
+    """Command line options for vibesh"""
+    # Imported here: argparse is a sizeable part of the shell's import time
+    import argparse
+    parser = argparse.ArgumentParser(prog='vibesh', description='VibeOS natural language shell')
+    parser.add_argument('--batch', metavar='FILE',
+                        help="run the requests in FILE (one per line, '-' for stdin) and exit")
+    parser.add_argument('--jobs', '-j', type=int, default=4,
+                        help='number of requests processed concurrently in batch mode (default: 4)')
+    parser.add_argument('--as-completed', action='store_true',
+                        help='print batch results as they complete instead of in input order')
+    return parser.parse_args(argv)
+
 
 def main():
     """Entry point for vibesh"""
+    args = parse_args()
+    if args.batch:
+        try:
+            parser = FailoverParser()
+        except Exception as e:
+            print(f"❌ Failed to initialize parser: {e}", file=sys.stderr)
+            sys.exit(EXIT_UNAVAILABLE)
+        fast_path = LocalIntentEngine.from_config(parser.config.get('claude_code', {}))
+        sys.exit(run_batch(parser, args.batch, jobs=args.jobs, ordered=not args.as_completed,
+                           fast_path=fast_path))
+
     shell = VibeShell()
     shell.run()
 
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Backend warm-up for VibeOS Shell
+Pulls the Claude CLI and Node into the page cache so the first spawn does
+not wait on disk reads (on the live ISO, on a squashfs decompression)
+"""
+
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+try:
+    from .claude_cli import get_cli_discovery
+except ImportError:
+    from claude_cli import get_cli_discovery
+
+PRIME_SUFFIXES = ('.js', '.mjs', '.cjs', '.wasm', '.json', '.node')
+MAX_PRIME_BYTES = 128 * 1024 * 1024
+READ_CHUNK = 1024 * 1024
+
+
+def warm_files() -> List[Path]:
+    """Files the first CLI start reads: node itself and the CLI package"""
+    files: List[Path] = []
+    node = shutil.which('node')
+    if node:
+        files.append(Path(os.path.realpath(node)))
+    cli = get_cli_discovery().find()
+    package = cli.package_dir if cli is not None else None
+    if package is not None:
+        for root, _, names in os.walk(package):
+            for name in names:
+                if name.endswith(PRIME_SUFFIXES):
+                    files.append(Path(root) / name)
+    return files
+
+
+def prime_page_cache(files: Iterable[Path], max_bytes: int = MAX_PRIME_BYTES) -> Dict[str, int]:
+    """
+    Ask the kernel to read files ahead (POSIX_FADV_WILLNEED), reading them
+    outright where fadvise is unavailable. Stops after max_bytes.
+    """
+    primed_files = 0
+    primed_bytes = 0
+    for path in files:
+        try:
+            size = path.stat().st_size
+            if primed_bytes + size > max_bytes:
+                break
+            with open(path, 'rb') as f:
+                if hasattr(os, 'posix_fadvise'):
+                    os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+                else:
+                    while f.read(READ_CHUNK):
+                        pass
+        except OSError:
+            continue
+        primed_files += 1
+        primed_bytes += size
+    return {'files': primed_files, 'bytes': primed_bytes}
@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Claude CLI worker pool for the legacy parser
+Keeps `claude -p` processes speaking newline-framed stream-json on
+stdin/stdout started ahead of time, so a request no longer waits for Node
+to start and load the CLI
+"""
+
+import atexit
+import json
+import queue
+import subprocess
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+try:
+    from .tracing import get_tracer, percentile
+except ImportError:
+    from tracing import get_tracer, percentile
+
+STREAM_ARGS = ['-p', '--input-format', 'stream-json', '--output-format', 'stream-json', '--verbose']
+DEFAULT_POOL_SIZE = 2
+# A worker is one CLI conversation: serving a second request would show it
+# the first one's prompt and grow the token cost of every later request
+DEFAULT_MAX_REQUESTS = 1
+DEFAULT_MAX_RSS_MB = 512
+WAIT_SAMPLES = 512
+# How often a cancellable request checks whether it was cancelled
+CANCEL_POLL = 0.05
+
+_EOF = object()
+
+
+class WorkerError(RuntimeError):
+    """A worker died or answered with something other than a result"""
+
+
+class WorkerTimeout(WorkerError):
+    """A worker did not finish its response in time"""
+
+
+class WorkerCancelled(WorkerError):
+    """The request was cancelled, e.g. because a hedged request won"""
+
+
+def _rss_kb(pid: int) -> int:
+    """Resident set size of a process and its direct children, in kB"""
+    total = 0
+    pids = [pid]
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children', 'r') as f:
+            pids.extend(int(child) for child in f.read().split())
+    except OSError:
+        pass
+    for p in pids:
+        try:
+            with open(f'/proc/{p}/status', 'r') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1])
+                        break
+        except (OSError, ValueError):
+            continue
+    return total
+
+
+class CLIWorker:
+    """
+    One long-lived Claude CLI process.
+
+    Requests are user messages written as one JSON line each; the CLI
+    answers with JSON lines ending in a 'result' message. A reader thread
+    moves stdout lines into a queue so waits can time out.
+    """
+
+    def __init__(self, argv: List[str], cwd: Optional[str] = None):
+        self.process = subprocess.Popen(
+            argv, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            text=True, bufsize=1, cwd=cwd
+        )
+        self.cwd = cwd
+        self.started_at = time.time()
+        self.requests = 0
+        self._lines: 'queue.Queue[Any]' = queue.Queue()
+        self._reader = threading.Thread(target=self._read, name=f'claude-worker-{self.pid}', daemon=True)
+        self._reader.start()
+
+    @property
+    def pid(self) -> int:
+        return self.process.pid
+
+    @property
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def rss_kb(self) -> int:
+        return _rss_kb(self.pid)
+
+    def request(self, prompt: str, timeout: Optional[float], cancel: Optional[threading.Event] = None,
+                on_output: Optional[Callable[[], bool]] = None) -> str:
+        """
+        Send one prompt and return the text of its result.
+
+        on_output is called for every message of the response; when it
+        returns False the request is abandoned as cancelled, as it is when
+        cancel is set.
+        """
+        message = {
+            'type': 'user',
+            'message': {'role': 'user', 'content': prompt},
+            'parent_tool_use_id': None,
+            'session_id': 'default',
+        }
+        try:
+            self.process.stdin.write(json.dumps(message) + '\n')
+            self.process.stdin.flush()
+        except (OSError, ValueError) as e:
+            raise WorkerError(f'worker {self.pid} is gone: {e}')
+        self.requests += 1
+
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        text_parts: List[str] = []
+        while True:
+            remaining = deadline - time.monotonic() if deadline is not None else None
+            if remaining is not None and remaining <= 0:
+                raise WorkerTimeout(f'no result within {max(timeout, 0.0):.1f} seconds')
+            if cancel is not None:
+                if cancel.is_set():
+                    raise WorkerCancelled('request cancelled')
+                remaining = CANCEL_POLL if remaining is None else min(remaining, CANCEL_POLL)
+            try:
+                line = self._lines.get(timeout=remaining)
+            except queue.Empty:
+                continue
+            if line is _EOF:
+                raise WorkerError(f'worker {self.pid} closed its output (exit code {self.process.poll()})')
+            try:
+                data = json.loads(line)
+            except ValueError:
+                continue
+            if on_output is not None and data.get('type') in ('assistant', 'result') and not on_output():
+                raise WorkerCancelled('another request answered first')
+            if data.get('type') == 'assistant':
+                for block in data.get('message', {}).get('content', []):
+                    if isinstance(block, dict) and block.get('type') == 'text':
+                        text_parts.append(block.get('text', ''))
+            elif data.get('type') == 'result':
+                if data.get('is_error'):
+                    raise WorkerError(data.get('result') or data.get('subtype') or 'error result')
+                return data.get('result') or '\n'.join(text_parts)
+
+    def stop(self, grace: float = 2.0) -> None:
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.process.wait(grace)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            try:
+                self.process.wait(grace)
+            except subprocess.TimeoutExpired:
+                pass
+
+    def _read(self) -> None:
+        try:
+            for line in self.process.stdout:
+                self._lines.put(line)
+        except (OSError, ValueError):
+            pass
+        self._lines.put(_EOF)
+
+
+class WorkerPool:
+    """
+    A bounded pool of CLIWorkers.
+
+    acquire() hands out an idle worker started in the request's working
+    directory, starts a new one while the pool is below size, or waits for
+    one to be released; the wait is recorded as queue wait time. A worker is
+    health-checked when it is handed out and recycled after max_requests
+    requests (every request it serves stays in its conversation), once its
+    RSS passes max_rss_mb, or after any error or timeout. Idle workers of
+    another directory are recycled too. A worker recycled after serving its
+    requests is replaced in the background, so with the default of one
+    request per worker each request still finds a started CLI.
+    """
+
+    def __init__(self, command_factory: Callable[[], List[str]], size: int = DEFAULT_POOL_SIZE,
+                 max_requests: int = DEFAULT_MAX_REQUESTS, max_rss_mb: int = DEFAULT_MAX_RSS_MB,
+                 cwd: Optional[str] = None, debug_mode: bool = False):
+        """
+        Args:
+            command_factory: Returns the CLI argv prefix (from the CLI discovery)
+            size: Maximum number of workers
+            max_requests: Requests served before a worker is replaced
+            max_rss_mb: Resident memory at which a worker is replaced (0 disables)
+            cwd: Working directory of workers started ahead of a request;
+                follows the directory of the latest request
+            debug_mode: Print worker lifecycle messages
+        """
+        self._command_factory = command_factory
+        self.size = max(1, size)
+        self.max_requests = max(1, max_requests)
+        self.max_rss_kb = max(0, max_rss_mb) * 1024
+        self.cwd = cwd
+        self.debug_mode = debug_mode
+
+        self._cond = threading.Condition()
+        self._idle: List[CLIWorker] = []
+        self._workers = 0
+        self._closed = False
+        self._atexit_registered = False
+        self._waits: Deque[float] = deque(maxlen=WAIT_SAMPLES)
+
+        self.spawned = 0
+        self.requests = 0
+        self.waiting = 0
+        self.failures = 0
+        self.recycled: Dict[str, int] = {}
+
+    @classmethod
+    def from_config(cls, claude_config: Dict[str, Any], command_factory: Callable[[], List[str]],
+                    debug_mode: bool = False) -> Optional['WorkerPool']:
+        """Pool for the claude_code section of claude_config.json; None when disabled"""
+        if not claude_config.get('worker_pool', True):
+            return None
+        return cls(
+            command_factory,
+            size=claude_config.get('worker_pool_size', DEFAULT_POOL_SIZE),
+            max_requests=claude_config.get('worker_max_requests', DEFAULT_MAX_REQUESTS),
+            max_rss_mb=claude_config.get('worker_max_rss_mb', DEFAULT_MAX_RSS_MB),
+            debug_mode=debug_mode,
+        )
+
+    # ------------------------------------------------------------------ public
+
+    def run(self, prompt: str, timeout: Optional[float] = None, cancel: Optional[threading.Event] = None,
+            on_output: Optional[Callable[[], bool]] = None, cwd: Optional[str] = None) -> str:
+        """Send a prompt to a pooled worker in cwd; raises WorkerError or WorkerTimeout"""
+        started = time.monotonic()
+        worker = self.acquire(timeout, cwd)
+        remaining = timeout - (time.monotonic() - started) if timeout is not None else None
+        reason = 'error'
+        try:
+            with get_tracer().span('claude_code.worker', pid=worker.pid, request=worker.requests + 1):
+                result = worker.request(prompt, remaining, cancel, on_output)
+            reason = None
+            return result
+        except WorkerCancelled:
+            # The worker is mid-response, so it cannot serve anyone else
+            reason = 'cancelled'
+            raise
+        except WorkerError:
+            self.failures += 1
+            raise
+        finally:
+            self.release(worker, reason is None, reason or 'error')
+
+    def prestart(self) -> None:
+        """Start one worker ahead of the next request"""
+        with self._cond:
+            if self._closed or self._workers >= self.size:
+                return
+            self._workers += 1
+            cwd = self.cwd
+        worker = self._spawn(cwd)
+        with self._cond:
+            if worker is None:
+                self._workers -= 1
+            else:
+                self._idle.append(worker)
+            self._cond.notify()
+
+    def acquire(self, timeout: Optional[float] = None, cwd: Optional[str] = None) -> CLIWorker:
+        """An idle, healthy worker in cwd; starts one if the pool has room, else waits"""
+        started = time.monotonic()
+        deadline = started + timeout if timeout is not None else None
+        with self._cond:
+            self.waiting += 1
+            if cwd is not None:
+                self.cwd = cwd
+            cwd = self.cwd
+            try:
+                while True:
+                    if self._closed:
+                        raise WorkerError('worker pool is closed')
+                    while self._idle:
+                        worker = self._idle.pop()
+                        if not worker.alive:
+                            self._retire(worker, 'dead')
+                        elif worker.cwd != cwd:
+                            # Tools run in the CLI's directory, so the shell's cd needs a new one
+                            self._retire(worker, 'cwd')
+                        else:
+                            self._waits.append(time.monotonic() - started)
+                            return worker
+                    if self._workers < self.size:
+                        self._workers += 1
+                        break
+                    remaining = deadline - time.monotonic() if deadline is not None else None
+                    if remaining is not None and remaining <= 0:
+                        raise WorkerTimeout('no worker became available in time')
+                    self._cond.wait(remaining)
+            finally:
+                self.waiting -= 1
+
+        # Spawn outside the lock; the slot is already reserved
+        worker = self._spawn(cwd)
+        if worker is None:
+            with self._cond:
+                self._workers -= 1
+                self._cond.notify()
+            raise WorkerError('could not start a Claude worker')
+        self._waits.append(time.monotonic() - started)
+        return worker
+
+    def release(self, worker: CLIWorker, healthy: bool = True, failure: str = 'error') -> None:
+        """Return a worker; it is stopped instead when it should be recycled"""
+        reason = None
+        if not healthy:
+            reason = failure
+        elif not worker.alive:
+            reason = 'dead'
+        elif worker.requests >= self.max_requests:
+            reason = 'max_requests'
+        elif self.max_rss_kb and worker.rss_kb() > self.max_rss_kb:
+            reason = 'rss'
+
+        with self._cond:
+            self.requests += 1
+            if reason is None and not self._closed:
+                self._idle.append(worker)
+            else:
+                self._retire(worker, reason or 'closed')
+            self._cond.notify()
+            replenish = reason == 'max_requests' and not self._closed
+        if replenish:
+            threading.Thread(target=self.prestart, name='claude-worker-prestart', daemon=True).start()
+
+    def close(self) -> None:
+        """Stop every idle worker; busy ones are stopped when released"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for worker in idle:
+            worker.stop()
+
+    def get_stats(self) -> Dict[str, Any]:
+        waits = sorted(self._waits)
+        return {
+            'size': self.size,
+            'workers': self._workers,
+            'idle': len(self._idle),
+            'waiting': self.waiting,
+            'spawned': self.spawned,
+            'requests': self.requests,
+            'failures': self.failures,
+            'recycled': dict(self.recycled),
+            'queue_wait_ms': {
+                'p50': round(percentile(waits, 0.5) * 1000, 2),
+                'p95': round(percentile(waits, 0.95) * 1000, 2),
+                'max': round(waits[-1] * 1000, 2) if waits else 0.0,
+            },
+        }
+
+    # ----------------------------------------------------------------- internal
+
+    def _spawn(self, cwd: Optional[str]) -> Optional[CLIWorker]:
+        try:
+            with get_tracer().span('claude_code.worker.spawn'):
+                worker = CLIWorker(self._command_factory() + STREAM_ARGS, cwd=cwd)
+        except (OSError, ValueError) as e:
+            if self.debug_mode:
+                print(f"[DEBUG] Could not start Claude worker: {e}")
+            return None
+        self.spawned += 1
+        if not self._atexit_registered:
+            atexit.register(self.close)
+            self._atexit_registered = True
+        if self.debug_mode:
+            print(f"[DEBUG] Started Claude worker {worker.pid}")
+        return worker
+
+    def _retire(self, worker: CLIWorker, reason: str) -> None:
+        """Called with the lock held; the process is stopped in the background"""
+        self._workers -= 1
+        self.recycled[reason] = self.recycled.get(reason, 0) + 1
+        if self.debug_mode:
+            print(f"[DEBUG] Recycling Claude worker {worker.pid} ({reason}) "
+                  f"after {worker.requests} requests")
+        threading.Thread(target=worker.stop, name='claude-worker-stop', daemon=True).start()
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Checks for the legacy Claude Code parser's retry, circuit breaker, worker
+pool and hedging paths
+Runs ClaudeCodeParser against a fake `claude` CLI, with the shared `utils`
+module stubbed so no config file or real Claude installation is involved
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+import types
+
+# Prefer the installed modules, fall back to the source tree
+vibeos_path = "/usr/lib/vibeos"
+if os.path.exists(os.path.join(vibeos_path, "shell")):
+    shell_path = os.path.join(vibeos_path, "shell")
+else:
+    shell_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "src", "vibeos", "shell")
+sys.path.insert(0, shell_path)
+
+# Caches, learned latencies and the fake CLI's state stay in a scratch directory
+scratch = tempfile.mkdtemp(prefix='vibeos-parser-test-')
+os.environ['XDG_CACHE_HOME'] = os.path.join(scratch, 'cache')
+os.environ['FAKE_CLAUDE_STATE'] = scratch
+
+# The fake CLI answers with its working directory and how many requests its
+# process has seen. Words in the user's request select failures:
+# alwaysfail, failonce (first call only), slowonce (first call sleeps) and hang
+FAKE_CLI = f'''#!{sys.executable}
+import json, os, re, sys, time
+
+def calls(name):
+    path = os.path.join(os.environ['FAKE_CLAUDE_STATE'], name)
+    with open(path, 'a') as f:
+        f.write('x')
+    return os.path.getsize(path)
+
+def answer(prompt, turn):
+    if prompt.startswith('Reply with'):
+        return 0, 'OK'
+    said = re.search(r'The user said: "(.*)"', prompt)
+    request = said.group(1) if said else prompt
+    if 'alwaysfail' in request or ('failonce' in request and calls('failonce') == 1):
+        return 1, 'connection reset by peer'
+    if 'slowonce' in request and calls('slowonce') == 1:
+        time.sleep(3)
+    if 'hang' in request:
+        time.sleep(30)
+    return 0, 'echo ' + os.getcwd() + ' turn=' + str(turn)
+
+if '--input-format' in sys.argv:
+    for turn, line in enumerate(sys.stdin, 1):
+        code, text = answer(json.loads(line)['message']['content'], turn)
+        print(json.dumps({{'type': 'result', 'is_error': bool(code), 'result': text}}), flush=True)
+else:
+    code, text = answer(sys.stdin.read(), 1)
+    (sys.stderr if code else sys.stdout).write(text + '\\n')
+    sys.exit(code)
+'''
+fake_cli = os.path.join(scratch, 'claude')
+with open(fake_cli, 'w') as f:
+    f.write(FAKE_CLI)
+os.chmod(fake_cli, 0o755)
+
+failures = 0
+claude_config = {}
+
+
+def check(name: str, ok: bool, detail: str) -> None:
+    global failures
+    print(f"  {'✓' if ok else '✗'} {name}: {detail}")
+    if not ok:
+        failures += 1
+
+
+class _Config:
+    @staticmethod
+    def load_config(default_config=None):
+        config = {'debug': {'enabled': False}, 'claude_code': dict(default_config['claude_code'])}
+        config['claude_code'].update(claude_config)
+        return config
+
+
+class _Debug:
+    @staticmethod
+    def is_debug_enabled(config):
+        return False
+
+    @staticmethod
+    def setup_logging(debug_mode):
+        pass
+
+
+class _ContextManager:
+    def __init__(self, cache_enabled=True, cache_ttl=3600):
+        self.cache = {}
+
+    @staticmethod
+    def create_cache_key(text, context):
+        return f"{text}:{context.get('cwd', '')}"
+
+    def get_cached_response(self, key):
+        return {'response': self.cache[key]} if key in self.cache else None
+
+    def cache_response(self, key, response):
+        self.cache[key] = response
+
+    def add_to_history(self, user_input, command):
+        pass
+
+    def clear_context(self):
+        self.cache.clear()
+
+
+utils = types.ModuleType('utils')
+utils.VibeOSConfig, utils.VibeOSDebug, utils.VibeOSContextManager = _Config, _Debug, _ContextManager
+sys.modules['utils'] = utils
+
+import claude_code_parser
+from claude_cli import ClaudeCLI
+
+
+class _Discovery:
+    cli = ClaudeCLI(fake_cli, None, 'test')
+
+    def find(self):
+        return self.cli
+
+    def get_stats(self):
+        return {}
+
+
+claude_code_parser.get_cli_discovery = _Discovery
+
+
+def build_parser(**config) -> 'claude_code_parser.ClaudeCodeParser':
+    """A parser for the fake CLI; config overrides the claude_code section"""
+    claude_config.clear()
+    claude_config.update({
+        'cache_persistent': False,
+        'retry_base_delay': 0.01,
+        'retry_max_delay': 0.05,
+        'breaker_reset_timeout': 60,
+        'adaptive_timeouts': False,
+    })
+    claude_config.update(config)
+    return claude_code_parser.ClaudeCodeParser()
+
+
+def check_retries() -> None:
+    """A transient failure is retried; a backend that keeps failing opens the breaker"""
+    print("Retries and circuit breaker (subprocess path):")
+    parser = build_parser(worker_pool=False, breaker_failure_threshold=2)
+    try:
+        intent, params = parser.parse('list files failonce', {'cwd': scratch})
+        retries = parser.retry_policy.get_stats()['retries']
+        check("retried transient failure", intent == 'execute_command' and retries.get('transient') == 1,
+              f"{intent} after {retries}")
+
+        intent, _ = parser.parse('list files alwaysfail', {'cwd': scratch})
+        stats = parser.breaker.get_stats()
+        check("breaker opens", intent == 'process_error' and stats['state'] == 'open',
+              f"{intent}, breaker {stats['state']}")
+        check("retries are not rejections", stats['rejected'] == 0, f"rejected={stats['rejected']}")
+
+        intent, _ = parser.parse('show disk usage', {'cwd': scratch})
+        stats = parser.breaker.get_stats()
+        check("open breaker fails fast", intent == 'backend_unavailable' and stats['rejected'] == 1,
+              f"{intent}, rejected={stats['rejected']}")
+    finally:
+        parser.close()
+
+
+def check_pool() -> None:
+    """Every request gets a fresh conversation in its own working directory"""
+    print("Worker pool:")
+    parser = build_parser(worker_pool_size=1)
+    first, second = (os.path.realpath(tempfile.mkdtemp(dir=scratch)) for _ in range(2))
+    try:
+        commands = []
+        for request, cwd in (('list files', first), ('show files', second), ('count files', second)):
+            intent, params = parser.parse(request, {'cwd': cwd})
+            commands.append(params.get('command'))
+        expected = [f"echo {first} turn=1", f"echo {second} turn=1", f"echo {second} turn=1"]
+        check("fresh conversation per request", commands == expected, repr(commands))
+        stats = parser.worker_pool.get_stats()
+        check("workers recycled", stats['recycled'].get('max_requests', 0) >= 3,
+              f"recycled={stats['recycled']}")
+
+        started = time.monotonic()
+        try:
+            parser.worker_pool.run('The user said: "hang"', 0.0, cwd=scratch)
+            outcome = 'answered'
+        except claude_code_parser.WorkerTimeout:
+            outcome = 'timed out'
+        elapsed = time.monotonic() - started
+        check("zero timeout", outcome == 'timed out' and elapsed < 1.0, f"{outcome} in {elapsed:.2f}s")
+    finally:
+        parser.close()
+
+
+def check_hedging() -> None:
+    """A slow worker is raced by a second one, and the wait for the winner is bounded"""
+    print("Hedged requests:")
+    parser = build_parser(worker_pool_size=2, hedge_requests=True, hedge_initial_delay=0.3,
+                          hedge_min_delay=0.1, hedge_max_extra_load=1.0)
+    try:
+        started = time.monotonic()
+        intent, params = parser.parse('list files slowonce', {'cwd': scratch})
+        elapsed = time.monotonic() - started
+        stats = parser.hedger.get_stats()
+        check("hedge wins", intent == 'execute_command' and stats['hedge_wins'] == 1 and elapsed < 2.5,
+              f"{intent} in {elapsed:.2f}s, hedge_wins={stats['hedge_wins']}")
+    finally:
+        parser.close()
+
+    # Workers that never return must not hang the request
+    parser = build_parser(worker_pool_size=2, hedge_requests=True, command_timeout=1,
+                          retry_on={'timeout': 0})
+    parser.worker_pool.run = lambda *args, **kwargs: threading.Event().wait()
+    try:
+        started = time.monotonic()
+        intent, _ = parser.parse('list files', {'cwd': scratch})
+        elapsed = time.monotonic() - started
+        check("bounded wait", intent == 'timeout' and elapsed < 4.0, f"{intent} in {elapsed:.2f}s")
+    finally:
+        parser.close()
+
+
+if __name__ == "__main__":
+    print("VibeOS Claude Code Parser Test")
+    print("=" * 50)
+    check_retries()
+    check_pool()
+    check_hedging()
+    print("=" * 50)
+    print("All checks passed!" if not failures else f"{failures} check(s) failed")
+    sys.exit(1 if failures else 0)
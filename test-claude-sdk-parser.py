@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Checks for the Claude SDK parser's response cache within a conversation and
+its persistent session's cancellation path
+Runs ClaudeSDKParser with the query to Claude replaced by a fake that
+answers every request in the same session, so no SDK, CLI or network is
+involved
+"""
+
+import os
+import sys
+import tempfile
+from concurrent.futures import CancelledError, Future
+
+# Prefer the installed modules, fall back to the source tree
+vibeos_path = "/usr/lib/vibeos"
+if os.path.exists(os.path.join(vibeos_path, "shell")):
+    shell_path = os.path.join(vibeos_path, "shell")
+else:
+    shell_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "src", "vibeos", "shell")
+sys.path.insert(0, shell_path)
+
+# Caches, usage and learned latencies stay in a scratch directory
+scratch = tempfile.mkdtemp(prefix='vibeos-sdk-parser-test-')
+os.environ['XDG_CACHE_HOME'] = os.path.join(scratch, 'cache')
+os.environ['VIBEOS_DEBUG'] = '0'
+
+from claude_sdk_parser import ClaudeSDKParser, SDKResponse
+
+failures = 0
+
+
+def check(name: str, ok: bool, detail: str) -> None:
+    global failures
+    print(f"  {'✓' if ok else '✗'} {name}: {detail}")
+    if not ok:
+        failures += 1
+
+
+def build_parser() -> ClaudeSDKParser:
+    """A parser whose queries are answered by a fake Claude, all in one session"""
+    parser = ClaudeSDKParser()
+    parser.sdk_available = True
+    parser.queries = []
+
+    def run_query(input_text, context, response):
+        parser.queries.append(input_text)
+        response.text_parts.append(f"answer {len(parser.queries)} to {input_text}")
+        response.session_id = 'session-1'
+        result = parser._build_response(input_text, context, response)
+        parser._record_session(context, response)
+        return result
+
+    parser._run_query = run_query
+    return parser
+
+
+def check_cache_in_conversation() -> None:
+    """Self-contained requests hit the cache mid-conversation; follow-ups never do"""
+    print("Cache within a conversation:")
+    parser = build_parser()
+    cwd = tempfile.mkdtemp(dir=scratch)
+    try:
+        turns = ['what is in README.md', 'what is in README.md', 'what is in the README.md',
+                 'explain that', 'explain that']
+        results = [parser.parse_with_sdk(turn, {'cwd': cwd})[1] for turn in turns]
+        check("conversation active", parser.sessions is not None and parser.sessions.active(cwd),
+              f"{len(parser.queries)} queries sent")
+        check("repeated query hits", results[1].get('from_cache') is True,
+              f"second turn from_cache={results[1].get('from_cache')}")
+        check("reworded query hits", results[2].get('fuzzy_match') is not None,
+              f"third turn fuzzy_match={results[2].get('fuzzy_match')}")
+        check("follow-ups reach Claude", parser.queries == [turns[0], turns[3], turns[4]],
+              repr(parser.queries))
+    finally:
+        parser.close()
+
+
+class _CancelledSession:
+    """A persistent session whose client is torn down under every request"""
+    busy = False
+
+    def submit(self, prompt, cwd, on_message):
+        future = Future()
+        future.set_exception(CancelledError())
+        return future
+
+    def cancel(self, future, grace=0.0):
+        pass
+
+    def reset(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def check_cancelled_session() -> None:
+    """A session query cancelled under the caller ends as a timeout, SDK loaded or not"""
+    print("Persistent session:")
+    parser = build_parser()
+    parser.session = _CancelledSession()
+    try:
+        intent, _ = parser._query_persistent('list files', {'cwd': scratch}, SDKResponse(), 'simple')
+        check("cancelled query", intent == 'timeout', intent)
+    finally:
+        parser.close()
+
+
+if __name__ == "__main__":
+    print("VibeOS Claude SDK Parser Test")
+    print("=" * 50)
+    check_cache_in_conversation()
+    check_cancelled_session()
+    print("=" * 50)
+    print("All checks passed!" if not failures else f"{failures} check(s) failed")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Performance checks for vibesh hot paths
+Run this after changing caching, parsing or sanitizing code to verify the latency budgets
+"""
+
+import os
+import random
+import subprocess
+import sys
+import time
+
+# Prefer the installed modules, fall back to the source tree
+vibeos_path = "/usr/lib/vibeos"
+if os.path.exists(os.path.join(vibeos_path, "shell")):
+    shell_path = os.path.join(vibeos_path, "shell")
+else:
+    shell_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "src", "vibeos", "shell")
+sys.path.insert(0, shell_path)
+
+failures = 0
+
+
+def check(name: str, ok: bool, detail: str) -> None:
+    global failures
+    print(f"  {'✓' if ok else '✗'} {name}: {detail}")
+    if not ok:
+        failures += 1
+
+
+def bench_near_duplicate_lookup(entries: int = 100_000, lookups: int = 2_000, budget_ms: float = 1.0) -> None:
+    """Near-duplicate cache lookups must stay sub-millisecond with a large index"""
+    from query_normalizer import NearDuplicateIndex, normalize_query
+
+    print(f"Near-duplicate index ({entries} entries):")
+    rng = random.Random(42)
+    verbs = ['show', 'list', 'find', 'count', 'delete', 'open', 'search', 'compress', 'copy', 'move']
+    objects = ['files', 'folders', 'images', 'logs', 'python files', 'processes', 'packages', 'branches']
+    places = ['here', 'in home', 'in downloads', 'in /var/log', 'in src', 'in the repo', 'on desktop']
+
+    index = NearDuplicateIndex(max_entries=entries)
+    queries = []
+    start = time.perf_counter()
+    for i in range(entries):
+        query = f"{rng.choice(verbs)} {rng.choice(objects)} {rng.choice(places)} item{i}"
+        queries.append(query)
+        index.add(f"key{i}", normalize_query(query))
+    add_ms = (time.perf_counter() - start) * 1000 / entries
+
+    def reword(query: str) -> str:
+        # Filler words and singular forms, which the exact key keeps apart
+        verb, rest = query.split(' ', 1)
+        rest = rest.replace('files', 'file', 1).replace('in ', 'in the ', 1).replace('the the ', 'the ')
+        return f"{verb} me the {rest}" if rng.random() < 0.5 else f"{verb} the {rest}"
+
+    sample = rng.sample(queries, lookups)
+    reworded = [reword(q) for q in sample]
+    unchanged = sum(1 for q, r in zip(sample, reworded) if normalize_query(q) == normalize_query(r))
+    start = time.perf_counter()
+    hits = sum(1 for q in reworded if index.lookup(normalize_query(q)) is not None)
+    lookup_ms = (time.perf_counter() - start) * 1000 / lookups
+    negated = sum(1 for q in sample[:200] if index.lookup(normalize_query(f"do not {q}")) is not None)
+
+    print(f"  add: {add_ms:.3f} ms/entry")
+    check("lookup latency", lookup_ms < budget_ms, f"{lookup_ms:.3f} ms/lookup (budget {budget_ms} ms)")
+    check("reworded hits", hits == lookups and unchanged == 0,
+          f"{hits}/{lookups}, {unchanged} with the exact key")
+    check("negations miss", negated == 0, f"{negated}/200 matched")
+
+    pairs = [("show me the files here", "show the files in here"), ("show disk usage", "show the disk usage"),
+             ("list all python files", "list all the python files"), ("show me the git log", "show the git log")]
+    misses = [pair for pair in pairs if not near_match(*pair)]
+    distinct = [("do not delete the logs", "delete the logs"), ("list files", "list all files"),
+                ("open README.md", "open readme.md"), ("list python files in src", "list python files in tests")]
+    confused = [pair for pair in distinct if near_match(*pair)]
+    check("rewording pairs", not misses and not confused,
+          f"{len(pairs)} matched, {len(distinct)} kept apart" if not misses and not confused else
+          f"missed {misses}, confused {confused}")
+
+
+def near_match(cached: str, query: str) -> bool:
+    """True when query finds cached in an index holding only that one entry"""
+    from query_normalizer import NearDuplicateIndex, normalize_query
+
+    index = NearDuplicateIndex()
+    index.add('cached', normalize_query(cached))
+    return index.lookup(normalize_query(query)) is not None
+
+
+def bench_fast_path(rounds: int = 20_000, budget_us: float = 20.0) -> None:
+    """Local intent classification must take microseconds, hit or miss"""
+    from fast_path import LocalIntentEngine
+
+    print("Fast path classification:")
+    trivial = ["list files", "show current directory", "git status", "check disk usage", "go to src",
+               "please show me the files in /var/log", "what time is it?", "cd .."]
+    ambiguous = ["create a new python project called myapp", "install nodejs and npm",
+                 "fix the failing tests in this repo", "commit changes with message 'initial commit'"]
+    requests = trivial + ambiguous
+
+    engine = LocalIntentEngine()
+    misrouted = [r for r in trivial if engine.classify(r) is None] + \
+                [r for r in ambiguous if engine.classify(r) is not None]
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for request in requests:
+            engine.classify(request)
+    elapsed = time.perf_counter() - start
+    per_call_us = elapsed * 1e6 / (rounds * len(requests))
+
+    print(f"  throughput: {rounds * len(requests) / elapsed:,.0f} classifications/s")
+    check("classification latency", per_call_us < budget_us, f"{per_call_us:.2f} us/request (budget {budget_us:g} us)")
+    check("routing", not misrouted, ', '.join(misrouted) if misrouted else
+          f"{len(trivial)} answered locally, {len(ambiguous)} sent to Claude")
+
+    # Paths are expanded and quoted; options are never taken for a path
+    home = os.path.expanduser('~')
+    expected = {
+        "ls ~": ('execute_command', f"ls -la -- {home}"),
+        "show files in ~/src": ('execute_command', f"ls -la -- {home}/src"),
+        "ls -la": ('execute_command', "ls -la"),
+        "ls -R docs": ('execute_command', "ls -R -- docs"),
+        "cd -": ('change_directory', "-"),
+        "cd ~/src": ('change_directory', "~/src"),
+        "cd -rf": None,
+        "ls --color=never; rm x": None,
+    }
+    wrong = []
+    for request, want in expected.items():
+        result = LocalIntentEngine().classify(request)
+        got = result and (result[0], result[1].get('command', result[1].get('path')))
+        if got != want:
+            wrong.append(f"{request!r} -> {got}")
+    check("arguments", not wrong, '; '.join(wrong) if wrong else f"{len(expected)} cases")
+
+
+def bench_sanitizer(rounds: int = 200, budget_ms: float = 1.0) -> None:
+    """Sanitizing must scale linearly with input length up to the 10k limit"""
+    from sanitizer import sanitize_input, MAX_INPUT_LENGTH
+
+    print("Input sanitizer:")
+    expected = {
+        "  list files;  rm -rf /  ": "list files rm -rf /",
+        "echo $(whoami) | tee `x`": "echo whoami tee x",
+        "say \\x41hi \\101 there": "say hi there",
+        "\t\n ;&| ": "",
+    }
+    wrong = [text for text, result in expected.items() if sanitize_input(text) != result]
+    # Prompts for the SDK parser keep their characters and only get capped
+    prompts = {
+        '  what does $(pwd) print; and "a | b"?\n': 'what does $(pwd) print; and "a | b"?',
+        'x' * 6000: 'x' * 5000,
+    }
+    wrong += [text[:40] for text, result in prompts.items()
+              if sanitize_input(text, 5000, shell=False) != result]
+
+    chunk = "find all the log files in /var/log bigger than 10MB; then (maybe) gzip them \\x41 "
+    per_char_us = {}
+    for length in (100, 1_000, MAX_INPUT_LENGTH):
+        text = (chunk * (length // len(chunk) + 1))[:length]
+        start = time.perf_counter()
+        for _ in range(rounds):
+            sanitize_input(text)
+        elapsed = (time.perf_counter() - start) / rounds
+        per_char_us[length] = elapsed * 1e6 / length
+        print(f"  {length:>6} chars: {elapsed * 1e6:8.1f} us ({per_char_us[length] * 1000:.1f} ns/char)")
+
+    longest = per_char_us[MAX_INPUT_LENGTH] * MAX_INPUT_LENGTH / 1000
+    check("sanitize latency", longest < budget_ms,
+          f"{longest:.3f} ms at {MAX_INPUT_LENGTH} chars (budget {budget_ms:g} ms)")
+    growth = per_char_us[MAX_INPUT_LENGTH] / per_char_us[1_000]
+    check("linear scaling", growth < 2.0, f"cost per char at 10k is {growth:.2f}x the cost at 1k")
+    check("semantics", not wrong, ', '.join(map(repr, wrong)) if wrong else f"{len(expected) + len(prompts)} cases")
+
+
+def bench_import_time(runs: int = 5, budget_ms: float = 100.0) -> None:
+    """Importing vibesh must stay fast and must not load the Claude SDK or print"""
+    print("vibesh import time:")
+    heavy = ('claude_code_sdk', 'anyio', 'asyncio')
+    probe = f"import sys; import vibesh; print(','.join(m for m in {heavy!r} if m in sys.modules))"
+    env = dict(os.environ, PYTHONPATH=shell_path, VIBEOS_DEBUG='false')
+
+    best_us = None
+    loaded = output = ''
+    for _ in range(runs):
+        # -X importtime writes "import time: self | cumulative | module" to stderr
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', probe],
+                                capture_output=True, text=True, env=env)
+        if result.returncode != 0:
+            check("import", False, result.stderr.strip().splitlines()[-1])
+            return
+        *output_lines, loaded = result.stdout.rstrip('\n').split('\n')
+        output = '\n'.join(output_lines)
+        for line in result.stderr.splitlines():
+            fields = line.split('|')
+            if len(fields) == 3 and fields[2].strip() == 'vibesh':
+                cumulative = int(fields[1])
+                best_us = cumulative if best_us is None else min(best_us, cumulative)
+
+    if best_us is None:
+        check("import", False, "vibesh missing from -X importtime output")
+        return
+    check("import latency", best_us / 1000 < budget_ms,
+          f"{best_us / 1000:.1f} ms best of {runs} (budget {budget_ms:g} ms)")
+    check("heavy modules deferred", not loaded, loaded or f"none of {', '.join(heavy)} imported")
+    check("silent import", not output, repr(output) if output else "nothing printed")
+
+
+if __name__ == "__main__":
+    print("VibeOS Shell Performance Test")
+    print("=" * 50)
+    bench_import_time()
+    bench_fast_path()
+    bench_sanitizer()
+    bench_near_duplicate_lookup()
+    print("=" * 50)
+    print("All budgets met!" if not failures else f"{failures} check(s) failed")
+    sys.exit(1 if failures else 0)